@@ -15,6 +15,10 @@
 * along with the source code. If not, see <https://www.gnu.org/licenses/>.
 */
 
+// Guarded, because cells built on a base image already get this file as a precompiled header
+#ifndef MDT_CAST_CPP
+#define MDT_CAST_CPP
+
 #include <nlohmann/json.hpp>
 #include <iostream>
 #include <string>
@@ -106,4 +110,6 @@ std::ostream& operator<<(std::ostream& out, std::vector<Type> v)
     auto item = v[n - 1];
     out << item << "]";
     return out;
-}
\ No newline at end of file
+}
+
+#endif
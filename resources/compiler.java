@@ -0,0 +1,58 @@
+
+// This file is part of the Modular Differential Testing Project.
+
+// The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+
+// The Modular Differential Testing Project is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+
+// You should have received a copy of the GNU General Public License
+// along with the source code. If not, see <https://www.gnu.org/licenses/>.
+
+import java.io.*;
+import java.nio.charset.StandardCharsets;
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+// Resident compiler service, so compiling a cell does not pay the boot and warmup of a new javac JVM.
+// Uses the same length prefixed protocol as the runner: a message holds the javac arguments separated by tabs,
+// the answer is "<exit status>\t<diagnostics>". A zero length message stops the service
+public class compiler {
+
+    public static void main(String[] args) throws Exception {
+        JavaCompiler javac = ToolProvider.getSystemJavaCompiler();
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        DataOutputStream out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(FileDescriptor.out)));
+        while (true) {
+            int length;
+            try {
+                length = in.readInt();
+            } catch (EOFException e) {
+                break;
+            }
+            if (length == 0) {
+                break;
+            }
+            byte[] request = new byte[length];
+            in.readFully(request);
+            String[] arguments = new String(request, StandardCharsets.UTF_8).split("\t");
+            ByteArrayOutputStream diagnostics = new ByteArrayOutputStream();
+            int status;
+            try {
+                status = javac.run(null, diagnostics, diagnostics, arguments);
+            } catch (Throwable e) {
+                status = 1;
+                e.printStackTrace(new PrintStream(diagnostics, true, "UTF-8"));
+            }
+            byte[] data = (status + "\t" + diagnostics.toString("UTF-8")).getBytes(StandardCharsets.UTF_8);
+            out.writeInt(data.length);
+            out.write(data);
+            out.flush();
+        }
+    }
+}
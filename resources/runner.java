@@ -0,0 +1,148 @@
+
+// This file is part of the Modular Differential Testing Project.
+
+// The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+
+// The Modular Differential Testing Project is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+
+// You should have received a copy of the GNU General Public License
+// along with the source code. If not, see <https://www.gnu.org/licenses/>.
+
+import java.io.*;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+
+// Resident JVM that answers test cases streamed over stdin, so the JVM boot is paid once per container.
+// Every message is prefixed by its length as a 4 byte big endian integer, a zero length message stops the runner.
+// "LOAD\t<class>\t<warmup>" loads a freshly compiled class through a new class loader, any other message is a test case
+public class runner {
+
+    static URLClassLoader loader = null;
+    static Method function = null;
+    static int warmup = 0;
+
+    public static void main(String[] args) throws Exception {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        // The protocol writes to the real stdout, System.out is swapped for every test case
+        DataOutputStream out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(FileDescriptor.out)));
+        while (true) {
+            int length;
+            try {
+                length = in.readInt();
+            } catch (EOFException e) {
+                break;
+            }
+            if (length == 0) {
+                break;
+            }
+            byte[] request = new byte[length];
+            in.readFully(request);
+            String message = new String(request, StandardCharsets.UTF_8);
+            String response = message.startsWith("LOAD\t") ? load(message) : run(message);
+            byte[] data = response.getBytes(StandardCharsets.UTF_8);
+            out.writeInt(data.length);
+            out.write(data);
+            out.flush();
+        }
+    }
+
+    static String load(String message) {
+        String[] fields = message.split("\t", -1);
+        try {
+            // The parent is the platform loader, so the user class and the helpers are always read again from the class path
+            // (the working directory, and the precompiled helpers of a base image)
+            String[] entries = System.getProperty("java.class.path", ".").split(File.pathSeparator);
+            URL[] urls = new URL[entries.length];
+            for (int i = 0; i < entries.length; i++) {
+                urls[i] = new File(entries[i].isEmpty() ? "." : entries[i]).toURI().toURL();
+            }
+            URLClassLoader next = new URLClassLoader(urls, ClassLoader.getPlatformClassLoader());
+            Class<?> loaded = Class.forName(fields[1], true, next);
+            function = loaded.getMethod("mdtCase", String[].class);
+            warmup = fields.length > 2 ? Integer.parseInt(fields[2]) : 0;
+            if (loader != null) {
+                loader.close();
+            }
+            loader = next;
+            return "OK";
+        } catch (Throwable e) {
+            function = null;
+            return "Failed to load " + fields[1] + ": " + e;
+        }
+    }
+
+    static String run(String message) throws Exception {
+        String[] fields = message.split("\t", -1);
+        String[] args = new String[Integer.parseInt(fields[0])];
+        for (int i = 0; i < args.length; i++) {
+            args[i] = decode(fields[i + 1]);
+        }
+        PrintStream realOut = System.out;
+        PrintStream realErr = System.err;
+        ByteArrayOutputStream caseOut = new ByteArrayOutputStream();
+        ByteArrayOutputStream caseErr = new ByteArrayOutputStream();
+        int status = 0;
+        long elapsed = 0;
+        if (function == null) {
+            return "@@MDT@@\t0\t0\t0\t1\t\t" + encode("No class loaded".getBytes(StandardCharsets.UTF_8));
+        }
+        try {
+            // Warmup runs give the JIT the chance to compile the function before it is measured, their output is discarded
+            System.setOut(new PrintStream(OutputStream.nullOutputStream()));
+            System.setErr(new PrintStream(OutputStream.nullOutputStream()));
+            for (int i = 0; i < warmup; i++) {
+                try {
+                    function.invoke(null, (Object) args);
+                } catch (InvocationTargetException e) {
+                    break;
+                }
+            }
+            System.setOut(new PrintStream(caseOut, true, "UTF-8"));
+            System.setErr(new PrintStream(caseErr, true, "UTF-8"));
+            long start = System.nanoTime();
+            try {
+                function.invoke(null, (Object) args);
+            } finally {
+                elapsed = System.nanoTime() - start;
+            }
+        } catch (InvocationTargetException e) {
+            status = 1;
+            e.getCause().printStackTrace();
+        } catch (Throwable e) {
+            status = 1;
+            e.printStackTrace();
+        }
+        System.out.flush();
+        System.err.flush();
+        System.setOut(realOut);
+        System.setErr(realErr);
+        Runtime runtime = Runtime.getRuntime();
+        long memory = (runtime.totalMemory() - runtime.freeMemory()) / 1024;
+        return "@@MDT@@\t0\t" + elapsed + "\t" + memory + "\t" + status + "\t" + encode(caseOut.toByteArray()) + "\t" + encode(caseErr.toByteArray());
+    }
+
+    static String decode(String hex) throws Exception {
+        byte[] bytes = new byte[hex.length() / 2];
+        for (int i = 0; i < bytes.length; i++) {
+            bytes[i] = (byte) Integer.parseInt(hex.substring(2 * i, 2 * i + 2), 16);
+        }
+        return new String(bytes, "UTF-8");
+    }
+
+    static String encode(byte[] bytes) {
+        StringBuilder hex = new StringBuilder();
+        for (byte b : bytes) {
+            hex.append(String.format("%02x", b));
+        }
+        return hex.toString();
+    }
+}
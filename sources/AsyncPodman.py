@@ -0,0 +1,62 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio, subprocess, weakref
+from sources.Podman import Podman
+from sources.LoggerConfig import logger
+
+# Maximum number of podman processes running at the same time, per event loop
+MAX_ASYNC_EXECS = 64
+
+class AsyncPodman(Podman):
+    '''
+    Podman backend that can also run commands in containers as coroutines, used by the asyncio engine of ContainerManager.
+    The other operations are inherited from the CLI backend
+    '''
+    def __init__(self, max_execs: int = MAX_ASYNC_EXECS):
+        super().__init__()
+        self.max_execs = max_execs
+        # asyncio semaphores belong to one event loop, so there is one per loop
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    def get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.BoundedSemaphore(self.max_execs)
+        return self.semaphores[loop]
+
+    def generate_exec_command(self, container_name: str, command: list) -> list:
+        return ["podman", "exec", container_name] + command
+
+    async def exec_command_async(self, container_name: str, command: list, metrics: bool = False, timeout: int = 120) -> dict:
+        '''
+        Executes a command inside a podman container without blocking the event loop
+        '''
+        logger.info(f'AsyncPodman exec_command_async: Executing command {command} on container {container_name}')
+        if metrics:
+            command = ["/usr/bin/time", "-v"] + command
+        command_split = self.generate_exec_command(container_name, command)
+        async with self.get_semaphore():
+            process = await asyncio.create_subprocess_exec(*command_split, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise subprocess.TimeoutExpired(command_split, timeout)
+        exec_output = subprocess.CompletedProcess(command_split, process.returncode, stdout=stdout, stderr=stderr)
+        logger.info(f'AsyncPodman exec_command_async: Executed command {command} on container {container_name} with output:')
+        return self.process_exec_output(exec_output, metrics)
@@ -0,0 +1,125 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, re, shutil, hashlib, tempfile, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Podman import Podman, podman
+from sources.LanguageFactory import LanguageFactory
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+# All base images share this name, the tag identifies the language, version, compiler and content
+BASE_IMAGE_NAME = "mdt_base"
+
+class BaseImages:
+    '''
+    Base images of the languages: the compiler image with the tooling every cell needs and the helper files,
+    built once per language, version and compiler. The image of a cell only adds its libraries on top of it
+    '''
+    def __init__(self, language_factory: LanguageFactory = LanguageFactory):
+        self.language_factory = language_factory()
+        # Guards prepared and build_locks, never held during a build so cells never wait for the base image of another environment
+        self.lock = threading.Lock()
+        # Tags that are known to exist, so podman is only asked once per environment
+        self.prepared = set()
+        # One lock per tag, so a base image is built once
+        self.build_locks = {}
+
+    def get_helper_paths(self, language) -> list:
+        '''
+        Helper files are given relative to the sources folder
+        '''
+        return [os.path.join(current_dir, file) for file in language.helper_files]
+
+    def get_tag(self, language_name: str, version: str, compiler: str) -> str:
+        '''
+        Tag of a base image. It changes with the Dockerfile and the helper files, so an outdated base image is never used
+        '''
+        language = self.language_factory.get_language(language_name)
+        content = language.generate_base_dockerfile(version, compiler)
+        for path in self.get_helper_paths(language):
+            with open(path, "r", encoding="utf-8") as file:
+                content += "\n" + file.read()
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+        name = "-".join(part for part in [language_name, version, compiler] if part)
+        return re.sub(r"[^a-zA-Z0-9_.-]", "_", f"{name}-{digest}").lower()
+
+    def prepare(self, podman_instance: Podman, language_name: str, version: str = "", compiler: str = "") -> str:
+        '''
+        Builds the base image of an environment if it does not exist yet and returns its name
+        '''
+        language = self.language_factory.get_language(language_name)
+        tag = self.get_tag(language_name, version, compiler)
+        with self.lock:
+            build_lock = self.build_locks.setdefault(tag, threading.Lock())
+        with build_lock:
+            if not self.is_prepared(tag) and not podman_instance.image_exists(BASE_IMAGE_NAME, tag):
+                logger.info(f"BaseImages prepare: Building base image {BASE_IMAGE_NAME}:{tag}")
+                with tempfile.TemporaryDirectory() as context:
+                    with open(os.path.join(context, "Dockerfile"), "w", encoding="utf-8") as file:
+                        file.write(language.generate_base_dockerfile(version, compiler))
+                    for path in self.get_helper_paths(language):
+                        shutil.copy2(path, os.path.join(context, os.path.basename(path)))
+                    podman_instance.build_image(BASE_IMAGE_NAME, tag, mount_path=context)
+                if not podman_instance.image_exists(BASE_IMAGE_NAME, tag):
+                    raise BaseImageException(f"Failed to build base image {BASE_IMAGE_NAME}:{tag}")
+            with self.lock:
+                self.prepared.add(tag)
+        return f"{BASE_IMAGE_NAME}:{tag}"
+
+    def is_prepared(self, tag: str) -> bool:
+        with self.lock:
+            return tag in self.prepared
+
+    def prepare_all(self, podman_instance: Podman, entries: list) -> list:
+        '''
+        Prepares the base images of a list of environments, i.e. parsed from "python:3.10, cpp/gcc"
+        '''
+        return [self.prepare(podman_instance, entry['language'], entry['version'], entry['compiler']) for entry in entries]
+
+    def get_base_image(self, podman_instance: Podman, language_name: str, version: str = "", compiler: str = "") -> str:
+        '''
+        Returns the base image of an environment, or "" when it was not prepared. Never builds, so a cell
+        without a prepared base image is built from the compiler image like before
+        '''
+        try:
+            tag = self.get_tag(language_name, version, compiler)
+            if not self.is_prepared(tag):
+                if not podman_instance.image_exists(BASE_IMAGE_NAME, tag):
+                    return ""
+                with self.lock:
+                    self.prepared.add(tag)
+            return f"{BASE_IMAGE_NAME}:{tag}"
+        except Exception as e:
+            logger.debug(f"BaseImages get_base_image: {str(e)}")
+            return ""
+
+base_images = BaseImages()
+
+if __name__ == '__main__':
+    # Prepares base images ahead of time, e.g. python sources/BaseImages.py "python:3.10, cpp/gcc, java"
+    from sources.ContainerManager import parse_pool_spec
+    if len(sys.argv) < 2:
+        print('Usage: python BaseImages.py "<language>[:<version>][/<compiler>], ..."')
+        sys.exit(1)
+    os.chdir(current_dir)
+    # Usually run next to a live server, whose containers and session folders are kept
+    podman.init(clean=False)
+    for image in base_images.prepare_all(podman, parse_pool_spec(sys.argv[1])):
+        print(image)
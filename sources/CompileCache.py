@@ -0,0 +1,117 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, io, json, tarfile, hashlib, tempfile, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.LoggerConfig import logger
+
+# Folder on the host where the compiled outputs are kept
+COMPILE_CACHE_PATH = os.path.join(parent_dir, "compile_cache")
+# Number of compiled outputs kept, the least recently used are removed first
+MAX_COMPILE_CACHE_ENTRIES = 200
+# Files of the session folder that are not compiled
+IGNORED_FILES = ["Dockerfile"]
+IGNORED_EXTENSIONS = [".mdt"]
+
+class CompileCache:
+    '''
+    Keeps the files created by compiling a cell (i.e. C++ binaries, Java class files) as tar archives on the host,
+    keyed by a hash of the sources, the helper files, the compile command and the environment
+    '''
+    def __init__(self, path: str = COMPILE_CACHE_PATH, max_entries: int = MAX_COMPILE_CACHE_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def get_sources(self, folder: str) -> list:
+        '''
+        The files of a session folder that are compiled, sorted so the key does not depend on the listing order
+        '''
+        files = []
+        for file in sorted(os.listdir(folder)):
+            if file in IGNORED_FILES or os.path.splitext(file)[1] in IGNORED_EXTENSIONS:
+                continue
+            if os.path.isfile(os.path.join(folder, file)):
+                files.append(file)
+        return files
+
+    def get_key(self, folder: str, command: list, environment: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps({"command": command, "environment": environment}, sort_keys=True).encode("utf-8"))
+        for file in self.get_sources(folder):
+            with open(os.path.join(folder, file), "rb") as source:
+                content = source.read()
+            digest.update(f"\n{file}\n{len(content)}\n".encode("utf-8"))
+            digest.update(content)
+        return digest.hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.tar")
+
+    def get(self, key: str) -> bytes:
+        '''
+        Returns the archive of the compiled files, or None if the code was not compiled before
+        '''
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as file:
+                archive = file.read()
+            # The modification time orders the entries for the removal of the least recently used
+            os.utime(entry_path)
+            return archive
+        except OSError:
+            return None
+
+    def put(self, key: str, archive: bytes, sources: list) -> None:
+        '''
+        Stores the files of the archive that are not sources, i.e. the outputs of the compiler
+        '''
+        outputs = io.BytesIO()
+        with tarfile.open(fileobj=io.BytesIO(archive)) as compiled, tarfile.open(fileobj=outputs, mode="w") as kept:
+            for member in compiled.getmembers():
+                name = os.path.normpath(member.name)
+                if not member.isfile() or name in sources or os.path.basename(name) in IGNORED_FILES:
+                    continue
+                if os.path.splitext(name)[1] in IGNORED_EXTENSIONS:
+                    continue
+                member.name = name
+                kept.addfile(member, compiled.extractfile(member))
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            # Written to a temporary file first, so a concurrent get never reads a partial archive
+            with tempfile.NamedTemporaryFile(dir=self.path, delete=False) as file:
+                file.write(outputs.getvalue())
+            os.replace(file.name, self.get_entry_path(key))
+            self.collect()
+
+    def collect(self) -> list:
+        '''
+        Removes the least recently used entries while there are more than max_entries
+        '''
+        entries = sorted((os.path.getmtime(os.path.join(self.path, file)), file) for file in os.listdir(self.path) if file.endswith(".tar"))
+        removed = []
+        for _, file in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(os.path.join(self.path, file))
+                removed.append(file[:-len(".tar")])
+            except OSError as e:
+                logger.warning(f"CompileCache collect: Failed to remove {file}: {str(e)}")
+        return removed
+
+compile_cache = CompileCache()
@@ -0,0 +1,146 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, time, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.LoggerConfig import logger
+
+# Bounds of the number of containers running at the same time, whatever the size of the host
+MAX_CONTAINERS_CEILING = 64
+MIN_CONTAINERS = 1
+CPUS_PER_CONTAINER = 1
+# Memory of a container before any test case ran, replaced by the observed memory of the test cases
+CONTAINER_MEMORY_MB = 256
+# Memory of a container besides its test cases (i.e. the container runtime and the idle process)
+CONTAINER_OVERHEAD_MB = 64
+# Memory left for the host and the server
+MEMORY_RESERVE_MB = 1024
+# Load average per CPU above which the limit is lowered
+MAX_LOAD = 1.0
+# Minimum number of seconds between two adjustments of the limit
+ADJUST_INTERVAL = 5
+
+MEMORY_METRIC = 'Maximum resident set size (kbytes)'
+
+def get_cpu_count() -> int:
+    try:
+        # Only the CPUs the server may run on, i.e. inside a cgroup or with taskset
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def get_free_memory() -> int:
+    '''
+    Available memory of the host in MB, or None when it can not be read (i.e. not on Linux)
+    '''
+    try:
+        with open("/proc/meminfo", "r") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def get_load() -> float:
+    '''
+    Load average of the last minute per CPU, or None when the platform has no load average
+    '''
+    try:
+        return os.getloadavg()[0] / get_cpu_count()
+    except (OSError, AttributeError):
+        return None
+
+class ConcurrencyController:
+    '''
+    Decides how many containers run at the same time. The limit starts from the CPU count and the free memory of the host,
+    then follows the memory used by the test cases and the load of the host, between the floor and the ceiling.
+    When several worker processes share the host, each gets an equal part of the CPUs and of the free memory
+    '''
+    def __init__(self, ceiling: int = MAX_CONTAINERS_CEILING, floor: int = MIN_CONTAINERS, interval: float = ADJUST_INTERVAL, workers: int = 1):
+        self.ceiling = max(ceiling, floor)
+        self.floor = floor
+        self.interval = interval
+        self.workers = max(workers, 1)
+        self.container_memory = CONTAINER_MEMORY_MB
+        self.limit = None
+        self.last_adjusted = 0
+        self.lock = threading.Lock()
+
+    def get_target(self, running: int) -> int:
+        '''
+        Number of containers the host can run now, running is the number of containers that already use memory
+        '''
+        target = get_cpu_count() // CPUS_PER_CONTAINER // self.workers
+        free = get_free_memory()
+        if free is not None:
+            budget = (free - MEMORY_RESERVE_MB) // self.workers + running * self.container_memory
+            target = min(target, budget // self.container_memory)
+        return int(max(self.floor, min(self.ceiling, target)))
+
+    def initial_limit(self) -> int:
+        with self.lock:
+            self.limit = self.get_target(0)
+            self.last_adjusted = time.time()
+        logger.info(f"ConcurrencyController initial_limit: {self.limit} containers")
+        return self.limit
+
+    def adjust(self, running: int) -> int:
+        '''
+        Returns the limit for the current state of the host. The limit drops at once when the host runs out of memory,
+        one container at a time when the host is overloaded, and grows back by a quarter at most
+        '''
+        with self.lock:
+            if self.limit is None:
+                self.limit = self.get_target(running)
+            now = time.time()
+            if now - self.last_adjusted < self.interval:
+                return self.limit
+            self.last_adjusted = now
+            target = self.get_target(running)
+            load = get_load()
+            if load is not None and load > MAX_LOAD:
+                target = min(target, max(self.floor, self.limit - 1))
+            if target < self.limit:
+                limit = target
+            else:
+                limit = min(target, self.limit + max(1, self.limit // 4))
+            if limit != self.limit:
+                logger.info(f"ConcurrencyController adjust: {self.limit} -> {limit} containers (load {load}, {self.container_memory} MB per container)")
+            self.limit = limit
+            return self.limit
+
+    def observe(self, outputs: list) -> None:
+        '''
+        Updates the memory of a container from the peak memory of the test cases it ran
+        '''
+        peak = 0
+        for output in outputs:
+            try:
+                peak = max(peak, int(output.get('metrics', {}).get(MEMORY_METRIC, 0)))
+            except (ValueError, TypeError, AttributeError):
+                continue
+        if peak <= 0:
+            return
+        memory = peak // 1024 + CONTAINER_OVERHEAD_MB
+        with self.lock:
+            # The largest memory is followed at once, smaller ones slowly, so a single light cell does not raise the limit
+            self.container_memory = memory if memory > self.container_memory else (3 * self.container_memory + memory) // 4
+
+concurrency_controller = ConcurrencyController()
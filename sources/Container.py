@@ -14,7 +14,7 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
-import os,sys,shutil
+import os,sys,shutil,tarfile,io,threading,asyncio,contextvars
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(parent_dir)
@@ -22,16 +22,42 @@ sys.path.append(parent_dir)
 from sources.DockerMaker import EXECUTION_PATH
 from sources.Podman import Podman, podman
 from sources.CustomException import *
-from sources.LoggerConfig import logger, exec_logger
+from sources.LoggerConfig import logger
+from sources.ProgressTracker import track_stage, track_tests, DOCKERFILE, INJECT, BUILD, RUN
 from sources.LanguageFactory import LanguageFactory
+from sources.Injector import BATCH_INPUT_FILE, encode_batch_input, decode_batch_frame, decode_batch_output
+from sources.Worker import Worker
+from sources.ImageCache import ImageCache, image_cache
+from sources.BaseImages import BaseImages, base_images
+from sources.CompileCache import CompileCache, compile_cache
+
+# When true, the session folder of a container is bind mounted as its working directory, so code is written
+# to the folder instead of copied into the container
+MOUNT_CODE = False
+# Working directory of the containers
+APP_PATH = "/usr/src/app"
 
 class Container:
-    def __init__(self, metadata: dict, index: int, podman_instance: Podman = podman, run_as_is: bool = False):
+    def __init__(self, metadata: dict, index: int, podman_instance: Podman = podman, run_as_is: bool = False, image_cache: ImageCache = image_cache, base_images: BaseImages = base_images, mount_code: bool = MOUNT_CODE, compile_cache: CompileCache = compile_cache):
         self.metadata = metadata
         self.available = True
         self.index = index
         self.podman = podman_instance
+        self.image_cache = image_cache
+        self.base_images = base_images
+        self.compile_cache = compile_cache
+        # Prepared base image of the environment, "" when the image is built from the compiler image
+        self.base_image = ""
+        self.image_name = None
+        self.image_tag = None
         self.run_as_is = run_as_is
+        self.mount_code = mount_code
+        self.workers = []
+        # Resident compiler of languages that have one (i.e. javac in a long lived JVM), started on the first compilation
+        self.compiler = None
+        # Workers currently answering a test case, each parallel shard uses its own worker
+        self.busy_workers = set()
+        self.worker_lock = threading.Lock()
         self.language = LanguageFactory().get_language(metadata['language'])
         try:
             # When creating a new container, first a Dockerfile is created.
@@ -39,26 +65,37 @@ class Container:
                 function_name = "function"
                 self.metadata['signature']['name'] = function_name
             self.create_dockerfile()
-            exec_logger.info(f"Dockerfile done: {self.index}")
+            track_stage(DOCKERFILE)
             self.mounting_path = os.path.join(EXECUTION_PATH,f'{index}')
             if not self.run_as_is:
                 self.check_signature()
             # Injects user code into a file with a main function
             self.inject()
-            exec_logger.info(f"Inject done: {self.index}")
-            # Builds the image for the container
+            track_stage(INJECT)
+            # Gets the image of the environment, it is only built if no container used the same environment before
             self.copy_helper_files()
-            self.podman.build_image(f'image_{index}', f'image_tag_{index}',mount_path=self.mounting_path)
-            exec_logger.info(f"Build image done: {self.index}")
+            if self.base_image and not self.metadata.get('specs'):
+                # Nothing to add to the prepared base image, so it is used as is and no image is built
+                self.image_name, _, tag = self.base_image.partition(":")
+            else:
+                self.image_name, self.image_tag = self.image_cache.get_image(self.podman, self.get_environment(), self.mounting_path)
+                tag = self.image_tag
+            track_stage(BUILD)
             # Runs image. This automatically creates a container.
-            # No compilation is needed as it is specified within the Dockerfile
             # Assumption is made that you do not need to create a container without running it
-            self.podman.run_image(image_name=f'image_{index}',tag=f'image_tag_{index}',container_name=f'container_{index}')
-            exec_logger.info(f"Run image done: {self.index}")
+            if self.mount_code:
+                self.podman.run_image(image_name=self.image_name,tag=tag,container_name=f'container_{index}',volumes=[(self.mounting_path, APP_PATH)])
+            else:
+                self.podman.run_image(image_name=self.image_name,tag=tag,container_name=f'container_{index}')
+            # The image has no user code, so the code and helper files are uploaded to the running container
+            self.upload_code()
+            track_stage(RUN)
             logger.debug(f"Container init: {self.language.helper_files}")
 
         except Exception as e:
             logger.debug(f"Container: {str(e)}")
+            if self.image_tag is not None:
+                self.image_cache.release(self.image_tag)
             raise InitContainerException(e)
 
     def copy_helper_files(self) -> None:
@@ -77,7 +114,9 @@ class Container:
             function_name = self.metadata['signature']['name']
             specs = self.metadata['specs']
             index = self.index
-            self.language.generate_dockerfile(version=version, compiler=compiler, function_name=function_name, specs=specs, index=index)
+            self.base_image = self.base_images.get_base_image(self.podman, self.metadata['language'], version, compiler)
+            self.language.set_base_image(self.base_image)
+            self.language.generate_dockerfile(version=version, compiler=compiler, function_name=function_name, specs=specs, index=index, base_image=self.base_image)
             logger.debug(f"Container create_dockerfile: Created dockerfile for container {index}")
         except KeyError as e:
             logger.error(f"Container create_dockerfile: Missing required metadata key: {str(e)}")
@@ -91,16 +130,309 @@ class Container:
         '''
         try:
             self.available = False
+            output = self.run_test(input, timeout)
+            # Container finished executing code and is now available again
+            self.available = True
+            return output
+        except Exception as e:
+            self.available = True
+            raise RunCodeException(e)
+
+    def run_test(self, input: list, timeout: int = 60) -> dict:
+        '''
+        Runs a single test case, either on a worker or with a new execution inside the container
+        '''
+        if self.is_worker():
+            output = self.run_worker(input, timeout)
+        else:
             command = self.generate_run_command(input=input)
             output =  self.podman.exec_command(f'container_{self.index}', command, metrics=True, timeout = timeout)
-            # Container finished executing code and is now available again
+        track_tests()
+        return output
+
+    def run_parallel(self, inputs: list, timeout: int = 60, parallelism: int = 1) -> list:
+        '''
+        Splits the test cases in parallelism shards that run at the same time inside the container,
+        as separate executions, separate batch runs or separate workers. Outputs are merged back in input order.
+        Like the sequential run, a failing test case ends its shard, the other shards keep running
+        '''
+        outputs = [None] * len(inputs)
+        self.available = False
+
+        def run_shard(number: int, offset: int, shard: list):
+            done = 0
+            try:
+                if self.is_batch():
+                    results = self.run_batch_file(shard, timeout, f"inputs_{number}.mdt")
+                    outputs[offset:offset + len(results)] = results
+                    return
+                for input in shard:
+                    outputs[offset + done] = self.run_test(input, timeout)
+                    done += 1
+            except Exception as e:
+                outputs[offset + done] = format_output(stderr=str(RunCodeException(e)))
+                for index in range(offset + done + 1, offset + len(shard)):
+                    outputs[index] = format_output(stderr='Prior execution failed')
+
+        threads = []
+        for number, (offset, shard) in enumerate(split_inputs(inputs, parallelism)):
+            # The shards count their test cases in the progress of the request
+            thread = threading.Thread(target=contextvars.copy_context().run, args=[run_shard, number, offset, shard], daemon=True)
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.available = True
+        return outputs
+
+    async def run_code_async(self, input: list, timeout: int = 60) -> dict:
+        '''
+        Coroutine version of run_code, used by the asyncio engine of ContainerManager
+        '''
+        try:
+            self.available = False
+            output = await self.run_test_async(input, timeout)
             self.available = True
-            exec_logger.info(f"Test instance done: {self.index}")
             return output
         except Exception as e:
             self.available = True
             raise RunCodeException(e)
 
+    async def run_test_async(self, input: list, timeout: int = 60) -> dict:
+        '''
+        Runs a single test case as a coroutine when the podman backend supports it.
+        Workers and blocking backends run on a thread, so the event loop is never blocked
+        '''
+        if self.is_worker() or not hasattr(self.podman, "exec_command_async"):
+            return await asyncio.to_thread(self.run_test, input, timeout)
+        command = self.generate_run_command(input=input)
+        output = await self.podman.exec_command_async(f'container_{self.index}', command, metrics=True, timeout=timeout)
+        track_tests()
+        return output
+
+    async def run_parallel_async(self, inputs: list, timeout: int = 60, parallelism: int = 1) -> list:
+        '''
+        Coroutine version of run_parallel, every shard is a task instead of a thread
+        '''
+        outputs = [None] * len(inputs)
+        self.available = False
+
+        async def run_shard(number: int, offset: int, shard: list):
+            done = 0
+            try:
+                if self.is_batch():
+                    results = await asyncio.to_thread(self.run_batch_file, shard, timeout, f"inputs_{number}.mdt")
+                    outputs[offset:offset + len(results)] = results
+                    return
+                for input in shard:
+                    outputs[offset + done] = await self.run_test_async(input, timeout)
+                    done += 1
+            except Exception as e:
+                outputs[offset + done] = format_output(stderr=str(RunCodeException(e)))
+                for index in range(offset + done + 1, offset + len(shard)):
+                    outputs[index] = format_output(stderr='Prior execution failed')
+
+        await asyncio.gather(*[run_shard(number, offset, shard) for number, (offset, shard) in enumerate(split_inputs(inputs, parallelism))])
+        self.available = True
+        return outputs
+
+    def run_worker(self, input: list, timeout: int = 60) -> dict:
+        '''
+        Sends a test case to the worker process of the container, starting it if needed.
+        A worker that fails or times out is discarded, so the next test case starts a fresh one
+        '''
+        worker = self.get_worker()
+        try:
+            response = worker.request(encode_batch_input([input]).rstrip("\n"), timeout)
+            frame = decode_batch_frame(response)
+            if frame is None:
+                raise WorkerException(f"Worker sent an invalid answer: {response}")
+        except Exception:
+            self.stop_worker(worker)
+            raise
+        finally:
+            self.release_worker(worker)
+        return self.frame_to_output(frame, {})
+
+    def get_worker(self) -> Worker:
+        '''
+        Returns a running worker that is not answering another test case, starting one if there is none
+        '''
+        with self.worker_lock:
+            self.workers = [worker for worker in self.workers if worker in self.busy_workers or worker.is_alive()]
+            for worker in self.workers:
+                if worker not in self.busy_workers:
+                    self.busy_workers.add(worker)
+                    return worker
+        worker = self.start_worker()
+        with self.worker_lock:
+            self.busy_workers.add(worker)
+        return worker
+
+    def release_worker(self, worker: Worker) -> None:
+        '''
+        Marks a worker as free to answer the next test case
+        '''
+        with self.worker_lock:
+            self.busy_workers.discard(worker)
+
+    def start_worker(self) -> Worker:
+        '''
+        Starts the injected worker harness inside the container. It loads the user code once and then answers test cases
+        '''
+        function_name = self.metadata['signature']['name'] + "_injected"
+        command = self.language.generate_worker_command(function_name)
+        process = self.podman.open_process(f'container_{self.index}', command)
+        worker = Worker(process, self.get_injected_source())
+        with self.worker_lock:
+            self.workers.append(worker)
+        try:
+            self.load_worker(worker)
+        except Exception:
+            self.stop_worker(worker)
+            raise
+        logger.debug(f"Container start_worker: Started worker on container {self.index}")
+        return worker
+
+    def load_worker(self, worker: Worker, timeout: int = 60) -> None:
+        '''
+        Makes a resident worker (i.e. the JVM runner) load the compiled code, running the optional JIT warmup per test case.
+        Workers of interpreted languages load the code when they start, so there is nothing to send
+        '''
+        function_name = self.metadata['signature']['name'] + "_injected"
+        message = self.language.generate_worker_load(function_name, int(self.metadata.get('jit_warmup', 0) or 0))
+        if message:
+            response = worker.request(message, timeout)
+            if response != "OK":
+                raise WorkerException(response)
+        worker.source = self.get_injected_source()
+
+    def stop_workers(self) -> None:
+        '''
+        Stops all worker processes of the container
+        '''
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+    def stop_worker(self, worker: Worker) -> None:
+        '''
+        Stops a single worker, used when it failed or timed out so the next test case starts a fresh one
+        '''
+        worker.stop()
+        with self.worker_lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+    def refresh_workers(self) -> None:
+        '''
+        Keeps the running workers only if they have loaded exactly the code that was just injected.
+        This way rerunning unchanged code skips the interpreter startup and the import of the user code.
+        Resident workers reload the new code instead of being restarted, called after compiling
+        '''
+        if not self.workers:
+            return
+        source = self.get_injected_source()
+        if not self.is_worker():
+            self.stop_workers()
+            return
+        stale = [worker for worker in self.workers if worker.source != source]
+        if not stale:
+            return
+        if not self.language.generate_worker_load("", 0):
+            self.stop_workers()
+            return
+        try:
+            for worker in stale:
+                self.load_worker(worker)
+        except Exception as e:
+            logger.debug(f"Container refresh_workers: {str(e)}")
+            self.stop_workers()
+
+    def get_injected_source(self) -> str:
+        '''
+        Reads the injected file from the mounting folder
+        '''
+        try:
+            function_name = self.metadata['signature']['name']
+            file_name = os.path.join(self.mounting_path, f"{function_name}_injected.{self.language.get_extension()}")
+            with open(file_name, "r") as file:
+                return file.read()
+        except Exception:
+            return ""
+
+    def run_batch(self, inputs: list, timeout: int = 60) -> list:
+        '''
+        Function that runs all test cases inside a container with a single program invocation.
+        The batch harness reads every input from a file and reports framed results with per test case timing.
+        Called from ContainerManager class
+        '''
+        if not self.is_batch():
+            return [self.run_code(input, timeout) for input in inputs]
+        try:
+            self.available = False
+            outputs = self.run_batch_file(inputs, timeout)
+            self.available = True
+            return outputs
+        except Exception as e:
+            self.available = True
+            raise RunCodeException(e)
+
+    def run_batch_file(self, inputs: list, timeout: int = 60, input_file: str = BATCH_INPUT_FILE) -> list:
+        '''
+        Writes the test cases to an input file, uploads it and runs the batch harness on it
+        '''
+        input_path = os.path.join(self.mounting_path, input_file)
+        with open(input_path, "w", encoding="utf-8") as file:
+            file.write(encode_batch_input(inputs))
+        if not self.mount_code:
+            self.podman.copy_to_container(input_path, f'container_{self.index}')
+        command = self.generate_run_command(input=[input_file])
+        output = self.podman.exec_command(f'container_{self.index}', command, metrics=True, timeout=timeout * max(len(inputs), 1))
+        outputs = self.split_batch_output(output, len(inputs))
+        track_tests(len(outputs))
+        return outputs
+
+    def split_batch_output(self, output: dict, count: int) -> list:
+        '''
+        Splits the output of a batch run into one output per test case, matching the output of run_code.
+        Test cases that were not reported by the harness (e.g. the program crashed) get the stderr of the whole run
+        '''
+        frames = decode_batch_output(output['stdout'])
+        metrics = output.get('metrics', {})
+        outputs = []
+        for index in range(count):
+            frame = frames.get(index)
+            if frame is None:
+                error = "\n".join(output['stderr']) or "Batch execution did not report this test case"
+                outputs.append(format_output(stderr=error))
+                continue
+            outputs.append(self.frame_to_output(frame, metrics))
+        return outputs
+
+    def frame_to_output(self, frame: dict, metrics: dict) -> dict:
+        '''
+        Converts a frame reported by a harness to the output format of run_code
+        '''
+        return {
+            "stdout": frame['stdout'].splitlines(),
+            "stderr": frame['stderr'].splitlines(),
+            "metrics": self.get_case_metrics(metrics, frame)
+        }
+
+    def get_case_metrics(self, metrics: dict, frame: dict) -> dict:
+        '''
+        Builds the metrics of a single test case from the metrics of the batch run and the timing reported by the harness
+        '''
+        case_metrics = dict(metrics)
+        case_metrics.setdefault('Percent of CPU this job got', '0%')
+        case_metrics.setdefault('Maximum resident set size (kbytes)', '0')
+        case_metrics['Elapsed (wall clock) time (h:mm:ss or m:ss)'] = format_elapsed(frame['elapsed'])
+        if frame['memory'] > 0:
+            case_metrics['Maximum resident set size (kbytes)'] = str(frame['memory'])
+        case_metrics['Exit status'] = str(frame['status'])
+        return case_metrics
+
     def compile_code(self):
         '''
         Generates command to compile code inside of container.
@@ -109,13 +441,71 @@ class Container:
         try:
             self.available = False
             command = self.generate_compile_command()
-            output = self.podman.exec_command(f'container_{self.index}', command)
+            if self.language.is_compiled():
+                output = self.compile_cached(command)
+            else:
+                output = self.run_compile(command)
             self.available = True
             return output
         except Exception as e:
             self.available = True
             raise CompileCodeException(e)
 
+    def compile_cached(self, command: list) -> dict:
+        '''
+        Restores the compiled files when the same code was compiled before in the same environment,
+        otherwise compiles the code and stores the compiled files
+        '''
+        environment = dict(self.get_environment(), base_image=self.base_image)
+        key = self.compile_cache.get_key(self.mounting_path, command, environment)
+        archive = self.compile_cache.get(key)
+        if archive is not None:
+            logger.info(f"Container compile_cached: Reusing compiled code for container {self.index}")
+            self.restore_compiled(archive)
+            return {"stdout": [], "stderr": []}
+        output = self.run_compile(command)
+        try:
+            self.compile_cache.put(key, self.download_workspace(), self.compile_cache.get_sources(self.mounting_path))
+        except Exception as e:
+            logger.warning(f"Container compile_cached: Failed to cache compiled code: {str(e)}")
+        return output
+
+    def run_compile(self, command: list) -> dict:
+        '''
+        Runs the compile command, on the resident compiler of the language when it has one
+        '''
+        service = self.language.generate_compiler_command()
+        if not service:
+            return self.podman.exec_command(f'container_{self.index}', command)
+        if self.compiler is None or not self.compiler.is_alive():
+            self.compiler = Worker(self.podman.open_process(f'container_{self.index}', service))
+        # The service gets the arguments of the compiler, without the name of the compiler
+        response = self.compiler.request("\t".join(command[1:]))
+        status, _, diagnostics = response.partition("\t")
+        if status != "0":
+            raise CompileCodeException(diagnostics)
+        return {"stdout": [], "stderr": diagnostics.splitlines()}
+
+    def stop_compiler(self) -> None:
+        if self.compiler is not None:
+            self.compiler.stop()
+            self.compiler = None
+
+    def download_workspace(self) -> bytes:
+        '''
+        Returns the files of the working directory of the container as a tar archive
+        '''
+        if self.mount_code:
+            return self.podman.make_archive([(os.path.join(self.mounting_path, file), file) for file in os.listdir(self.mounting_path)])
+        return self.podman.download_archive(f'container_{self.index}', f"{APP_PATH}/.")
+
+    def restore_compiled(self, archive: bytes) -> None:
+        if self.mount_code:
+            with tarfile.open(fileobj=io.BytesIO(archive)) as compiled:
+                compiled.extractall(self.mounting_path, filter="data")
+        else:
+            self.podman.send_archive(archive, f'container_{self.index}')
+
     def generate_run_command(self, input: list ) -> str :
         '''
         Generates the run command used to run the code
@@ -142,23 +532,30 @@ class Container:
         Deletes the container, its associated image, and the folder on which the container was mounted.
         '''
         try:
+            self.stop_workers()
+            self.stop_compiler()
             self.podman.stop_container(f'container_{self.index}')
             self.podman.remove_container(f'container_{self.index}')
-            self.podman.remove_image(f'image_{self.index}', f'image_tag_{self.index}')
+            # The image is kept for the next container with the same environment, the image cache removes it when unused
+            if self.image_tag is not None:
+                self.image_cache.release(self.image_tag)
             self.remove_folder()
         except Exception as e:
             raise TerminateException(e)
 
     def clear(self) -> None:
         '''
-        Used to delete the code file inside the container, needed for when inputting new code
+        Used to delete the code file inside the container, needed for when inputting new code.
+        The workspace is wiped with a single execution, however many files the previous code left behind
         '''
         try:
             self.available = False
-            output = self.podman.exec_command(f'container_{self.index}', ['ls'])
-            for file in output['stdout']:
-                self.podman.exec_command(f'container_{self.index}', ['rm', file])
-            self.remove_folder()
+            if self.mount_code:
+                # The container sees the session folder, which has to stay in place for the mount to keep working
+                self.empty_folder()
+            else:
+                self.podman.exec_command(f'container_{self.index}', ['find', APP_PATH, '-mindepth', '1', '-delete'])
+                self.remove_folder()
             self.available = True
         except Exception as e:
             raise ClearException(e)
@@ -177,6 +574,17 @@ class Container:
         except Exception as e:
             raise OSError("Failed to remove folder")
 
+    def empty_folder(self) -> None:
+        '''
+        Removes the files in the folder where the container was mounted on, keeping the folder
+        '''
+        for file in os.listdir(self.mounting_path):
+            file_path = os.path.join(self.mounting_path, file)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path, ignore_errors=True)
+            else:
+                os.remove(file_path)
+
     def inject(self) -> None:
         '''
         Injects user code into a main function with necessary inputs used to run
@@ -202,7 +610,12 @@ class Container:
             file.write(code)
         dest_path = os.path.join(self.mounting_path, f"{function_name}_injected.{self.language.get_extension()}")
         # Create injected file
-        self.language.inject(file_name, dest_path, signature)
+        if self.is_worker():
+            self.language.inject_worker(file_name, dest_path, signature)
+        elif self.is_batch():
+            self.language.inject_batch(file_name, dest_path, signature)
+        else:
+            self.language.inject(file_name, dest_path, signature)
         # Remove basic file
         if os.path.exists(file_name):
             os.remove(file_name)
@@ -220,11 +633,10 @@ class Container:
             self.copy_helper_files()
             self.upload_code()
             self.compile_code()
+            self.refresh_workers()
             self.available = True
-            exec_logger.info(f"Dockerfile done: {self.index}")
-            exec_logger.info(f"Inject done: {self.index}")
-            exec_logger.info(f"Build done: {self.index}")
-            exec_logger.info(f"Run done: {self.index}")
+            for stage in (DOCKERFILE, INJECT, BUILD, RUN):
+                track_stage(stage)
         except (ClearException, ChangeCodeException) as e:
             raise ContainerFileCommunicationException(e)
         except Exception as e:
@@ -233,13 +645,24 @@ class Container:
 
     def upload_code(self) -> None:
         '''
-        Uploads new user code to container
+        Uploads new user code to container. A mounted container already sees the files
         '''
-        files = os.listdir(self.mounting_path)
-        for file in files:
-            self.podman.copy_to_container(os.path.join(self.mounting_path, file), f"container_{self.index}")
+        if self.mount_code:
+            return
+        self.podman.upload_folder(self.mounting_path, f"container_{self.index}")
 
 
+    def get_environment(self) -> dict:
+        '''
+        The settings that decide the image of the container
+        '''
+        return {
+            "language": self.metadata['language'],
+            "version": self.metadata['version'],
+            "compiler": self.metadata['compiler'],
+            "specs": self.metadata['specs']
+        }
+
     def set_metadata(self, metadata: dict) -> None:
         '''
         Sets the new metadata for the container.
@@ -259,6 +682,18 @@ class Container:
         '''
         self.available = available
 
+    def is_batch(self) -> bool:
+        '''
+        Checks if the code is injected with the batch harness. Code that is run as is cannot be wrapped in a harness
+        '''
+        return bool(self.metadata.get('batch', False)) and not self.run_as_is and not self.is_worker() and self.language.supports_batch()
+
+    def is_worker(self) -> bool:
+        '''
+        Checks if the code is injected with the worker harness, which keeps the program running between test cases
+        '''
+        return bool(self.metadata.get('worker', False)) and not self.run_as_is and self.language.supports_worker()
+
     def set_run_as_is(self, run_as_is: bool) -> None:
         '''
         Setter run_as_is flag
@@ -286,3 +721,27 @@ def format_output(stdout: str = "", stderr: str = "") -> dict:
         "stdout": [stdout],
         "stderr": [stderr]
     }
+
+def split_inputs(inputs: list, shards: int) -> list:
+    '''
+    Splits the inputs in at most shards contiguous parts of almost equal size, returned with the offset of their first input
+    '''
+    shards = max(1, min(shards, len(inputs)))
+    size, extra = divmod(len(inputs), shards)
+    parts = []
+    offset = 0
+    for number in range(shards):
+        length = size + (1 if number < extra else 0)
+        parts.append((offset, inputs[offset:offset + length]))
+        offset += length
+    return parts
+
+def format_elapsed(nanoseconds: int) -> str:
+    '''
+    format elapsed nanoseconds to match the wall clock time output of 'time'
+    '''
+    minutes, seconds = divmod(nanoseconds / 1e9, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:09.6f}"
+    return f"{minutes}:{seconds:09.6f}"
\ No newline at end of file
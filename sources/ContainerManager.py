@@ -14,44 +14,129 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
-import sys, time, threading, os, re
+import sys, time, threading, os, re, asyncio, contextvars
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(parent_dir)
 
-from sources.Container import Container, format_output
-from queue import Queue
+from sources.Container import Container, format_output, split_inputs
+from queue import Queue, Empty
 from sources.CustomException import *
 from sources.LoggerConfig import logger
 from sources.DockerMaker import EXECUTION_PATH
+from sources.ResultCache import ResultCache, result_cache
+from sources.ConcurrencyController import ConcurrencyController, concurrency_controller
+from sources.ProgressTracker import track_tests, track_cell
+from sources.FileLock import FileLock, LOCK_FOLDER
 
+# Number of containers when the limit is not adapted to the host
 MAX_CONTAINERS = 4
+# A cell is only split across containers when every container gets at least this many test cases,
+# smaller suites do not make up for building the extra containers
+MIN_SHARD_INPUTS = 100
+# Highest number of shards a cell may run at the same time inside its container, higher parallelism values are lowered to it
+MAX_PARALLELISM = 16
+# Containers that are built in the background when the server starts, so the first cells do not wait for a build.
+# Comma separated entries of language[:version][/compiler] xcount, e.g. "python:3.10 x2, cpp/gcc x2"
+WARM_POOL = ""
+# Held by the worker process of the production server that builds the warm containers
+WARM_POOL_LOCK_FILE = os.path.join(LOCK_FOLDER, "warm_pool.lock")
+# Seconds a cell waits before trying again when every container is busy
+NO_CONTAINER_WAIT = 0.1
+# Next container index of the worker processes of the production server
+CONTAINER_INDEX_FILE = os.path.join(LOCK_FOLDER, "container_index")
 
 index_lock = threading.RLock()
+
+class IndexAllocator:
+    '''
+    Hands out container indices. Container managers that share an allocator never use the same container name or session folder
+    '''
+    def __init__(self, start: int = 0):
+        self.next_index = start
+        self.lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self.lock:
+            index = self.next_index
+            self.next_index += 1
+            return index
+
+class FileIndexAllocator(IndexAllocator):
+    '''
+    Hands out container indices to every process that uses the same file, i.e. the workers of the production server
+    '''
+    def __init__(self, path: str = CONTAINER_INDEX_FILE, start: int = 0):
+        self.path = path
+        self.start = start
+        self.lock = FileLock(path + ".lock")
+
+    def read(self) -> int:
+        try:
+            with open(self.path, "r") as file:
+                return int(file.read().strip())
+        except (OSError, ValueError):
+            return self.start
+
+    def write(self, index: int) -> None:
+        with open(self.path, "w") as file:
+            file.write(str(index))
+
+    def allocate(self) -> int:
+        with self.lock:
+            index = self.read()
+            self.write(index + 1)
+            return index
+
+    def reset(self) -> None:
+        '''
+        Starts the indices over, called once before the workers start
+        '''
+        with self.lock:
+            self.write(self.start)
+
 class ContainerManager:
     '''
     Class to handle containers
     '''
-    def __init__(self, container_class: Container = Container):
+    def __init__(self, container_class: Container = Container, engine: str = "threads", pool_spec: str = None, result_cache: ResultCache = result_cache,
+                 concurrency: ConcurrencyController = concurrency_controller, index_allocator: IndexAllocator = None,
+                 pool_source: "ContainerManager" = None):
         self.containers = {}
         self.last_index = 0
         self.container_class = container_class
         self.container_count = 0
-
-    def add_container(self, metadata: dict, run_as_is: bool = False) -> int:
+        # "threads" runs every cell on its own thread, "asyncio" runs cells and test cases as coroutines
+        self.engine = engine
+        self.pool = parse_pool_spec(WARM_POOL if pool_spec is None else pool_spec)
+        # Indices of the warm containers that were not claimed by a cell yet
+        self.pool_indices = set()
+        self.pool_thread = None
+        # Container manager whose warm containers the cells may claim too, i.e. the one of the default session
+        self.pool_source = pool_source
+        # Indices of the containers running the test cases of a cell, never removed or given to another cell
+        self.in_use = set()
+        # Outputs of test cases that ran before, None disables the cache
+        self.result_cache = result_cache
+        # Adapts the number of containers to the host, None keeps it at MAX_CONTAINERS
+        self.concurrency = concurrency
+        self.max_containers = concurrency.initial_limit() if concurrency is not None else MAX_CONTAINERS
+        # Shared with the container managers of other sessions, None numbers the containers from last_index
+        self.index_allocator = index_allocator
+
+    def add_container(self, metadata: dict, run_as_is: bool = False, claim: bool = False) -> int:
         '''
         function to create new container. we store in the container dict some metadata so we can check
-        later if a user code can be put in an already existing container
+        later if a user code can be put in an already existing container. claim marks the container in use by the cell that adds it
         '''
 
         timestamp = time.time()
-        if self.container_count >= MAX_CONTAINERS:
+        if self.container_count >= self.max_containers:
             index_lock.release()
             raise RuntimeError("Maximum number of containers reached")
 
-        index = self.last_index
-        self.last_index += 1
+        index = self.allocate_index()
         self.container_count+=1
 
         index_lock.release()
@@ -66,9 +151,41 @@ class ContainerManager:
             raise InitContainerException(e)
         with index_lock:
             self.containers[index] = (container, environment, timestamp)
+            if claim:
+                self.in_use.add(index)
+
+        return index
+
+    def release_container(self, index: int) -> None:
+        '''
+        The cell is done with the container, which may be given to another cell or removed from then on
+        '''
+        with index_lock:
+            self.in_use.discard(index)
 
+    def allocate_index(self) -> int:
+        if self.index_allocator is not None:
+            return self.index_allocator.allocate()
+        index = self.last_index
+        self.last_index += 1
         return index
 
+    def trim_containers(self, limit: int, count: int = None) -> int:
+        '''
+        Removes the least recently used available containers while there are more than limit, at most count of them.
+        Containers running test cases are kept. Returns the number of removed containers
+        '''
+        removed = 0
+        with index_lock:
+            while self.container_count > limit and (count is None or removed < count):
+                try:
+                    container = self.get_oldest_container()
+                except NoContainerException:
+                    break
+                container.terminate()
+                removed += 1
+        return removed
+
     def remove_folder(self, index : int) -> None:
         path = os.path.join(EXECUTION_PATH,f"{index}")
         try:
@@ -89,84 +206,325 @@ class ContainerManager:
         if no, it tries to find the oldest
         container that is not being used, it removes it and creates a new container to run the code in.
         '''
+        outputs, _ = self.execute_inputs(data, inputs, timeout, run_as_is)
+        return outputs
+
+    def execute_inputs(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_case = None) -> tuple:
+        '''
+        Same as execute, but also returns the position of the test case that failed, or None when no test case failed.
+        Used to merge the shards of a cell like they were run sequentially.
+        Test cases with a cached output are not run again, when all of them are cached no container is used.
+        on_case is called with the position and the output of every test case, as soon as it ran
+        '''
+        keys, cached = self.get_cached_outputs(data, inputs, run_as_is)
+        missing = [position for position, output in enumerate(cached) if output is None]
+        track_tests(len(inputs) - len(missing))
+        reported = set()
+        on_output = self.get_case_reporter(on_case, missing, reported)
+        results, failed = self.run_inputs(data, [inputs[position] for position in missing], timeout, run_as_is, on_output) if missing else ([], None)
+        self.observe_outputs(results)
+        outputs, failed = self.merge_cached(keys, cached, missing, results, failed, inputs)
+        self.report_remaining(on_case, outputs, reported)
+        return outputs, failed
+
+    async def execute_inputs_async(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_case = None) -> tuple:
+        '''
+        Coroutine version of execute_inputs
+        '''
+        keys, cached = self.get_cached_outputs(data, inputs, run_as_is)
+        missing = [position for position, output in enumerate(cached) if output is None]
+        track_tests(len(inputs) - len(missing))
+        reported = set()
+        on_output = self.get_case_reporter(on_case, missing, reported)
+        results, failed = await self.run_inputs_async(data, [inputs[position] for position in missing], timeout, run_as_is, on_output) if missing else ([], None)
+        self.observe_outputs(results)
+        outputs, failed = self.merge_cached(keys, cached, missing, results, failed, inputs)
+        self.report_remaining(on_case, outputs, reported)
+        return outputs, failed
+
+    def get_case_reporter(self, on_case, missing: list, reported: set):
+        '''
+        Maps the positions of the test cases that run to their positions in the inputs of execute_inputs
+        '''
+        if on_case is None:
+            return None
+        def on_output(position: int, output: dict):
+            reported.add(missing[position])
+            self.report_case(on_case, missing[position], output)
+        return on_output
+
+    def report_remaining(self, on_case, outputs: list, reported: set) -> None:
+        '''
+        Reports the cached test cases and the test cases that did not run because of a failure
+        '''
+        if on_case is None:
+            return
+        for position, output in enumerate(outputs):
+            if position not in reported:
+                self.report_case(on_case, position, output)
+
+    def report_case(self, on_case, position: int, output: dict) -> None:
+        try:
+            on_case(position, output)
+        except Exception as e:
+            logger.warning(f"Container Manager report_case: {str(e)}")
+
+    def adjust_limit(self) -> int:
+        '''
+        Updates the number of containers from the memory and load of the host, returns the new limit
+        '''
+        if self.concurrency is not None:
+            self.max_containers = self.concurrency.adjust(self.container_count)
+        return self.max_containers
+
+    def observe_outputs(self, outputs: list) -> None:
+        if self.concurrency is not None and outputs:
+            self.concurrency.observe(outputs)
+
+    def get_cached_outputs(self, data: dict, inputs: list, run_as_is: bool = False) -> tuple:
+        '''
+        Returns the cache keys of the test cases and their cached outputs, None for the test cases that have to run.
+        Cells with use_cache set to false always run
+        '''
+        if self.result_cache is None or not data.get("use_cache", True):
+            return [], [None] * len(inputs)
+        try:
+            cell_key = self.result_cache.get_cell_key(data, run_as_is)
+            keys = [self.result_cache.get_key(cell_key, input) for input in inputs]
+            found = self.result_cache.get_many(keys)
+            return keys, [found.get(key) for key in keys]
+        except Exception as e:
+            logger.warning(f"Container Manager get_cached_outputs: {str(e)}")
+            return [], [None] * len(inputs)
+
+    def merge_cached(self, keys: list, cached: list, missing: list, results: list, failed: int, inputs: list) -> tuple:
+        '''
+        Puts the outputs of the test cases that ran between the cached outputs and caches them.
+        Outputs of failed executions are not cached, and the test cases after a failure are reported as not run,
+        like in a sequential run. Outputs without metrics are errors reported as outputs, e.g. a timeout of a shard, and are not cached either
+        '''
+        if keys:
+            ran = results if failed is None else results[:failed]
+            try:
+                self.result_cache.put_many({keys[position]: {name: value for name, value in output.items() if name != 'input'}
+                                            for position, output in zip(missing, ran) if 'metrics' in output})
+            except Exception as e:
+                logger.warning(f"Container Manager merge_cached: {str(e)}")
+        outputs = list(cached)
+        for position, output in zip(missing, results):
+            outputs[position] = output
+        if failed is not None:
+            failed = missing[failed]
+            for position in range(failed + 1, len(inputs)):
+                error_case = format_output(stderr='Prior execution failed')
+                error_case['input'] = inputs[position]
+                outputs[position] = error_case
+        ran_positions = set(missing)
+        for position, output in enumerate(outputs):
+            if position not in ran_positions:
+                outputs[position] = dict(output, input=inputs[position])
+        return outputs, failed
+
+    def run_inputs(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_output = None) -> tuple:
+        '''
+        Runs the test cases in a container, returns the outputs and the position of the test case that failed
+        '''
         environment = self.get_environment(data)
-        container_to_remove = None
-        with index_lock:
-            index = self.check_containers(environment)
         outputs = []
-        i = 0
+        index = None
         try:
-            if index != -1:
-                container, _, __ = self.containers[index]
-                container.set_metadata(data)
-                container.set_run_as_is(run_as_is)
-                container.change_code()
-            else:
-                index_lock.acquire()
-                logger.debug(f"Container Manager execute: Found {self.container_count}")
-
-                if self.container_count >= MAX_CONTAINERS:
-                    container_to_remove = self.get_oldest_container()
-                    if container_to_remove is not None:
-                        container_to_remove.terminate()
-
-                index = self.add_container(metadata=data, run_as_is=run_as_is)
-                container, _, __ = self.containers[index]
-                container.compile_code()
-            while i < len(inputs):
-                input = inputs[i]
-                output = container.run_code(input, timeout)
-                output['input'] = input
-                outputs.append(output)
-                i += 1
+            parallelism = get_parallelism(data)
+            index, container = self.prepare_container(data, environment, run_as_is)
+            results = []
+            if parallelism > 1:
+                # Test cases are split in shards that run at the same time inside the container
+                results = container.run_parallel(inputs, timeout, parallelism)
+            elif data.get("batch", False):
+                # All test cases are run by a single program invocation
+                results = container.run_batch(inputs, timeout)
+            self.add_outputs(outputs, results, inputs, on_output)
+            while len(outputs) < len(inputs):
+                output = container.run_code(inputs[len(outputs)], timeout)
+                self.add_outputs(outputs, [output], inputs, on_output)
+            self.containers[index] = (container, environment, time.time())
+            return outputs, None
+
+        except NoContainerException as e:
+            raise NoContainerException(e)
+        except Exception as e:
+            return self.fail_outputs(e, outputs, inputs)
+        finally:
+            if index is not None:
+                self.release_container(index)
+
+    async def run_inputs_async(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_output = None) -> tuple:
+        '''
+        Coroutine version of run_inputs. Preparing the container is blocking work and runs on a thread,
+        the test cases run as coroutines
+        '''
+        environment = self.get_environment(data)
+        outputs = []
+        index = None
+        try:
+            parallelism = get_parallelism(data)
+            index, container = await asyncio.to_thread(self.prepare_container, data, environment, run_as_is)
+            results = []
+            if parallelism > 1:
+                results = await container.run_parallel_async(inputs, timeout, parallelism)
+            elif data.get("batch", False):
+                results = await asyncio.to_thread(container.run_batch, inputs, timeout)
+            self.add_outputs(outputs, results, inputs, on_output)
+            while len(outputs) < len(inputs):
+                output = await container.run_code_async(inputs[len(outputs)], timeout)
+                self.add_outputs(outputs, [output], inputs, on_output)
             self.containers[index] = (container, environment, time.time())
-            return outputs
+            return outputs, None
 
         except NoContainerException as e:
             raise NoContainerException(e)
         except Exception as e:
-            if isinstance(e, ContainerFileCommunicationException):
+            return self.fail_outputs(e, outputs, inputs)
+        finally:
+            if index is not None:
+                self.release_container(index)
+
+    def prepare_container(self, data: dict, environment: dict, run_as_is: bool = False) -> tuple:
+        '''
+        Puts the code in an available container with the same environment, or creates a new container for it,
+        removing the oldest container when the maximum number of containers is reached. Returns the index and the container
+        '''
+        with index_lock:
+            index = self.check_containers(environment)
+            if index == -1:
+                index = self.claim_warm_container(environment)
+            if index != -1:
+                self.in_use.add(index)
+        if index != -1:
+            container, _, __ = self.containers[index]
+            container.set_metadata(data)
+            container.set_run_as_is(run_as_is)
+            try:
+                container.change_code()
+            except ContainerFileCommunicationException:
                 with index_lock:
                     self.containers.pop(index)
+                    self.in_use.discard(index)
                     container.terminate()
                     self.container_count -=1
-            error_case = format_output(stderr=str(e))
-            error_case['input'] = inputs[i]
-            i += 1
+                raise
+            return index, container
+
+        index_lock.acquire()
+        try:
+            logger.debug(f"Container Manager execute: Found {self.container_count}")
+            self.adjust_limit()
+            # The limit may have dropped since the containers were added. Only available containers are removed,
+            # a lower limit never stops the test cases that are running
+            self.trim_containers(self.max_containers - 1)
+            if self.container_count >= self.max_containers:
+                raise NoContainerException("No container available to be removed")
+        except BaseException:
+            index_lock.release()
+            raise
+
+        # add_container releases the lock once the slot is taken
+        index = self.add_container(metadata=data, run_as_is=run_as_is, claim=True)
+        container, _, __ = self.containers[index]
+        try:
+            container.compile_code()
+        except BaseException:
+            self.release_container(index)
+            raise
+        return index, container
+
+    def add_outputs(self, outputs: list, results: list, inputs: list, on_output = None) -> None:
+        '''
+        Appends the outputs of the next test cases, adding the input of every test case to its output
+        '''
+        for output in results:
+            output['input'] = inputs[len(outputs)]
+            outputs.append(output)
+            if on_output is not None:
+                on_output(len(outputs) - 1, output)
+
+    def fail_outputs(self, error: Exception, outputs: list, inputs: list) -> tuple:
+        '''
+        Reports the error for the first test case without output, the test cases after it are reported as not run
+        '''
+        failed = len(outputs)
+        error_case = format_output(stderr=str(error))
+        error_case['input'] = inputs[failed]
+        outputs.append(error_case)
+        while len(outputs) < len(inputs):
+            error_case = format_output(stderr='Prior execution failed')
+            error_case['input'] = inputs[len(outputs)]
             outputs.append(error_case)
-            while len(outputs) < len(inputs):
-                error_case = format_output(stderr='Prior execution failed')
-                error_case['input'] = inputs[i]
-                i += 1
-                outputs.append(error_case)
-            logger.debug(f"Container Manager execute: Prior execution failed")
-            return outputs
+        logger.debug(f"Container Manager execute: Prior execution failed")
+        return outputs, failed
 
-    def execute_parallel(self, options: list, inputs: list, timeout: int) -> list:
+    def execute_parallel(self, options: list, inputs: list, timeout: int, on_cell = None, on_case = None) -> list:
         '''
-        Function to be called by the server. It calls the execute function on separate threads
+        Function to be called by the server. It calls the execute function on separate threads.
+        When there are fewer cells than containers, the test cases of a cell are split across several containers.
+        Results are returned in the order of the options, on_cell is called with the result of every cell as soon as it is done
+        and on_case with the cell id, the position and the output of every test case
         '''
+        if self.engine == "asyncio":
+            return asyncio.run(self.execute_parallel_async(options, inputs, timeout, on_cell, on_case))
         threads = []
-        results = []
+        shard_results = {}
+        limit = self.adjust_limit()
 
         job_queue = Queue()
-        for data in options:
-            job_queue.put((data, inputs))
+        shard_counts = {}
+        for cell, data in enumerate(options):
+            shards = self.split_cell(inputs, len(options))
+            shard_counts[cell] = len(shards)
+            for offset, shard in shards:
+                job_queue.put((cell, offset, data, shard))
+        total_jobs = job_queue.qsize()
+        # One worker per container the cells may use
+        workers = {"active": min(limit, total_jobs)}
+        results_lock = threading.Lock()
+
+        def finish_shard(cell: int, offset: int, result: tuple):
+            with results_lock:
+                shard_results[(cell, offset)] = result
+                done = sum(1 for index, _ in shard_results if index == cell) == shard_counts[cell]
+                cell_shards = {key: value for key, value in shard_results.items() if key[0] == cell}
+            if done:
+                track_cell()
+                self.report_cell(on_cell, cell, options[cell], cell_shards, inputs)
 
         def worker(job_queue: Queue):
-            while not job_queue.empty():
-                data, inputs = job_queue.get()
+            # Workers stay until every job is done, a job may come back to the queue when no container was free
+            while True:
+                with results_lock:
+                    if len(shard_results) == total_jobs:
+                        return
+                try:
+                    cell, offset, data, inputs = job_queue.get(timeout=NO_CONTAINER_WAIT)
+                except Empty:
+                    continue
                 run_as_is = data.get("run_as_is", False)
                 try:
-                    result = self.execute(data, inputs, timeout, run_as_is)
-                    results.append({data['cell_id']: result})
+                    result = self.execute_inputs(data, inputs, timeout, run_as_is, self.get_shard_reporter(on_case, data, offset))
                 except NoContainerException:
-                    job_queue.put((data, inputs))
+                    job_queue.put((cell, offset, data, inputs))
+                    with results_lock:
+                        # The limit dropped below the number of workers, the other workers run the remaining jobs
+                        if workers["active"] > max(self.max_containers, 1):
+                            workers["active"] -= 1
+                            return
+                    time.sleep(NO_CONTAINER_WAIT)
+                    continue
                 except Exception as e:
-                    results.append({data['cell_id']: [format_output(stderr=str(e))]})
+                    result = ([format_output(stderr=str(e))], 0)
+                finish_shard(cell, offset, result)
 
-        for _ in range(MAX_CONTAINERS):
-            thread = threading.Thread(target=worker, args=[job_queue])
+        for _ in range(workers["active"]):
+            # The containers update the progress of the request the workers run for
+            thread = threading.Thread(target=contextvars.copy_context().run, args=[worker, job_queue])
             threads.append(thread)
             thread.setDaemon(True)
             thread.start()
@@ -175,20 +533,188 @@ class ContainerManager:
         for thread in threads:
             thread.join()
 
-        return results
+        return self.merge_results(options, shard_results, inputs)
+
+    async def execute_parallel_async(self, options: list, inputs: list, timeout: int, on_cell = None, on_case = None) -> list:
+        '''
+        Coroutine version of execute_parallel. Every cell or shard is a task instead of a thread,
+        at most max_containers of them use a container at the same time
+        '''
+        semaphore = asyncio.Semaphore(self.adjust_limit())
+        shard_results = {}
+        jobs = [(cell, offset, data, shard) for cell, data in enumerate(options) for offset, shard in self.split_cell(inputs, len(options))]
+        shard_counts = {cell: sum(1 for job in jobs if job[0] == cell) for cell in range(len(options))}
+
+        async def job(cell: int, offset: int, data: dict, inputs: list):
+            run_as_is = data.get("run_as_is", False)
+            async with semaphore:
+                while True:
+                    try:
+                        shard_results[(cell, offset)] = await self.execute_inputs_async(data, inputs, timeout, run_as_is, self.get_shard_reporter(on_case, data, offset))
+                        break
+                    except NoContainerException:
+                        await asyncio.sleep(NO_CONTAINER_WAIT)
+                    except Exception as e:
+                        shard_results[(cell, offset)] = ([format_output(stderr=str(e))], 0)
+                        break
+            cell_shards = {key: value for key, value in shard_results.items() if key[0] == cell}
+            if len(cell_shards) == shard_counts[cell]:
+                track_cell()
+                self.report_cell(on_cell, cell, options[cell], cell_shards, inputs)
+
+        await asyncio.gather(*[job(*arguments) for arguments in jobs])
+        return self.merge_results(options, shard_results, inputs)
+
+    def merge_results(self, options: list, shard_results: dict, inputs: list) -> list:
+        '''
+        Builds the result of every cell from its shards, in the order of the options
+        '''
+        return [self.merge_cell(cell, data, shard_results, inputs) for cell, data in enumerate(options)]
+
+    def merge_cell(self, cell: int, data: dict, shard_results: dict, inputs: list) -> dict:
+        shards = sorted((offset, result) for (index, offset), result in shard_results.items() if index == cell)
+        return {data['cell_id']: self.merge_shards(shards, inputs)}
+
+    def get_shard_reporter(self, on_case, data: dict, offset: int):
+        '''
+        Maps the positions of the test cases of a shard to their positions in the inputs of the cell
+        '''
+        if on_case is None:
+            return None
+        return lambda position, output: on_case(data['cell_id'], offset + position, output)
+
+    def report_cell(self, on_cell, cell: int, data: dict, shard_results: dict, inputs: list) -> None:
+        '''
+        Passes the result of a finished cell to on_cell. A failing callback does not stop the other cells
+        '''
+        if on_cell is None:
+            return
+        try:
+            on_cell(self.merge_cell(cell, data, shard_results, inputs))
+        except Exception as e:
+            logger.warning(f"Container Manager report_cell: {str(e)}")
+
+    def split_cell(self, inputs: list, cells: int) -> list:
+        '''
+        Splits the test cases of a cell in contiguous shards, one per container the cell can use.
+        The containers are shared evenly between the cells, a shard gets at least MIN_SHARD_INPUTS test cases
+        '''
+        shards = max(1, min(self.max_containers // max(cells, 1), len(inputs) // MIN_SHARD_INPUTS))
+        return split_inputs(inputs, shards)
+
+    def merge_shards(self, shards: list, inputs: list) -> list:
+        '''
+        Concatenates the outputs of the shards of a cell in input order. Once a test case failed,
+        the test cases of the following shards are reported as failed, exactly like the sequential run does
+        '''
+        outputs = []
+        failed = False
+        for number, (offset, (shard_outputs, shard_failed)) in enumerate(shards):
+            if not failed:
+                outputs.extend(shard_outputs)
+                failed = shard_failed is not None
+                continue
+            end = shards[number + 1][0] if number + 1 < len(shards) else len(inputs)
+            for input in inputs[len(outputs):end]:
+                error_case = format_output(stderr='Prior execution failed')
+                error_case['input'] = input
+                outputs.append(error_case)
+        return outputs
 
     def check_containers(self, environment: dict) -> int:
         '''
         Function to check if there is an available container with correct environment variables
         '''
         for index, (container, env, _) in self.containers.items():
-            if(env == environment and container.is_available()):
+            if(same_environment(env, environment) and index not in self.in_use and container.is_available()):
                 logger.info(f"Container Manager check_containers: Found available container with index: {index}")
                 # if found an available container, set it to false to avoid race conditions.
                 container.set_available(False)
+                if index in self.pool_indices:
+                    # A warm container was claimed, build its replacement in the background
+                    self.pool_indices.discard(index)
+                    self.refill_pool()
                 return index
         return -1
 
+    def claim_warm_container(self, environment: dict) -> int:
+        '''
+        Takes over a warm container of pool_source with the environment when there is room for it. Returns its index or -1
+        '''
+        if self.pool_source is None or self.pool_source is self or self.container_count >= self.max_containers:
+            return -1
+        warm = self.pool_source.take_warm_container(environment)
+        if warm is None:
+            return -1
+        index, container, timestamp = warm
+        with index_lock:
+            self.containers[index] = (container, environment, timestamp)
+            self.container_count += 1
+        logger.info(f"Container Manager claim_warm_container: Claimed warm container with index: {index}")
+        return index
+
+    def take_warm_container(self, environment: dict):
+        '''
+        Hands an unclaimed warm container with the environment over to another container manager.
+        Returns its index, the container and its timestamp, or None
+        '''
+        with index_lock:
+            for index in list(self.pool_indices):
+                container, env, timestamp = self.containers[index]
+                if same_environment(env, environment) and self.check_container_available(index):
+                    self.containers.pop(index)
+                    self.pool_indices.discard(index)
+                    self.container_count -= 1
+                    break
+            else:
+                return None
+        # Build its replacement in the background
+        self.refill_pool()
+        return index, container, timestamp
+
+    def start_pool(self) -> None:
+        '''
+        Builds the warm containers in the background. Called once podman is initialized
+        '''
+        if self.pool:
+            logger.info(f"Container Manager start_pool: Warming {sum(entry['count'] for entry in self.pool)} containers")
+            self.refill_pool()
+
+    def refill_pool(self) -> None:
+        '''
+        Starts a background thread that builds the missing warm containers, unless one is already running
+        '''
+        if not self.pool or (self.pool_thread is not None and self.pool_thread.is_alive()):
+            return
+        self.pool_thread = threading.Thread(target=self.fill_pool, daemon=True)
+        self.pool_thread.start()
+
+    def fill_pool(self) -> None:
+        '''
+        Builds warm containers until every pool entry has its count of unclaimed containers.
+        Warm containers only take free slots, they never evict containers of cells
+        '''
+        for entry in self.pool:
+            metadata = pool_metadata(entry)
+            environment = self.get_environment(metadata)
+            while True:
+                index_lock.acquire()
+                warm = [index for index in self.pool_indices if same_environment(self.containers[index][1], environment)]
+                if len(warm) >= entry['count'] or self.container_count >= self.max_containers:
+                    index_lock.release()
+                    break
+                try:
+                    # add_container releases the lock once the slot is taken
+                    index = self.add_container(metadata=pool_metadata(entry), run_as_is=True)
+                except Exception as e:
+                    logger.warning(f"Container Manager fill_pool: Failed to warm {entry['language']} container: {str(e)}")
+                    break
+                with index_lock:
+                    # A cell may have claimed the container as soon as it was added
+                    if self.containers[index][0].is_available():
+                        self.pool_indices.add(index)
+                logger.info(f"Container Manager fill_pool: Warm {entry['language']} container ready with index: {index}")
+
     def get_environment(self, metadata: dict) -> dict:
         '''
         helper function to extract environment data relevant for the container from data
@@ -210,7 +736,7 @@ class ContainerManager:
         Helper function to check if a specific container is available
         '''
         container = self.containers.get(index)[0]
-        return container.is_available()
+        return index not in self.in_use and container.is_available()
 
     def get_oldest_container(self) -> None:
         '''
@@ -228,6 +754,9 @@ class ContainerManager:
         container, _ , __ = self.containers.pop(index_to_remove)
         container.set_available(False)
         self.container_count-=1
+        if index_to_remove in self.pool_indices:
+            self.pool_indices.discard(index_to_remove)
+            self.refill_pool()
         return container
 
     def purge(self) -> None:
@@ -239,32 +768,62 @@ class ContainerManager:
             container.terminate()
         self.containers = {}
         self.container_count=0
+        self.pool_indices = set()
+        self.in_use = set()
 
-    def calculate_status(self) -> float:
-        '''
-        Function to approximate completion rate of execution
-        Looks at the exec.log and looks at logs that show what stages were completed
-        '''
-        status  = 0
-        filename = 'exec.log'
-        with open(filename, 'r') as file:
-            content = file.read()
-
-        code_cells_match = re.search(r"Code cells:\s*(\d+)", content)
-        total_test_cases_match = re.search(r"Total test cases:\s*(\d+)", content)
-
-        code_cells = int(code_cells_match.group(1)) if code_cells_match else None
-        total_test_cases = int(total_test_cases_match.group(1)) if total_test_cases_match else None
-
-        dockers_done = content.count('Dockerfile')
-        status += 0.1 * dockers_done / code_cells
-        injects_done = content.count('Inject')
-        status += 0.1 * injects_done / code_cells
-        builds_done = content.count('Build')
-        status += 0.25 * builds_done / code_cells
-        runs_done = content.count('Run image')
-        status += 0.1 * runs_done / code_cells
-        tests_done = content.count('Test')
-        status += 0.45 * tests_done / code_cells / total_test_cases
-        return status
-
+def get_parallelism(data: dict) -> int:
+    '''
+    Number of shards of a cell running at the same time inside its container, at most MAX_PARALLELISM
+    '''
+    value = data.get("parallelism")
+    if value is None:
+        return 1
+    try:
+        parallelism = int(value)
+    except (TypeError, ValueError):
+        parallelism = 0
+    if parallelism < 1:
+        raise ValueError(f"Parallelism needs to be at least 1, got {value!r}")
+    return min(parallelism, MAX_PARALLELISM)
+
+def parse_pool_spec(spec: str) -> list:
+    '''
+    Parses a warm pool specification like "python:3.10 x2, cpp/gcc x2" into a list of entries
+    '''
+    pool = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        match = re.fullmatch(r"([^\s:/]+)(?::([^\s/]+))?(?:/(\S+))?(?:\s+x(\d+))?", item)
+        if match is None:
+            raise WarmPoolException(f"Invalid warm pool entry: {item}")
+        language, version, compiler, count = match.groups()
+        pool.append({
+            "language": language,
+            "version": version or "",
+            "compiler": compiler or "",
+            "count": int(count) if count else 1
+        })
+    return pool
+
+def pool_metadata(entry: dict) -> dict:
+    '''
+    Metadata of a warm container. It runs no code until a cell claims it
+    '''
+    return {
+        "cell_id": None,
+        "code": "",
+        "signature": {},
+        "language": entry['language'],
+        "version": entry['version'],
+        "compiler": entry['compiler'],
+        "specs": []
+    }
+
+def same_environment(first: dict, second: dict) -> bool:
+    '''
+    Checks if two environments can share a container. Languages are not case sensitive and missing specs are all the same
+    '''
+    return first['language'].lower() == second['language'].lower() and first['version'] == second['version'] \
+        and first['compiler'] == second['compiler'] and (first['specs'] or []) == (second['specs'] or [])
@@ -115,4 +115,48 @@ class LanguageNotFoundException(Exception):
 
 class ContainerFileCommunicationException(Exception):
     def __init__(self, *args):
-        super().__init__(*args)
\ No newline at end of file
+        super().__init__(*args)
+
+class WorkerException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class WarmPoolException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class BaseImageException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class JobQueueFullException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class JobNotFoundException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class JobStateException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class InvalidRequestException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class SessionLimitException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class SessionNotFoundException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class AgentException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class AgentNotFoundException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
@@ -0,0 +1,249 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, json, time, socket, threading
+import http.client
+from collections import OrderedDict
+from urllib.parse import urlsplit
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ContainerManager import ContainerManager
+from sources.ExecutorAgent import AGENT_TOKEN
+from sources.ProgressTracker import track_tests
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+# Seconds between two status requests to an agent, and before an unreachable agent is tried again
+STATUS_INTERVAL = 5
+# Seconds to wait for the status of an agent
+STATUS_TIMEOUT = 5
+# Seconds to wait for an agent to run the test cases of a cell, on top of the timeout of the test cases
+AGENT_TIMEOUT = 300
+
+class AgentClient:
+    '''
+    Executor agent on another process or host, called over its RPC interface.
+    Keeps the last known state of the agent and the number of cells the server sent it that are still running
+    '''
+    def __init__(self, url: str, token: str = AGENT_TOKEN):
+        self.url = url.rstrip("/")
+        self.token = token
+        parts = urlsplit(self.url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.capacity = 0
+        self.running = 0
+        # The agents are shared by the dispatchers of all requests, which count the cells they send under this lock
+        self.assigned = 0
+        self.lock = threading.Lock()
+        self.available = False
+        self.last_status = 0
+        self.error = None
+
+    def request(self, method: str, path: str, body: dict = None, timeout: float = STATUS_TIMEOUT) -> dict:
+        '''
+        Sends a request to the agent and returns its answer. Raises NoContainerException when every container of the agent is busy
+        and AgentException when the agent can not be reached or failed
+        '''
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        headers = {"X-Agent-Token": self.token}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, socket.timeout, http.client.HTTPException) as e:
+            raise AgentException(f"Agent {self.url} unreachable: {str(e)}") from None
+        finally:
+            connection.close()
+        try:
+            answer = json.loads(data)
+        except ValueError:
+            answer = {"message": {"error_message": data.decode("utf-8", errors="replace")}}
+        if response.status == 503:
+            raise NoContainerException(answer.get("message", {}).get("error_message", "No container available"))
+        if response.status >= 400:
+            raise AgentException(f"Agent {self.url} failed: {answer.get('message', {}).get('error_message', response.status)}")
+        return answer
+
+    def refresh(self, force: bool = False) -> bool:
+        '''
+        Updates the state of the agent at most every STATUS_INTERVAL seconds, returns whether the agent is available
+        '''
+        if not force and time.time() - self.last_status < STATUS_INTERVAL:
+            return self.available
+        self.last_status = time.time()
+        try:
+            status = self.request("GET", "/rpc/status")
+            self.capacity = int(status.get("max_containers", 0))
+            self.running = int(status.get("running", 0))
+            self.available = self.capacity > 0
+            self.error = None
+        except AgentException as e:
+            self.mark_unavailable(str(e))
+        return self.available
+
+    def mark_unavailable(self, error: str) -> None:
+        if self.available:
+            logger.warning(f"AgentClient: {error}")
+        self.available = False
+        self.error = error
+        self.last_status = time.time()
+
+    def load(self) -> float:
+        '''
+        Share of the containers of the agent in use, counting the cells sent since its last status
+        '''
+        return (max(self.running, self.assigned) + 1) / max(self.capacity, 1)
+
+    def assign(self, count: int = 1) -> None:
+        with self.lock:
+            self.assigned += count
+
+    def execute_inputs(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_case = None) -> tuple:
+        body = {"data": data, "inputs": inputs, "timeout": timeout, "run_as_is": run_as_is}
+        answer = self.request("POST", "/rpc/execute_inputs", body, timeout=AGENT_TIMEOUT + (timeout or 0) * max(len(inputs), 1))
+        outputs = answer["outputs"]
+        track_tests(len(outputs))
+        if on_case is not None:
+            # The agent answers once every test case ran
+            for position, output in enumerate(outputs):
+                on_case(position, output)
+        return outputs, answer["failed"]
+
+    def purge(self) -> None:
+        self.request("POST", "/rpc/purge")
+
+    def summary(self) -> dict:
+        return {"url": self.url, "available": self.available, "max_containers": self.capacity, "running": self.running,
+                "assigned": self.assigned, "error": self.error}
+
+class LocalAgent:
+    '''
+    The containers of the server itself, used like an agent
+    '''
+    def __init__(self, container_manager: ContainerManager):
+        self.url = "local"
+        self.manager = container_manager
+        self.assigned = 0
+        self.lock = threading.Lock()
+        self.capacity = container_manager.max_containers
+        self.available = True
+
+    def refresh(self, force: bool = False) -> bool:
+        self.capacity = self.manager.adjust_limit()
+        return True
+
+    def mark_unavailable(self, error: str) -> None:
+        pass
+
+    def load(self) -> float:
+        return (self.assigned + 1) / max(self.capacity, 1)
+
+    def assign(self, count: int = 1) -> None:
+        with self.lock:
+            self.assigned += count
+
+    def execute_inputs(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_case = None) -> tuple:
+        return self.manager.execute_inputs(data, inputs, timeout, run_as_is, on_case)
+
+    def purge(self) -> None:
+        self.manager.purge()
+
+class AgentRegistry:
+    '''
+    Executor agents the server sends cells to, by URL
+    '''
+    def __init__(self, token: str = AGENT_TOKEN):
+        self.token = token
+        self.agents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def register(self, url: str) -> AgentClient:
+        '''
+        Adds an agent once it answered, an agent that registers again keeps its state
+        '''
+        agent = AgentClient(url, self.token)
+        with self.lock:
+            agent = self.agents.get(agent.url, agent)
+        if not agent.refresh(force=True):
+            raise AgentException(agent.error or f"Agent {url} has no containers")
+        with self.lock:
+            self.agents[agent.url] = agent
+        logger.info(f"AgentRegistry register: Registered agent {agent.url} with {agent.capacity} containers")
+        return agent
+
+    def unregister(self, url: str) -> None:
+        with self.lock:
+            agent = self.agents.pop(url.rstrip("/"), None)
+        if agent is None:
+            raise AgentNotFoundException(f"Agent {url} not found")
+        logger.info(f"AgentRegistry unregister: Removed agent {agent.url}")
+
+    def get_agents(self) -> list:
+        with self.lock:
+            return list(self.agents.values())
+
+    def list(self) -> list:
+        return [agent.summary() for agent in self.get_agents()]
+
+class Dispatcher(ContainerManager):
+    '''
+    Spreads the cells of a request and the shards of their test cases across executor agents, and the server itself when local is given.
+    The container limit is the sum of the containers of the available agents, so cells are split like on a single host of that size.
+    Every cell or shard goes to the agent with the lowest load, a cell whose agent can not be reached goes to another agent
+    '''
+    def __init__(self, agents: list, local: ContainerManager = None):
+        super().__init__(container_class=None, pool_spec="", result_cache=None, concurrency=None)
+        self.agents = list(agents) + ([LocalAgent(local)] if local is not None else [])
+
+    def adjust_limit(self) -> int:
+        self.max_containers = max(sum(agent.capacity for agent in self.agents if agent.refresh()), 1)
+        return self.max_containers
+
+    def pick_agent(self):
+        '''
+        The available agent with the lowest load, which is assigned the cell at once
+        '''
+        available = [agent for agent in self.agents if agent.available]
+        if not available:
+            return None
+        agent = min(available, key=lambda agent: agent.load())
+        agent.assign()
+        return agent
+
+    def execute_inputs(self, data: dict, inputs: list, timeout: int, run_as_is: bool = False, on_case = None) -> tuple:
+        agent = self.pick_agent()
+        if agent is None:
+            raise AgentException("No executor agent is available")
+        try:
+            return agent.execute_inputs(data, inputs, timeout, run_as_is, on_case)
+        except AgentException as e:
+            agent.mark_unavailable(str(e))
+            # The cell is queued again for the other agents
+            raise NoContainerException(str(e))
+        finally:
+            agent.assign(-1)
+
+    def purge(self) -> None:
+        for agent in self.agents:
+            try:
+                agent.purge()
+            except Exception as e:
+                logger.warning(f"Dispatcher purge: Failed to purge agent {agent.url}: {str(e)}")
@@ -29,19 +29,29 @@ class DockerMaker:
         self.WORKDIR = "WORKDIR /usr/src/app\n\n"
         self.COPY_ALL = "COPY . /usr/src/app\n\n"
         self.SLEEP_COMMAND = 'CMD ["sleep", "365000d"]\n'
+        # Folder of the base images where the helper files are baked in
+        self.HELPER_PATH = "/opt/mdt"
 
-    def generate_dockerfile(self, version: str, compiler: str, function_name: str, specs: list, index: int) -> None:
+    def generate_dockerfile(self, version: str, compiler: str, function_name: str, specs: list, index: int, base_image: str = "") -> None:
         '''
         function that generates the dockerfile, based on the requirements of the code cell
-        this class is overridden in every specific language class
+        this class is overridden in every specific language class.
+        When a prepared base image is given, the tooling is already in it and only the libraries of the cell are added
         '''
         try:
             content = ""
-            content += self.add_base_image(version, compiler)
-            content += self.add_libraries(version, compiler, specs)
-            content += self.add_workdir()
-            content += self.copy_all()
-            content += self.add_time(version, compiler)
+            if base_image:
+                content += f"FROM {base_image}\n\n"
+                content += self.add_libraries(version, compiler, specs)
+                content += self.add_workdir()
+                content += self.copy_all()
+            else:
+                content += self.add_base_image(version, compiler)
+                content += self.add_libraries(version, compiler, specs)
+                content += self.add_workdir()
+                content += self.copy_all()
+                content += self.add_time(version, compiler)
+                content += self.add_tooling(version, compiler)
             # content += self.add_compile(version, compiler, function_name, specs)
             content += self.add_sleep_command()
 
@@ -75,6 +85,34 @@ class DockerMaker:
     def add_time(self, version: str, compiler: str) -> str:
         return ""
 
+    def add_tooling(self, version: str, compiler: str) -> str:
+        '''
+        Extra setup every image of the language needs (i.e. libraries used by the injected code)
+        '''
+        return ""
+
+    def add_helpers(self, version: str, compiler: str, helper_files: list) -> str:
+        '''
+        Copies the helper files to the helper folder of the base image, languages that can compile them override this
+        '''
+        if not helper_files:
+            return ""
+        return f"COPY {' '.join(helper_files)} {self.HELPER_PATH}/\n\n"
+
+    def generate_base_dockerfile(self, version: str, compiler: str, helper_files: list) -> str:
+        '''
+        Generates the dockerfile of the base image of a language: everything the image of a cell needs except the
+        libraries and the code of the cell. Prepared once, so the image of a cell is a thin layer on top of it
+        '''
+        content = ""
+        content += self.add_base_image(version, compiler)
+        content += self.add_time(version, compiler)
+        content += self.add_tooling(version, compiler)
+        content += self.add_helpers(version, compiler, helper_files)
+        content += self.add_workdir()
+        content += self.add_sleep_command()
+        return content
+
     def add_workdir(self) -> str:
         return self.WORKDIR
 
@@ -0,0 +1,150 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, json, socket, ipaddress, threading
+import http.client
+from functools import partial
+from urllib.parse import urlsplit
+from flask import Flask, request, jsonify
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Podman import Podman, podman
+from sources.PodmanAPI import PodmanAPI
+from sources.Container import Container, format_output
+from sources.ContainerManager import ContainerManager, FileIndexAllocator
+from sources.ConcurrencyController import get_load
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+# Port the agent listens on by default
+AGENT_PORT = 5100
+# Shared secret of the server and its agents, sent in the X-Agent-Token header. Agents run any code they are sent,
+# so an agent reachable from other hosts should always have one
+AGENT_TOKEN = os.environ.get("MDT_AGENT_TOKEN", "")
+
+def is_loopback(host: str) -> bool:
+    '''
+    Whether the agent is only reachable from its own host
+    '''
+    try:
+        return all(ipaddress.ip_address(address[4][0].split("%")[0]).is_loopback for address in socket.getaddrinfo(host, None))
+    except (OSError, ValueError):
+        return False
+
+class ExecutorAgent:
+    '''
+    Runs cells and shards of test cases sent by a server on the containers of its own host.
+    The RPC interface is a few JSON routes: the state of the agent, running the test cases of a cell, and removing the containers
+    '''
+    def __init__(self, container_manager: ContainerManager = None, podman_instance: Podman = podman, token: str = AGENT_TOKEN):
+        self.app = Flask(__name__)
+        self.podman = podman_instance
+        # Agents and servers on the same host take the container indices from the same counter
+        self.manager = container_manager if container_manager is not None else \
+            ContainerManager(container_class=partial(Container, podman_instance=self.podman), index_allocator=FileIndexAllocator())
+        self.token = token
+        # Number of cells or shards that are running
+        self.running = 0
+        self.lock = threading.Lock()
+        self.setup_routes()
+
+    def setup_routes(self):
+        @self.app.before_request
+        def check_token():
+            if self.token and request.headers.get("X-Agent-Token") != self.token:
+                return jsonify({"message": {"status": 401, "error_message": "Invalid agent token"}}), 401
+
+        @self.app.route('/rpc/status', methods=['GET'])
+        def status():
+            return jsonify(self.status()), 200
+
+        @self.app.route('/rpc/execute_inputs', methods=['POST'])
+        def execute_inputs():
+            '''
+            Runs the test cases of a cell like ContainerManager.execute_inputs, the body has data, inputs, timeout and run_as_is
+            '''
+            message = request.get_json(silent=True) or {}
+            if not isinstance(message.get("data"), dict) or not isinstance(message.get("inputs"), list):
+                return jsonify({"message": {"status": 400, "error_message": "data and inputs are required"}}), 400
+            with self.lock:
+                self.running += 1
+            try:
+                outputs, failed = self.manager.execute_inputs(message["data"], message["inputs"], message.get("timeout"), message.get("run_as_is", False))
+                return jsonify({"outputs": outputs, "failed": failed}), 200
+            except NoContainerException as e:
+                # Every container is busy, the server sends the cell to another agent or again later
+                return jsonify({"message": {"status": 503, "error_message": f"{str(e)}"}}), 503
+            except Exception as e:
+                # Reported as the output of the cell, like ContainerManager.execute_parallel does
+                logger.error(f"ExecutorAgent execute_inputs: {str(e)}")
+                return jsonify({"outputs": [format_output(stderr=str(e))], "failed": 0}), 200
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        @self.app.route('/rpc/purge', methods=['POST'])
+        def purge():
+            self.manager.purge()
+            return jsonify({"message": "Purged containers"}), 200
+
+    def status(self) -> dict:
+        return {
+            "max_containers": self.manager.adjust_limit(),
+            "containers": self.manager.container_count,
+            "running": self.running,
+            "load": get_load()
+        }
+
+    def register(self, server_url: str, agent_url: str) -> None:
+        '''
+        Announces the agent to a server, which sends it cells from then on
+        '''
+        parts = urlsplit(server_url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        try:
+            headers = {"Content-Type": "application/json", "X-Agent-Token": self.token}
+            connection.request("POST", "/api/v1/agents", body=json.dumps({"url": agent_url}), headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise AgentException(f"Server {server_url} refused the agent: {data.decode('utf-8', errors='replace')}")
+        logger.info(f"ExecutorAgent register: Registered {agent_url} with {server_url}")
+
+    def run(self, host: str = 'localhost', port: int = AGENT_PORT):
+        if not self.token and not is_loopback(host):
+            # Anyone reaching the agent could run code on its host
+            raise AgentException(f"Set MDT_AGENT_TOKEN to run the agent on {host}, without a token it only listens on localhost")
+        logger.info(f"ExecutorAgent run: Starting the agent on {host}:{port}...")
+        self.app.run(host=host, port=port, debug=False, threaded=True)
+
+
+if __name__ == '__main__':
+    logger.info("ExecutorAgent: Initializing agent...")
+    host = sys.argv[sys.argv.index("--host") + 1] if "--host" in sys.argv else "localhost"
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else AGENT_PORT
+    podman_instance = PodmanAPI() if "--podman-api" in sys.argv else podman
+    # The server and the other agents of the host keep their containers and session folders
+    podman_instance.init(clean=False)
+    agent = ExecutorAgent(podman_instance=podman_instance)
+    # Announce the agent to a server, e.g. --register http://localhost:5000, with the URL the server reaches the agent at
+    if "--register" in sys.argv:
+        agent_url = sys.argv[sys.argv.index("--url") + 1] if "--url" in sys.argv else f"http://{host}:{port}"
+        threading.Timer(1, agent.register, args=[sys.argv[sys.argv.index("--register") + 1], agent_url]).start()
+    agent.run(host=host, port=port)
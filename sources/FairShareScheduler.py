@@ -0,0 +1,131 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, threading
+from collections import OrderedDict
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ConcurrencyController import ConcurrencyController, concurrency_controller
+from sources.ContainerManager import MAX_CONTAINERS
+from sources.LoggerConfig import logger
+
+class FairShareScheduler:
+    '''
+    Shares the containers of the host between the sessions. The sessions running a request get an equal share of the limit,
+    the first to start gets the remainder. A session that starts a request gets its share from the idle containers
+    of the other sessions, idle sessions first
+    '''
+    def __init__(self, concurrency: ConcurrencyController = concurrency_controller):
+        self.concurrency = concurrency
+        self.limit = concurrency.initial_limit() if concurrency is not None else MAX_CONTAINERS
+        # session id -> session, and session id -> number of requests it runs, in the order the sessions started running
+        self.sessions = OrderedDict()
+        self.running = OrderedDict()
+        self.lock = threading.RLock()
+
+    def register(self, session) -> None:
+        with self.lock:
+            self.sessions[session.id] = session
+
+    def unregister(self, session) -> None:
+        with self.lock:
+            self.sessions.pop(session.id, None)
+            self.running.pop(session.id, None)
+
+    def get_container_count(self) -> int:
+        with self.lock:
+            return sum(session.container_manager.container_count for session in self.sessions.values())
+
+    def adjust(self) -> int:
+        '''
+        Follows the limit of the host from the containers of all sessions
+        '''
+        if self.concurrency is not None:
+            limit = self.concurrency.adjust(self.get_container_count())
+            with self.lock:
+                self.limit = limit
+        return self.limit
+
+    def get_share(self, session_id: str) -> int:
+        '''
+        Number of containers the session may use. An idle session gets the share it would have when it started a request
+        '''
+        with self.lock:
+            active = list(self.running)
+            if session_id not in self.running:
+                active.append(session_id)
+            base, extra = divmod(self.limit, len(active))
+            return max(1, base + (1 if active.index(session_id) < extra else 0))
+
+    def begin(self, session) -> None:
+        with self.lock:
+            self.running[session.id] = self.running.get(session.id, 0) + 1
+        self.rebalance(session)
+
+    def end(self, session) -> None:
+        with self.lock:
+            count = self.running.get(session.id, 0) - 1
+            if count > 0:
+                self.running[session.id] = count
+            else:
+                self.running.pop(session.id, None)
+
+    def rebalance(self, session) -> int:
+        '''
+        Removes idle containers of the other sessions until the session can have its share. Idle sessions lose their containers first,
+        sessions running a request keep their share. Containers running test cases are never removed, the other sessions
+        just stop creating containers until they are back to their share. Returns the number of removed containers
+        '''
+        self.adjust()
+        with self.lock:
+            needed = self.get_share(session.id) - session.container_manager.container_count
+            free = self.limit - self.get_container_count()
+            others = [other for other in self.sessions.values() if other.id != session.id]
+            # Idle sessions first, the least recently used first
+            others.sort(key=lambda other: (other.id in self.running, other.last_used))
+            targets = [(other, self.get_share(other.id) if other.id in self.running else 0) for other in others]
+        removed = 0
+        for other, target in targets:
+            if needed <= free:
+                break
+            count = other.container_manager.trim_containers(target, needed - free)
+            free += count
+            removed += count
+        if removed:
+            logger.info(f"FairShareScheduler rebalance: Removed {removed} containers of other sessions for session {session.id}")
+        return removed
+
+class SessionShare:
+    '''
+    Concurrency controller of the container manager of a session, its limit is the share of the session.
+    A share below the containers the session uses only stops it from creating containers
+    '''
+    def __init__(self, scheduler: FairShareScheduler, session_id: str):
+        self.scheduler = scheduler
+        self.session_id = session_id
+
+    def initial_limit(self) -> int:
+        return self.scheduler.get_share(self.session_id)
+
+    def adjust(self, running: int) -> int:
+        self.scheduler.adjust()
+        return self.scheduler.get_share(self.session_id)
+
+    def observe(self, outputs: list) -> None:
+        if self.scheduler.concurrency is not None:
+            self.scheduler.concurrency.observe(outputs)
@@ -0,0 +1,103 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Folder of the files shared by the worker processes of the production server
+LOCK_FOLDER = os.path.join(parent_dir, "locks")
+
+def lock_file(file, blocking: bool = True) -> bool:
+    '''
+    Locks the file, without blocking returns False when another process holds the lock
+    '''
+    if os.name == "nt":
+        file.seek(0)
+        while True:
+            try:
+                # LK_LOCK gives up after 10 seconds
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                continue
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+def unlock_file(file) -> None:
+    if os.name == "nt":
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+class FileLock:
+    '''
+    Lock shared by every process that locks the same file, i.e. the workers of the production server.
+    The threads of a process exclude each other as well. The lock file is created on first use and never removed
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.thread_lock = threading.Lock()
+        self.file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        '''
+        Without blocking returns False when another thread or process holds the lock
+        '''
+        if not self.thread_lock.acquire(blocking):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a+")
+            if not lock_file(self.file, blocking):
+                self.file.close()
+                self.file = None
+                self.thread_lock.release()
+                return False
+            return True
+        except Exception:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        try:
+            unlock_file(self.file)
+        finally:
+            self.file.close()
+            self.file = None
+            self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
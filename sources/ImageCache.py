@@ -0,0 +1,245 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, json, time, uuid, shutil, hashlib, tempfile, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Podman import Podman
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+from sources.FileLock import FileLock
+
+# All cached images share this name, the tag is the hash of the environment
+IMAGE_NAME = "mdt_image"
+# File that keeps when every cached image was last used, so the garbage collection survives restarts
+IMAGE_CACHE_FILE = os.path.join(parent_dir, "image_cache.json")
+# Garbage collection policy: unused images are removed after IMAGE_MAX_AGE seconds,
+# and the least recently used unused images are removed while there are more than MAX_CACHED_IMAGES
+MAX_CACHED_IMAGES = 20
+IMAGE_MAX_AGE = 7 * 24 * 60 * 60
+
+def is_alive(pid: int) -> bool:
+    '''
+    Whether another process is running. The production server does not run on Windows,
+    where the other processes in the index are previous runs of the server
+    '''
+    if os.name == "nt":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class ImageCache:
+    '''
+    Keeps the images of container environments. Images are tagged by a hash of the environment and of the Dockerfile,
+    so containers with the same environment share one image, also across requests and restarts.
+    Images never contain user code, the code is uploaded to the container after it starts.
+    The worker processes of the production server share the index file and build every image once, with locks next to the index
+    '''
+    def __init__(self, index_path: str = IMAGE_CACHE_FILE, max_images: int = MAX_CACHED_IMAGES, max_age: int = IMAGE_MAX_AGE):
+        self.index_path = index_path
+        self.max_images = max_images
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.lock_folder = os.path.join(os.path.dirname(index_path), "locks")
+        self.file_lock = FileLock(os.path.join(self.lock_folder, "image_cache.lock"))
+        # One lock per tag, so the same image is never built twice at the same time, also by other processes
+        self.build_locks = {}
+        # Number of running containers per tag, images in use are never collected
+        self.references = {}
+        # Users of the images in other processes, tag -> {owner: number of containers}. The owner starts with the pid
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.users = {}
+        self.images = self.load()
+
+    def load_index(self) -> dict:
+        '''
+        Reads the last use of every cached image and the users of the images
+        '''
+        try:
+            with open(self.index_path, "r") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = {}
+        # Index files of older versions only have the last uses
+        if "images" not in index:
+            index = {"images": index, "users": {}}
+        return index
+
+    def load(self) -> dict:
+        return self.load_index()["images"]
+
+    def sync(self) -> None:
+        '''
+        Takes the images other processes added to the index file, and forgets the images they removed unless they are in use here.
+        The last uses of this process win. Called with both locks held
+        '''
+        index = self.load_index()
+        self.users = {}
+        for tag, users in index["users"].items():
+            others = {owner: count for owner, count in users.items() if owner != self.owner and count > 0 and is_alive(int(owner.split(":")[0]))}
+            if others:
+                self.users[tag] = others
+        images = index["images"]
+        for tag in list(self.images):
+            if tag not in images and self.references.get(tag, 0) == 0:
+                self.images.pop(tag)
+        for tag, last_used in images.items():
+            self.images.setdefault(tag, last_used)
+
+    def write(self) -> None:
+        '''
+        Replaces the index file at once, so other processes never read half of it. Called with both locks held
+        '''
+        try:
+            temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            users = {tag: dict(owners) for tag, owners in self.users.items()}
+            for tag, count in self.references.items():
+                if count > 0:
+                    users.setdefault(tag, {})[self.owner] = count
+            with open(temp_path, "w") as file:
+                json.dump({"images": self.images, "users": users}, file)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"ImageCache save: Failed to write {self.index_path}: {str(e)}")
+
+    def save(self) -> None:
+        '''
+        Called with the lock held
+        '''
+        try:
+            with self.file_lock:
+                self.sync()
+                self.write()
+        except OSError as e:
+            logger.warning(f"ImageCache save: Failed to lock {self.index_path}: {str(e)}")
+
+    def get_tag(self, environment: dict, dockerfile: str) -> str:
+        '''
+        Hash of the environment and of the Dockerfile that builds it
+        '''
+        content = json.dumps(environment, sort_keys=True) + "\n" + dockerfile
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    def get_image(self, podman_instance: Podman, environment: dict, mount_path: str) -> tuple:
+        '''
+        Returns the name and tag of the image for an environment, building it only if it does not exist yet.
+        The caller holds a reference to the image until it calls release
+        '''
+        dockerfile_path = os.path.join(mount_path, "Dockerfile")
+        dockerfile = ""
+        if os.path.exists(dockerfile_path):
+            with open(dockerfile_path, "r", encoding="utf-8") as file:
+                dockerfile = file.read()
+        tag = self.get_tag(environment, dockerfile)
+        with self.lock:
+            build_lock = self.get_build_lock(tag)
+            self.references[tag] = self.references.get(tag, 0) + 1
+            # Other processes see the reference before the image is looked up, so they do not remove it in the meantime
+            self.save()
+        built = False
+        try:
+            with build_lock:
+                if not podman_instance.image_exists(IMAGE_NAME, tag):
+                    self.build(podman_instance, tag, dockerfile_path)
+                    built = True
+        except Exception:
+            self.release(tag)
+            raise
+        with self.lock:
+            self.images[tag] = time.time()
+            self.save()
+        if built:
+            self.collect(podman_instance)
+        else:
+            logger.info(f"ImageCache get_image: Reusing image {IMAGE_NAME}:{tag}")
+        return IMAGE_NAME, tag
+
+    def get_build_lock(self, tag: str) -> FileLock:
+        '''
+        Called with the lock held
+        '''
+        if tag not in self.build_locks:
+            self.build_locks[tag] = FileLock(os.path.join(self.lock_folder, f"image_{tag}.lock"))
+        return self.build_locks[tag]
+
+    def build(self, podman_instance: Podman, tag: str, dockerfile_path: str) -> None:
+        '''
+        Builds the image from a context that only has the Dockerfile
+        '''
+        logger.info(f"ImageCache build: Building image {IMAGE_NAME}:{tag}")
+        with tempfile.TemporaryDirectory() as context:
+            if os.path.exists(dockerfile_path):
+                shutil.copy2(dockerfile_path, os.path.join(context, "Dockerfile"))
+            podman_instance.build_image(IMAGE_NAME, tag, mount_path=context)
+
+    def release(self, tag: str) -> None:
+        '''
+        Called when a container that used the image is removed
+        '''
+        with self.lock:
+            if self.references.get(tag, 0) > 0:
+                self.references[tag] -= 1
+            if tag in self.images:
+                self.images[tag] = time.time()
+            self.save()
+
+    def collect(self, podman_instance: Podman) -> list:
+        '''
+        Removes the images that are not used by any container and were not used for max_age seconds,
+        then the least recently used unused images while there are more than max_images. Returns the removed tags.
+        Images used by the containers of other processes are kept as well
+        '''
+        with self.lock, self.file_lock:
+            # Images of other processes count towards max_images too
+            self.sync()
+            now = time.time()
+            unused = sorted((last_used, tag) for tag, last_used in self.images.items() if self.references.get(tag, 0) == 0 and tag not in self.users)
+            to_remove = [tag for last_used, tag in unused if now - last_used > self.max_age]
+            for last_used, tag in unused:
+                if len(self.images) - len(to_remove) <= self.max_images:
+                    break
+                if tag not in to_remove:
+                    to_remove.append(tag)
+            for tag in to_remove:
+                self.images.pop(tag, None)
+            self.write()
+        removed = []
+        for tag in to_remove:
+            with self.lock:
+                build_lock = self.get_build_lock(tag)
+            # A process that looks the image up holds the build lock and has saved its reference before
+            with build_lock:
+                with self.lock, self.file_lock:
+                    self.sync()
+                    in_use = self.references.get(tag, 0) > 0 or tag in self.users
+                if in_use:
+                    continue
+                try:
+                    podman_instance.remove_image(IMAGE_NAME, tag)
+                    removed.append(tag)
+                    logger.info(f"ImageCache collect: Removed image {IMAGE_NAME}:{tag}")
+                except Exception as e:
+                    logger.warning(f"ImageCache collect: Failed to remove image {IMAGE_NAME}:{tag}: {str(e)}")
+        return removed
+
+image_cache = ImageCache()
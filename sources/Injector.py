@@ -22,6 +22,57 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(parent_dir)
 from sources.LoggerConfig import logger
+
+'''
+Batch harness format. The input file holds one test case per line: the number of arguments followed by
+every argument hex encoded, all separated by tabs. The harness answers every test case with a single framed line:
+marker, case index, elapsed nanoseconds, peak memory in KB, status, hex stdout and hex stderr, separated by tabs.
+Worker harnesses exchange the same lines over stdin and stdout, each prefixed by its length as a 4 byte big endian integer.
+A zero length request stops the worker.
+'''
+BATCH_INPUT_FILE = "inputs.mdt"
+BATCH_FRAME_MARKER = "@@MDT@@"
+
+def encode_batch_input(inputs: list) -> str:
+    '''
+    Encode a list of test cases in the format read by the batch harness
+    '''
+    lines = []
+    for input in inputs:
+        fields = [str(len(input))] + [str(arg).encode("utf-8").hex() for arg in input]
+        lines.append("\t".join(fields))
+    return "\n".join(lines) + "\n"
+
+def decode_batch_frame(line: str) -> dict:
+    '''
+    Decode a single framed line written by the batch harness. Returns None for lines that are not frames
+    '''
+    fields = line.rstrip("\r\n").split("\t")
+    if len(fields) != 7 or fields[0] != BATCH_FRAME_MARKER:
+        return None
+    try:
+        return {
+            "index": int(fields[1]),
+            "elapsed": int(fields[2]),
+            "memory": int(fields[3]),
+            "status": int(fields[4]),
+            "stdout": bytes.fromhex(fields[5]).decode("utf-8", errors="replace"),
+            "stderr": bytes.fromhex(fields[6]).decode("utf-8", errors="replace")
+        }
+    except ValueError:
+        return None
+
+def decode_batch_output(lines: list) -> dict:
+    '''
+    Collect all frames from the stdout lines of a batch run, indexed by test case
+    '''
+    frames = {}
+    for line in lines:
+        frame = decode_batch_frame(line)
+        if frame is not None:
+            frames[frame["index"]] = frame
+    return frames
+
 class Injector:
     '''
     Base Injector class for injecting a main function/function call into a raw source code file.
@@ -47,6 +98,9 @@ class Injector:
         self.ESCAPE_INDEX = "\index"
         self.OUTPUT_NAME = "result"
         self.ARG_OFFSET = 0
+        self.BATCH_ARGS = ""
+        self.BATCH_DRIVER = ""
+        self.WORKER_DRIVER = ""
 
     def inject(self, source_path: str, destination_path: str, signature: dict):
         '''
@@ -72,12 +126,72 @@ class Injector:
             logger.error(f'Injector inject: Failed to write to destination {destination_path} with error: {e}')
             raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
 
+    def inject_batch(self, source_path: str, destination_path: str, signature: dict):
+        '''
+        Inject a batch harness into a source code file. The function call is wrapped in a per test case function
+        and a driver reads every test case from the input file, calls the function in a loop and frames each result
+        '''
+        try:
+            with open(source_path, "r") as input:
+                code = input.read()
+        except Exception as e:
+            logger.error(f'Injector inject_batch: Failed to open source code file {source_path} with error: {e}')
+            raise InjectException(f'Failed to open source code file {source_path} with error: {e}')
+        code += self.NEWLINE + self.NEWLINE
+        code += self.batch_setup(signature)
+        code += self.declare(signature)
+        code += self.batch_initialize(signature)
+        code += self.call(signature)
+        code += self.print_result(signature)
+        code += self.batch_wrap(signature)
+        try:
+            with open(destination_path, "w") as output:
+                output.write(code)
+        except Exception as e:
+            logger.error(f'Injector inject_batch: Failed to write to destination {destination_path} with error: {e}')
+            raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
+
+    def inject_worker(self, source_path: str, destination_path: str, signature: dict):
+        '''
+        Inject a worker harness into a source code file. It wraps the function like the batch harness,
+        but its driver answers test cases streamed over stdin instead of reading them from a file
+        '''
+        driver = self.BATCH_DRIVER
+        self.BATCH_DRIVER = self.WORKER_DRIVER
+        try:
+            self.inject_batch(source_path, destination_path, signature)
+        finally:
+            self.BATCH_DRIVER = driver
+
     def setup(self, signature: dict) -> str:
         '''
         Setup the program. (i.e. declare main function/imports)
         '''
         return ""
 
+    def batch_setup(self, signature: dict) -> str:
+        '''
+        Setup the batch harness (i.e. imports and the opening of the per test case function)
+        '''
+        return ""
+
+    def batch_initialize(self, signature: dict) -> str:
+        '''
+        Initialize all variables from the arguments of the current test case instead of the program arguments
+        '''
+        args, offset = self.ARGS, self.ARG_OFFSET
+        self.ARGS, self.ARG_OFFSET = self.BATCH_ARGS, 0
+        try:
+            return self.initialize(signature)
+        finally:
+            self.ARGS, self.ARG_OFFSET = args, offset
+
+    def batch_wrap(self, signature: dict) -> str:
+        '''
+        Close the per test case function and add the driver
+        '''
+        return self.BATCH_DRIVER
+
     def declare_item(self, name: str, type: str) -> str:
         '''
         Declare an individual variable
@@ -0,0 +1,311 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, json, time, uuid, sqlite3, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.CustomException import *
+from sources.FileLock import LOCK_FOLDER
+from sources.LoggerConfig import logger
+
+# Number of jobs running at the same time, every job runs its cells on the containers of the ContainerManager
+JOB_WORKERS = 4
+# Number of jobs waiting for a worker, submitting more jobs is refused
+MAX_QUEUED_JOBS = 32
+# Number of finished jobs whose results are kept, the oldest are forgotten first
+MAX_FINISHED_JOBS = 100
+# Database of the jobs shared by the worker processes of the production server, any worker answers for any job
+JOB_STORE_FILE = os.path.join(LOCK_FOLDER, "jobs.db")
+# Seconds a write waits while another worker process writes to the database
+DATABASE_TIMEOUT = 30
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class Job:
+    '''
+    A run of execute_code in the background. The results of the cells are added while they finish
+    '''
+    def __init__(self, total_cells: int = 0, metadata: dict = None, get_progress = None, on_change = None):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.total_cells = total_cells
+        self.metadata = metadata or {}
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Raw results of the cells that finished, in the order they finished
+        self.cell_results = []
+        self.result = None
+        self.error = None
+        # Returns the completion rate of the job, and is called with the job whenever a cell finished
+        self.get_progress_callback = get_progress
+        self.on_change = on_change
+        self.lock = threading.Lock()
+
+    def add_cell_result(self, cell_result: dict) -> None:
+        with self.lock:
+            self.cell_results.append(cell_result)
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def get_progress(self) -> float:
+        return self.get_progress_callback(self) if self.get_progress_callback is not None else 0
+
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "cells_done": len(self.cell_results),
+                "total_cells": self.total_cells,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "error": self.error,
+                **self.metadata
+            }
+
+    def results(self) -> dict:
+        '''
+        The final result once the job is done, otherwise the results of the cells that finished so far
+        '''
+        with self.lock:
+            if self.status == DONE:
+                return {"job_id": self.id, "status": self.status, "partial": False, "results": self.result}
+            return {"job_id": self.id, "status": self.status, "partial": True, "results": list(self.cell_results), "error": self.error}
+
+class StoredJob:
+    '''
+    A job of another worker process, as it was last saved in the job store
+    '''
+    def __init__(self, job_id: str, status: str, summary: dict, results: dict, progress: float):
+        self.id = job_id
+        self.status = status
+        self.stored_summary = dict(summary, status=status)
+        self.stored_results = dict(results, status=status)
+        self.progress = progress
+
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def summary(self) -> dict:
+        return dict(self.stored_summary)
+
+    def results(self) -> dict:
+        return dict(self.stored_results)
+
+    def get_progress(self) -> float:
+        return self.progress
+
+class JobStore:
+    '''
+    Keeps the state, the results and the progress of the jobs of all worker processes in a database, so every worker
+    answers for every job. Only the worker running a job writes it, other workers may cancel a queued job
+    '''
+    def __init__(self, path: str = JOB_STORE_FILE, max_finished: int = MAX_FINISHED_JOBS):
+        self.path = path
+        self.max_finished = max_finished
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=DATABASE_TIMEOUT)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, summary TEXT NOT NULL, "
+                                    "results TEXT NOT NULL, progress REAL NOT NULL, updated REAL NOT NULL)")
+            self.connection.commit()
+        return self.connection
+
+    def save(self, job: Job) -> None:
+        '''
+        Writes the job, then removes the oldest finished jobs beyond max_finished
+        '''
+        row = (job.id, job.status, json.dumps(job.summary()), json.dumps(job.results()), job.get_progress(), time.time())
+        with self.lock:
+            connection = self.connect()
+            connection.execute("INSERT OR REPLACE INTO jobs (id, status, summary, results, progress, updated) VALUES (?, ?, ?, ?, ?, ?)", row)
+            if job.is_finished():
+                connection.execute("DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN (?, ?, ?) ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                                   (DONE, FAILED, CANCELLED, self.max_finished))
+            connection.commit()
+
+    def get(self, job_id: str) -> StoredJob:
+        with self.lock:
+            row = self.connect().execute("SELECT id, status, summary, results, progress, updated FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.to_job(row) if row is not None else None
+
+    def to_job(self, row: tuple) -> StoredJob:
+        job_id, status, summary, results, progress, updated = row
+        summary = json.loads(summary)
+        if status == CANCELLED and summary.get("finished") is None:
+            # Cancelled by another worker
+            summary["finished"] = updated
+        return StoredJob(job_id, status, summary, json.loads(results), progress)
+
+    def list(self) -> list:
+        with self.lock:
+            rows = self.connect().execute("SELECT id, status, summary, results, progress, updated FROM jobs ORDER BY rowid").fetchall()
+        return [self.to_job(row).summary() for row in rows]
+
+    def set_status(self, job_id: str, status: str) -> bool:
+        '''
+        Moves a queued job to status, returns False when the job is not queued anymore
+        '''
+        with self.lock:
+            connection = self.connect()
+            cursor = connection.execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?", (status, time.time(), job_id, QUEUED))
+            connection.commit()
+            return cursor.rowcount == 1
+
+    def clear(self) -> None:
+        '''
+        Forgets the jobs of an earlier run, called once before the workers start
+        '''
+        with self.lock:
+            connection = self.connect()
+            connection.execute("DELETE FROM jobs")
+            connection.commit()
+
+class JobManager:
+    '''
+    Runs jobs on a pool of threads. At most max_workers jobs run and max_queued jobs wait at the same time.
+    With a job store, the jobs of the other worker processes are seen as well
+    '''
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = MAX_QUEUED_JOBS, max_finished: int = MAX_FINISHED_JOBS,
+                 store: JobStore = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        # Slots of the running and the waiting jobs
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.store = store
+        self.lock = threading.Lock()
+
+    def submit(self, run, total_cells: int = 0, metadata: dict = None, get_progress = None) -> Job:
+        '''
+        Queues run(job), its return value is the result of the job. Raises JobQueueFullException when no slot is free.
+        get_progress(job) returns the completion rate of the job
+        '''
+        if not self.slots.acquire(blocking=False):
+            raise JobQueueFullException("Too many jobs are queued, try again later")
+        job = Job(total_cells, metadata, get_progress, on_change=self.save)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.collect()
+        self.save(job)
+        try:
+            self.executor.submit(self.run_job, job, run)
+        except RuntimeError as e:
+            self.slots.release()
+            raise JobQueueFullException(str(e))
+        logger.info(f"JobManager submit: Queued job {job.id}")
+        return job
+
+    def save(self, job: Job) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except Exception as e:
+            logger.warning(f"JobManager save: Failed to save job {job.id}: {str(e)}")
+
+    def run_job(self, job: Job, run) -> None:
+        try:
+            with job.lock:
+                if job.status == CANCELLED:
+                    return
+                if self.store is not None and not self.store.set_status(job.id, RUNNING):
+                    # Cancelled by another worker
+                    job.status = CANCELLED
+                    job.finished = time.time()
+                    return
+                job.status = RUNNING
+                job.started = time.time()
+            self.save(job)
+            result = run(job)
+            with job.lock:
+                job.result = result
+                job.status = DONE
+        except Exception as e:
+            logger.error(f"JobManager run_job: Job {job.id} failed: {str(e)}")
+            with job.lock:
+                job.error = str(e)
+                job.status = FAILED
+        finally:
+            job.finished = job.finished or time.time()
+            self.save(job)
+            self.slots.release()
+
+    def get(self, job_id: str) -> Job:
+        '''
+        A job of this process, or the last saved state of a job of another worker process
+        '''
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.get(job_id)
+        if job is None:
+            raise JobNotFoundException(f"Job {job_id} not found")
+        return job
+
+    def list(self) -> list:
+        if self.store is not None:
+            return self.store.list()
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.summary() for job in jobs]
+
+    def cancel(self, job_id: str) -> Job:
+        '''
+        Cancels a job that did not start yet. Running jobs are not interrupted
+        '''
+        job = self.get(job_id)
+        if isinstance(job, StoredJob):
+            # The worker of the job sees it cancelled before it starts it
+            if not self.store.set_status(job_id, CANCELLED):
+                raise JobStateException(f"Job {job_id} is {self.get(job_id).status} and can not be cancelled")
+            return self.get(job_id)
+        with job.lock:
+            if job.status != QUEUED or (self.store is not None and not self.store.set_status(job_id, CANCELLED)):
+                raise JobStateException(f"Job {job_id} is {job.status} and can not be cancelled")
+            job.status = CANCELLED
+            job.finished = time.time()
+        self.save(job)
+        return job
+
+    def collect(self) -> None:
+        '''
+        Forgets the oldest finished jobs beyond max_finished. Called with the lock held
+        '''
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished()]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            self.jobs.pop(job_id)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -31,10 +31,8 @@ CRITICAL=50
 STDERR_LEVEL = 15
 
 logger = logging.getLogger("flask_app")
-exec_logger = logging.getLogger("exec_logger")
 # Change this value based on the desired logging level
 logger.setLevel(STDERR_LEVEL)
-exec_logger.setLevel(logging.INFO)
 
 logging.addLevelName(STDERR_LEVEL, "STDERR")
 
@@ -59,7 +57,6 @@ console_formatter = colorlog.ColoredFormatter(
 
 # Add handlers for terminal and file logging
 file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-exec_file_formatter = logging.Formatter("%(message)s")
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(console_formatter)
@@ -67,28 +64,6 @@ console_handler.setFormatter(console_formatter)
 file_handler = logging.FileHandler("backend.log")
 file_handler.setFormatter(file_formatter)
 
-exec_file_handler = logging.FileHandler("exec.log")
-exec_file_handler.setFormatter(exec_file_formatter)
-
 if not logger.hasHandlers():
     logger.addHandler(console_handler)
     logger.addHandler(file_handler)
-
-if not exec_logger.hasHandlers():
-    exec_logger.addHandler(exec_file_handler)
-
-
-def clear_exec_log_file():
-    '''
-    Function for clearing the exec.log file.
-    After finishing a request, important to clear this file so the status resets to 0 for the next request
-    '''
-    with open("exec.log", "w"):
-        pass
-    for handler in exec_logger.handlers:
-        handler.close()
-        exec_logger.removeHandler(handler)
-
-    exec_file_handler = logging.FileHandler("exec.log")
-    exec_file_handler.setFormatter(exec_file_formatter)
-    exec_logger.addHandler(exec_file_handler)
\ No newline at end of file
@@ -16,6 +16,9 @@ along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
 import subprocess
 import sys
+import io
+import tarfile
+import hashlib
 from pathlib import Path
 import os
 from sys import platform
@@ -138,7 +141,10 @@ class Podman:
         Clean stray containers that may be present at program start
         '''
         session_path = os.path.join(parent_dir, session_path)
-        sessions = os.listdir(session_path)
+        try:
+            sessions = os.listdir(session_path)
+        except FileNotFoundError:
+            return
         for session in sessions:
             try:
                 self.stop_container(f'container_{session}')
@@ -152,16 +158,21 @@ class Podman:
                 logger.warning(f"Podman clean_path: error: {str(e)}")
             finally:
                 subpath = os.path.join(session_path, session)
-                files = os.listdir(subpath)
-                for file in files:
-                    file_path = os.path.join(subpath, file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                os.rmdir(subpath)
+                try:
+                    files = os.listdir(subpath)
+                    for file in files:
+                        file_path = os.path.join(subpath, file)
+                        if os.path.isfile(file_path):
+                            os.remove(file_path)
+                    os.rmdir(subpath)
+                except FileNotFoundError:
+                    # Removed by another process in the meantime
+                    pass
 
-    def init(self, machine_name: str = "podman-machine-default", session_path: str = "sessions/") -> None:
+    def init(self, machine_name: str = "podman-machine-default", session_path: str = "sessions/", clean: bool = True) -> None:
         '''
-        Function to start the podman machine. Necessary for any container or image manipulation
+        Function to start the podman machine. Necessary for any container or image manipulation.
+        clean removes the stray containers and session folders, it is off for processes started next to a running server
         '''
         logger.info(f'Podman init: Starting podman machine: {machine_name}')
         if not self.machine_exists(machine_name):
@@ -173,9 +184,10 @@ class Podman:
         machine_start = subprocess.run(["podman", "machine", "start"], capture_output=True, shell=SHELL)
         logger.info('Podman init: Start podman machine with output:')
         self.print_process_output(machine_start)
-        logger.info('Podman init: Cleaning stray containers...')
-        self.clean_path(session_path)
-        self.prune(machine_name)
+        if clean:
+            logger.info('Podman init: Cleaning stray containers...')
+            self.clean_path(session_path)
+            self.prune(machine_name)
         self.check_for_errors(machine_start, StartException)
         logger.info('Podman init: System initialized!')
 
@@ -214,6 +226,13 @@ class Podman:
         self.print_process_output(image)
         self.check_for_errors(image, ImageBuildException)
 
+    def image_exists(self, name: str, tag: str) -> bool:
+        '''
+        Checks if an image is in the list of podman images
+        '''
+        exists = subprocess.run(["podman", "image", "exists", name + ":" + tag], capture_output=True, shell=SHELL)
+        return exists.returncode == 0
+
     def remove_image(self, name: str, tag: str) -> None:
         '''
         Remove an image from the list of podman images
@@ -224,13 +243,16 @@ class Podman:
         self.print_process_output(remove)
         self.check_for_errors(remove, ImageRemoveException)
 
-    def run_image(self, image_name: str, tag: str, container_name: str) -> dict:
+    def run_image(self, image_name: str, tag: str, container_name: str, volumes: list = None) -> dict:
         '''
-        Makes the container using an image
+        Makes the container using an image. Volumes is a list of (host folder, container folder) to bind mount
         '''
         image_name = image_name + ":" + tag
         logger.info(f'Podman run_image: Run image: {image_name}')
-        run = subprocess.run(["podman", "run", "-d", "--name", container_name, image_name], capture_output=True, shell=SHELL)
+        mounts = []
+        for source, destination in volumes or []:
+            mounts += ["-v", f"{self.relative_to_vm_path(source)}:{destination}:Z"]
+        run = subprocess.run(["podman", "run", "-d", "--name", container_name] + mounts + [image_name], capture_output=True, shell=SHELL)
         self.print_process_output(run)
         self.check_for_errors(run, ImageRunException)
         return self.completed_process_to_lines(run)
@@ -269,6 +291,78 @@ class Podman:
             logger.info(f'Podman copy_to_container: Copy file {file_path} to container {container_name}:{dest} with output:')
             
 
+    def make_archive(self, paths: list) -> bytes:
+        '''
+        Packs files (or the content of a folder) in an in-memory tar archive, used to send build contexts and files
+        '''
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for path, arcname in paths:
+                archive.add(path, arcname=arcname)
+        return buffer.getvalue()
+
+    def upload_folder(self, folder: str, container_name: str, dest: str = "/usr/src/app", timeout: int = 30) -> None:
+        '''
+        Copies all files of a folder to a container in one tar stream, then checks the checksums of the copied files
+        '''
+        files = sorted(file for file in os.listdir(folder) if os.path.isfile(os.path.join(folder, file)))
+        if not files:
+            return
+        logger.info(f'Podman upload_folder: Uploading {len(files)} files from {folder} to container {container_name}:{dest}')
+        archive = self.make_archive([(os.path.join(folder, file), file) for file in files])
+        self.send_archive(archive, container_name, dest, timeout)
+        self.verify_upload(folder, files, container_name, dest)
+
+    def send_archive(self, archive: bytes, container_name: str, dest: str = "/usr/src/app", timeout: int = 30) -> None:
+        '''
+        Extracts a tar archive in a container, streamed to podman cp over stdin
+        '''
+        if platform != "linux" and platform != "linux2":
+            command = self.get_copy_command() + [f"podman cp - {container_name}:{dest}"]
+        else:
+            command = ["podman", "cp", "-", f"{container_name}:{dest}"]
+        try:
+            copy = subprocess.run(command, input=archive, capture_output=True, shell=False, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise CopyException(f"Copy to container {container_name} timed out after {timeout} seconds") from None
+        self.check_for_errors(copy, CopyException)
+        if copy.returncode != 0:
+            raise CopyException(f"Copy to container {container_name} failed with exit code {copy.returncode}")
+
+    def download_archive(self, container_name: str, path: str = "/usr/src/app/.", timeout: int = 30) -> bytes:
+        '''
+        Returns the files of a folder in a container as a tar archive, streamed from podman cp over stdout
+        '''
+        if platform != "linux" and platform != "linux2":
+            command = self.get_copy_command() + [f"podman cp {container_name}:{path} -"]
+        else:
+            command = ["podman", "cp", f"{container_name}:{path}", "-"]
+        try:
+            copy = subprocess.run(command, capture_output=True, shell=False, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise CopyException(f"Copy from container {container_name} timed out after {timeout} seconds") from None
+        if copy.returncode != 0:
+            raise CopyException(f"Copy from container {container_name} failed: {copy.stderr.decode('utf-8', errors='replace')}")
+        return copy.stdout
+
+    def verify_upload(self, folder: str, files: list, container_name: str, dest: str = "/usr/src/app") -> None:
+        '''
+        Compares the sha256 of the local files with the sha256 of the files in the container
+        '''
+        expected = {}
+        for file in files:
+            with open(os.path.join(folder, file), "rb") as local_file:
+                expected[f"{dest}/{file}"] = hashlib.sha256(local_file.read()).hexdigest()
+        output = self.exec_command(container_name, ["sha256sum"] + list(expected))
+        copied = {}
+        for line in output['stdout']:
+            parts = line.split()
+            if len(parts) == 2:
+                copied[parts[1]] = parts[0]
+        mismatched = [path for path, checksum in expected.items() if copied.get(path) != checksum]
+        if mismatched:
+            raise CopyException(f"Checksum mismatch after copying to container {container_name}: {', '.join(mismatched)}")
+
     def exec_command(self, container_name: str, command: list, metrics: bool = False, timeout: int = 120) -> dict:
         '''
         Executes a command inside a podman container
@@ -279,6 +373,12 @@ class Podman:
         command_split = ["podman", "exec", container_name] + command
         exec_output = subprocess.run(command_split, capture_output=True, shell=SHELL, timeout=timeout)
         logger.info(f'Podman exec_command: Executed command {command} on container {container_name} with output:')
+        return self.process_exec_output(exec_output, metrics)
+
+    def process_exec_output(self, exec_output: subprocess.CompletedProcess, metrics: bool = False) -> dict:
+        '''
+        Helper function that turns a finished exec into its output lines, splitting the 'time' metrics from stderr
+        '''
         self.print_process_output(exec_output)
         output = self.completed_process_to_lines(exec_output)
         if metrics:
@@ -287,6 +387,14 @@ class Podman:
         self.check_for_errors(exec_output, ExecutionException)
         return output
 
+    def open_process(self, container_name: str, command: list) -> subprocess.Popen:
+        '''
+        Starts a long lived process inside a podman container, with pipes attached to its stdin, stdout and stderr
+        '''
+        logger.info(f'Podman open_process: Starting process {command} on container {container_name}')
+        command_split = ["podman", "exec", "-i", container_name] + command
+        return subprocess.Popen(command_split, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=SHELL)
+
     def stop_container(self, container_name: str) -> None:
         '''
         Stops a podman container
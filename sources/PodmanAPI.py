@@ -0,0 +1,283 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, json, queue, socket, struct, subprocess
+import http.client
+from urllib.parse import quote, urlencode
+from sources.Podman import Podman
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+'''
+Version prefix of the libpod REST API. Every podman since 4.0 answers on it
+'''
+API_VERSION = "v4.0.0"
+# Maximum number of idle connections kept open to the podman service
+POOL_SIZE = 8
+
+def default_socket_path() -> str:
+    '''
+    Finds the socket of the podman service: CONTAINER_HOST if set, else the rootless socket, else the rootful one.
+    The service is started with `podman system service --time=0` (or the podman.socket systemd unit)
+    '''
+    host = os.environ.get("CONTAINER_HOST", "")
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "")
+    rootless = os.path.join(runtime_dir, "podman", "podman.sock")
+    if runtime_dir and os.path.exists(rootless):
+        return rootless
+    return "/run/podman/podman.sock"
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    '''
+    HTTP connection over a unix socket
+    '''
+    def __init__(self, socket_path: str, timeout: int = 120):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class PodmanAPI(Podman):
+    '''
+    Podman backend that talks to the libpod REST API over the local socket instead of running the CLI for every call.
+    Connections are kept alive and reused. Machine management and long lived processes still go through the CLI
+    '''
+    def __init__(self, socket_path: str = None, pool_size: int = POOL_SIZE):
+        super().__init__()
+        self.socket_path = socket_path or default_socket_path()
+        self.pool = queue.LifoQueue(maxsize=pool_size)
+
+    def get_connection(self) -> UnixHTTPConnection:
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return UnixHTTPConnection(self.socket_path)
+
+    def release_connection(self, connection: UnixHTTPConnection) -> None:
+        try:
+            self.pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def request(self, method: str, path: str, params: dict = None, body = None, headers: dict = None, timeout: int = 120) -> tuple:
+        '''
+        Sends a request to the podman service and returns the status and the body of the answer.
+        A pooled connection that was closed by the service is replaced once
+        '''
+        url = f"/{API_VERSION}/libpod{path}"
+        if params:
+            url += "?" + urlencode(params)
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+            headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        for attempt in range(2):
+            connection = self.get_connection()
+            try:
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                connection.request(method, url, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except socket.timeout:
+                connection.close()
+                raise subprocess.TimeoutExpired(url, timeout)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                connection.close()
+                if attempt == 1:
+                    raise
+                logger.debug(f"PodmanAPI request: reconnecting after {str(e)}")
+                continue
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.release_connection(connection)
+            return response.status, data
+
+    def check_response(self, status: int, data: bytes, exception: Exception) -> None:
+        '''
+        Raises the exception of the operation when the service answered with an error
+        '''
+        if status < 400:
+            return
+        try:
+            error = json.loads(data)
+            message = error.get("message") or error.get("cause") or str(error)
+        except Exception:
+            message = data.decode("utf-8", errors="replace")
+        raise exception(f"Process encountered errors:\n{message}") from None
+
+    def to_process(self, args, stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0) -> subprocess.CompletedProcess:
+        '''
+        Wraps an answer of the service like a finished CLI call, so the output is handled exactly like in the CLI backend
+        '''
+        return subprocess.CompletedProcess(args, returncode, stdout=stdout, stderr=stderr)
+
+    def build_image(self, name: str, tag: str, mount_path: str = ".", file_path: str = "") -> None:
+        '''
+        Builds an image. The build context is sent to the service as a tar archive
+        '''
+        logger.info(f'PodmanAPI build_image: Creating image: {name}')
+        params = {}
+        if name != "":
+            params["t"] = name + ":" + tag
+        if file_path != "":
+            params["dockerfile"] = os.path.relpath(file_path, mount_path)
+        context = self.make_archive([(os.path.join(mount_path, file), file) for file in os.listdir(mount_path)])
+        status, data = self.request("POST", "/build", params=params, body=context, headers={"Content-Type": "application/x-tar"}, timeout=600)
+        self.check_response(status, data, ImageBuildException)
+        stdout, stderr = "", ""
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            stdout += message.get("stream", "")
+            stderr += message.get("error", "")
+        image = self.to_process(["build", name], stdout.encode(), stderr.encode())
+        self.print_process_output(image)
+        if stderr:
+            raise ImageBuildException(f"Process encountered errors:\n{stderr}")
+
+    def image_exists(self, name: str, tag: str) -> bool:
+        '''
+        Checks if an image is in the list of podman images
+        '''
+        status, _ = self.request("GET", f"/images/{quote(name + ':' + tag, safe='')}/exists")
+        return status == 204
+
+    def remove_image(self, name: str, tag: str) -> None:
+        '''
+        Remove an image from the list of podman images
+        '''
+        image_name = name + ":" + tag
+        logger.info(f"PodmanAPI remove_image: Remove image: {image_name}")
+        status, data = self.request("DELETE", f"/images/{quote(image_name, safe='')}")
+        self.check_response(status, data, ImageRemoveException)
+
+    def run_image(self, image_name: str, tag: str, container_name: str, volumes: list = None) -> dict:
+        '''
+        Makes the container using an image. Volumes is a list of (host folder, container folder) to bind mount
+        '''
+        image_name = image_name + ":" + tag
+        logger.info(f'PodmanAPI run_image: Run image: {image_name}')
+        body = {"image": image_name, "name": container_name}
+        if volumes:
+            body["mounts"] = [{"type": "bind", "source": os.path.abspath(source), "destination": destination, "options": ["Z"]} for source, destination in volumes]
+        status, data = self.request("POST", "/containers/create", body=body)
+        self.check_response(status, data, ImageRunException)
+        container_id = json.loads(data).get("Id", "")
+        status, data = self.request("POST", f"/containers/{quote(container_name)}/start")
+        self.check_response(status, data, ImageRunException)
+        return self.completed_process_to_lines(self.to_process(["run", image_name], container_id.encode()))
+
+    def copy_to_container(self, file_path: str, container_name: str, dest: str = "/usr/src/app"):
+        '''
+        Copies a file to an already existing container, sent as a tar archive
+        '''
+        logger.info(f'PodmanAPI copy_to_container: Copying file {file_path} to container {container_name}:{dest}')
+        self.send_archive(self.make_archive([(file_path, os.path.basename(file_path))]), container_name, dest)
+
+    def send_archive(self, archive: bytes, container_name: str, dest: str = "/usr/src/app", timeout: int = 30) -> None:
+        '''
+        Extracts a tar archive in a container
+        '''
+        status, data = self.request("PUT", f"/containers/{quote(container_name)}/archive", params={"path": dest}, body=archive, headers={"Content-Type": "application/x-tar"}, timeout=timeout)
+        self.check_response(status, data, CopyException)
+
+    def download_archive(self, container_name: str, path: str = "/usr/src/app/.", timeout: int = 30) -> bytes:
+        '''
+        Returns the files of a folder in a container as a tar archive
+        '''
+        status, data = self.request("GET", f"/containers/{quote(container_name)}/archive", params={"path": path}, timeout=timeout)
+        self.check_response(status, data, CopyException)
+        return data
+
+    def exec_command(self, container_name: str, command: list, metrics: bool = False, timeout: int = 120) -> dict:
+        '''
+        Executes a command inside a podman container
+        '''
+        logger.info(f'PodmanAPI exec_command: Executing command {command} on container {container_name}')
+        if metrics:
+            command = ["/usr/bin/time", "-v"] + command
+        status, data = self.request("POST", f"/containers/{quote(container_name)}/exec", body={"Cmd": command, "AttachStdout": True, "AttachStderr": True})
+        self.check_response(status, data, ExecutionException)
+        exec_id = json.loads(data)["Id"]
+        status, data = self.request("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False}, timeout=timeout)
+        self.check_response(status, data, ExecutionException)
+        stdout, stderr = self.demultiplex(data)
+        exec_output = self.to_process(command, stdout, stderr)
+        logger.info(f'PodmanAPI exec_command: Executed command {command} on container {container_name} with output:')
+        return self.process_exec_output(exec_output, metrics)
+
+    def demultiplex(self, data: bytes) -> tuple:
+        '''
+        Splits the attached output of an exec session. Every chunk starts with an 8 byte header:
+        the stream (1 is stdout, 2 is stderr), 3 padding bytes and the length of the chunk as a big endian integer
+        '''
+        stdout, stderr = b"", b""
+        position = 0
+        while position + 8 <= len(data):
+            stream, length = struct.unpack(">BxxxI", data[position:position + 8])
+            chunk = data[position + 8:position + 8 + length]
+            position += 8 + length
+            if stream == 2:
+                stderr += chunk
+            else:
+                stdout += chunk
+        return stdout, stderr
+
+    def stop_container(self, container_name: str) -> None:
+        '''
+        Stops a podman container
+        '''
+        logger.info(f'PodmanAPI stop_container: Stopping container {container_name}')
+        status, data = self.request("POST", f"/containers/{quote(container_name)}/stop", params={"timeout": 0})
+        self.check_response(status, data, ContainerStopException)
+
+    def remove_container(self, container_name: str) -> None:
+        '''
+        Removes a container
+        '''
+        logger.info(f'PodmanAPI remove_container: Removing container {container_name}')
+        status, data = self.request("DELETE", f"/containers/{quote(container_name)}")
+        self.check_response(status, data, ContainerRemoveException)
+
+    def prune(self, machine_name: str = "podman-machine-default") -> None:
+        '''
+        Prune hanging images
+        '''
+        logger.info(f'PodmanAPI prune: Pruning machine {machine_name}')
+        status, data = self.request("POST", "/images/prune")
+        self.check_response(status, data, ImageRemoveException)
+
+    def close(self) -> None:
+        '''
+        Closes the pooled connections
+        '''
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,148 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, uuid, threading, contextvars
+from collections import OrderedDict, deque
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+# Stages of preparing a container for a cell, with their share of the status
+DOCKERFILE = "dockerfile"
+INJECT = "inject"
+BUILD = "build"
+RUN = "run"
+STAGE_WEIGHTS = {DOCKERFILE: 0.1, INJECT: 0.1, BUILD: 0.25, RUN: 0.1}
+# Share of the status of running the test cases
+TEST_WEIGHT = 0.45
+# Number of finished requests whose progress can still be queried
+MAX_FINISHED_PROGRESS = 100
+
+class Progress:
+    '''
+    Progress of a single request. Container and ContainerManager update the counters while the request runs,
+    the status is computed from the counters without looking at the cells or test cases
+    '''
+    def __init__(self, progress_id: str = None, cells: int = 0, test_cases: int = 0):
+        self.id = progress_id or uuid.uuid4().hex
+        self.cells = cells
+        self.test_cases = test_cases
+        self.stages = {stage: 0 for stage in STAGE_WEIGHTS}
+        self.tests_done = 0
+        self.cells_done = 0
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def stage_done(self, stage: str) -> None:
+        with self.lock:
+            self.stages[stage] += 1
+
+    def add_tests(self, count: int = 1) -> None:
+        with self.lock:
+            self.tests_done += count
+
+    def cell_done(self) -> None:
+        '''
+        A cell with all its test cases done, also when its outputs came from a previous run and no container was prepared
+        '''
+        with self.lock:
+            self.cells_done += 1
+
+    def finish(self) -> None:
+        with self.lock:
+            self.finished = True
+
+    def status(self) -> float:
+        '''
+        Approximate completion rate between 0 and 1
+        '''
+        with self.lock:
+            if self.finished:
+                return 1.0
+            if self.cells <= 0:
+                return 0.0
+            status = 0.0
+            for stage, weight in STAGE_WEIGHTS.items():
+                # Containers of finished cells went through every stage, even when they were prepared for another request
+                status += weight * min(max(self.stages[stage], self.cells_done), self.cells) / self.cells
+            total_tests = self.cells * self.test_cases
+            if total_tests > 0:
+                status += TEST_WEIGHT * min(max(self.tests_done, self.cells_done * self.test_cases), total_tests) / total_tests
+            return min(status, 1.0)
+
+    def summary(self) -> dict:
+        with self.lock:
+            summary = {"cells": self.cells, "cells_done": self.cells_done, "test_cases": self.test_cases,
+                       "tests_done": self.tests_done, "stages": dict(self.stages)}
+        summary["status"] = round(self.status(), 3)
+        return summary
+
+class ProgressTracker:
+    '''
+    Keeps the progress of the running and the last finished requests by id
+    '''
+    def __init__(self, max_finished: int = MAX_FINISHED_PROGRESS):
+        self.max_finished = max_finished
+        self.progresses = {}
+        # Running requests in the order they started, and the ids of the finished ones in the order they finished
+        self.running = OrderedDict()
+        self.finished = deque()
+        self.lock = threading.Lock()
+
+    def start(self, progress_id: str = None, cells: int = 0, test_cases: int = 0) -> Progress:
+        progress = Progress(progress_id, cells, test_cases)
+        with self.lock:
+            self.progresses[progress.id] = progress
+            self.running[progress.id] = progress
+        return progress
+
+    def finish(self, progress: Progress) -> None:
+        progress.finish()
+        with self.lock:
+            self.running.pop(progress.id, None)
+            self.finished.append(progress.id)
+            while len(self.finished) > self.max_finished:
+                finished_id = self.finished.popleft()
+                if finished_id not in self.running:
+                    self.progresses.pop(finished_id, None)
+
+    def get(self, progress_id: str = None) -> Progress:
+        '''
+        The progress of a request, or of the last started request that is still running when no id is given.
+        Returns None when there is no such request
+        '''
+        with self.lock:
+            if progress_id is not None:
+                return self.progresses.get(progress_id)
+            return next(reversed(self.running.values())) if self.running else None
+
+# Progress of the request the current thread or coroutine works for. Threads started for a request copy the context
+current_progress = contextvars.ContextVar("current_progress", default=None)
+
+def track_stage(stage: str) -> None:
+    progress = current_progress.get()
+    if progress is not None:
+        progress.stage_done(stage)
+
+def track_tests(count: int = 1) -> None:
+    progress = current_progress.get()
+    if progress is not None and count > 0:
+        progress.add_tests(count)
+
+def track_cell() -> None:
+    progress = current_progress.get()
+    if progress is not None:
+        progress.cell_done()
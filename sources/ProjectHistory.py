@@ -0,0 +1,91 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, copy, json, hashlib, threading
+from collections import OrderedDict
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.LoggerConfig import logger
+
+# Number of projects (or clients) whose last results are remembered, the least recently run are forgotten first
+MAX_PROJECTS = 100
+
+class ProjectHistory:
+    '''
+    Remembers the outputs of the cells of the last run of every project, so running a project again
+    only runs the cells whose code, signature, environment, options or test cases changed
+    '''
+    def __init__(self, max_projects: int = MAX_PROJECTS):
+        self.max_projects = max_projects
+        self.lock = threading.Lock()
+        # project -> {cell key: outputs of the cell}
+        self.projects = OrderedDict()
+
+    def get_cell_key(self, option: dict, inputs: list, timeout: int) -> str:
+        '''
+        Hash of a cell without its id, so a cell that only moved or was renamed keeps its outputs
+        '''
+        cell = {name: value for name, value in option.items() if name != 'cell_id'}
+        content = json.dumps({"cell": cell, "inputs": inputs, "timeout": timeout}, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def run(self, project: str, options: list, inputs: list, timeout: int, execute, on_cell = None) -> list:
+        '''
+        Returns the outputs of all cells in the order of the options, like ContainerManager.execute_parallel.
+        Only the changed cells are passed to execute, the outputs of the unchanged cells come from the last run
+        and are passed to on_cell before the changed cells run
+        '''
+        keys = [self.get_cell_key(option, inputs, timeout) for option in options]
+        with self.lock:
+            last_run = self.projects.get(project, {})
+        changed = [option for option, key in zip(options, keys) if key not in last_run]
+        logger.info(f"ProjectHistory run: Running {len(changed)} of {len(options)} cells of project {project}")
+        if on_cell is not None:
+            for option, key in zip(options, keys):
+                if key in last_run:
+                    on_cell({option['cell_id']: copy.deepcopy(last_run[key])})
+        changed_outputs = iter(execute(changed) if changed else [])
+
+        results = []
+        current_run = {}
+        for option, key in zip(options, keys):
+            if key in last_run:
+                outputs = copy.deepcopy(last_run[key])
+            else:
+                outputs = next(iter(next(changed_outputs).values()))
+            results.append({option['cell_id']: outputs})
+            # Cells with a failed execution are always run again
+            if all('metrics' in output for output in outputs):
+                current_run[key] = copy.deepcopy(outputs)
+
+        with self.lock:
+            self.projects[project] = current_run
+            self.projects.move_to_end(project)
+            while len(self.projects) > self.max_projects:
+                self.projects.popitem(last=False)
+        return results
+
+    def forget(self, project: str = None) -> None:
+        '''
+        Forgets the last run of a project, or of all projects
+        '''
+        with self.lock:
+            if project is None:
+                self.projects.clear()
+            else:
+                self.projects.pop(project, None)
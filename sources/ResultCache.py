@@ -0,0 +1,122 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, copy, json, time, sqlite3, hashlib, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.LanguageFactory import LanguageFactory
+from sources.LoggerConfig import logger
+
+# Database on the host that keeps the outputs of test cases across requests and restarts
+RESULT_CACHE_FILE = os.path.join(parent_dir, "result_cache.db")
+# Number of test case outputs kept, the least recently used are removed first
+MAX_CACHED_RESULTS = 100000
+# Seconds a write waits while another worker process of the production server writes to the database
+DATABASE_TIMEOUT = 30
+
+class ResultCache:
+    '''
+    Keeps the output of every test case that ran, keyed by a hash of the code, the signature, the environment,
+    the helper files and the input, so running the same test case again does not need a container
+    '''
+    def __init__(self, path: str = RESULT_CACHE_FILE, max_results: int = MAX_CACHED_RESULTS):
+        self.path = path
+        self.max_results = max_results
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        '''
+        Opens the database on first use, so importing the module does not create it
+        '''
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=DATABASE_TIMEOUT)
+            # Readers of other processes do not wait for a writer
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, output TEXT NOT NULL, last_used REAL NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            self.connection.commit()
+        return self.connection
+
+    def get_cell_key(self, data: dict, run_as_is: bool = False) -> str:
+        '''
+        Hash of everything that decides the output of a cell besides the input. The helper files are included,
+        so results are not reused after the helpers changed. The signature is hashed in the form the containers convert it to,
+        so the key does not depend on whether a container of the cell already converted it
+        '''
+        language = LanguageFactory().get_language(data['language'])
+        helpers = []
+        for file in language.helper_files:
+            with open(os.path.join(current_dir, file), "r", encoding="utf-8") as helper:
+                helpers.append(helper.read())
+        content = {
+            "code": data['code'],
+            "signature": language.check_signature(copy.deepcopy(data.get('signature', {}))) if not run_as_is else {},
+            "run_as_is": run_as_is,
+            "language": data['language'].lower(),
+            "version": data['version'],
+            "compiler": data['compiler'],
+            "specs": data['specs'],
+            "helpers": helpers
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get_key(self, cell_key: str, input: list) -> str:
+        return hashlib.sha256((cell_key + json.dumps(input)).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        '''
+        Returns the cached outputs of the keys that are in the cache
+        '''
+        found = {}
+        with self.lock:
+            connection = self.connect()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = connection.execute(f"SELECT key, output FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                found.update((key, json.loads(output)) for key, output in rows)
+            if found:
+                now = time.time()
+                connection.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                connection.commit()
+        return found
+
+    def put_many(self, results: dict) -> None:
+        '''
+        Stores the outputs of test cases, then removes the least recently used outputs beyond max_results
+        '''
+        if not results:
+            return
+        now = time.time()
+        with self.lock:
+            connection = self.connect()
+            connection.executemany("INSERT OR REPLACE INTO results (key, output, last_used) VALUES (?, ?, ?)",
+                                   [(key, json.dumps(output), now) for key, output in results.items()])
+            count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_results:
+                connection.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)", (count - self.max_results,))
+                logger.debug(f"ResultCache put_many: Removed {count - self.max_results} results")
+            connection.commit()
+
+    def clear(self) -> None:
+        with self.lock:
+            connection = self.connect()
+            connection.execute("DELETE FROM results")
+            connection.commit()
+
+result_cache = ResultCache()
@@ -0,0 +1,116 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, json, queue, threading
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ResultParser import ResultParser
+
+# Seconds without any event after which a comment is sent, so proxies do not close the stream
+KEEP_ALIVE_INTERVAL = 15
+
+class ResultStream:
+    '''
+    Turns the outputs of test cases and cells into events while they finish. The differential summary is updated
+    with every test case, so a divergence between cells is reported as soon as the second output of a test case differs
+    '''
+    def __init__(self, cell_ids: list, test_count: int):
+        self.cell_ids = list(cell_ids)
+        self.test_count = test_count
+        self.parser = ResultParser()
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        # test index -> {"test_id", "input", "cells": {cell_id: {"value", "error_msg"}}}
+        self.test_cases = {}
+        self.diverging = set()
+        self.reported = set()
+        # Test cases reported by every cell
+        self.complete = 0
+
+    def put(self, event: str, data) -> None:
+        self.events.put((event, data))
+
+    def add_case(self, cell_id, index: int, output: dict) -> None:
+        '''
+        Emits the output of a test case, then a divergence event the first time the outputs of the test case differ
+        '''
+        with self.lock:
+            if (cell_id, index) in self.reported:
+                return
+            self.reported.add((cell_id, index))
+            test = self.test_cases.setdefault(index, {"test_id": str(index), "input": output.get('input'), "cells": {}})
+            test['cells'][cell_id] = {"value": self.parser.get_result(output), "error_msg": self.parser.get_error(output)}
+            if len(test['cells']) == len(self.cell_ids):
+                self.complete += 1
+            diverged = index not in self.diverging and len(set(cell["value"] for cell in test['cells'].values())) > 1
+            if diverged:
+                self.diverging.add(index)
+                divergence = json.loads(json.dumps(test))
+            summary = self.summary()
+        self.put("case", {"cell_id": cell_id, "test_id": str(index), "input": output.get('input'), "output": self.parser.format_output(output)})
+        if diverged:
+            self.put("divergence", divergence)
+        self.put("summary", summary)
+
+    def add_cell(self, cell: dict) -> None:
+        '''
+        Emits the aggregate of a finished cell. Test cases that were not reported yet (i.e. outputs of a previous run) are reported first
+        '''
+        cell_id = self.parser.get_cell_id(cell)
+        for index, output in enumerate(cell[cell_id]):
+            self.add_case(cell_id, index, output)
+        self.put("cell", {"cell_id": cell_id, "result": self.parser.parse([cell])[cell_id]})
+
+    def summary(self) -> dict:
+        '''
+        Counts of the differential summary for the test cases with outputs so far, like ResultParser.get_differential.
+        The diverging test cases are sent once in their divergence event. Called with the lock held
+        '''
+        return {
+            "test_count": str(self.test_count),
+            "reported": str(len(self.test_cases)),
+            "complete": str(self.complete),
+            "matched": str(len(self.test_cases) - len(self.diverging)),
+            "no_match": str(len(self.diverging))
+        }
+
+    def finish(self, outputs: dict) -> None:
+        self.put("done", outputs)
+        self.events.put(None)
+
+    def fail(self, error: str) -> None:
+        self.put("error", {"status": 400, "error_message": error})
+        self.events.put(None)
+
+    def iterate(self, format: str = "sse"):
+        '''
+        Yields the events as Server-Sent Events or as lines of JSON (format "ndjson") until the run finished
+        '''
+        while True:
+            try:
+                item = self.events.get(timeout=KEEP_ALIVE_INTERVAL)
+            except queue.Empty:
+                yield "\n" if format == "ndjson" else ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            event, data = item
+            if format == "ndjson":
+                yield json.dumps({"event": event, "data": data}) + "\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -16,16 +16,31 @@ along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import os, sys, json, shutil
+import os, sys, json, shutil, threading
+from functools import partial
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(parent_dir)
 
-from sources.ContainerManager import ContainerManager
+from sources.ContainerManager import ContainerManager, IndexAllocator, FileIndexAllocator, WARM_POOL_LOCK_FILE, parse_pool_spec, get_parallelism
+from sources.FileLock import FileLock
+from sources.Container import Container
 from sources.Podman import Podman, podman
+from sources.PodmanAPI import PodmanAPI
+from sources.AsyncPodman import AsyncPodman
+from sources.BaseImages import base_images
+from sources.ProjectHistory import ProjectHistory
+from sources.JobManager import JobManager, JobStore
+from sources.ResultStream import ResultStream
+from sources.ProgressTracker import current_progress
+from sources.SessionManager import SessionManager, DEFAULT_SESSION, get_token_session_id
+from sources.FairShareScheduler import FairShareScheduler
+from sources.ConcurrencyController import ConcurrencyController, concurrency_controller
+from sources.Dispatcher import AgentRegistry, Dispatcher
+from sources.CustomException import *
 from sources.ResultParser import ResultParser
-from sources.LoggerConfig import logger, exec_logger, clear_exec_log_file
+from sources.LoggerConfig import logger
 from sources.LanguageFactory import LanguageFactory, SUPPORTED_LANGUAGES
 from sources.TestCasesGenerator import TestCasesGenerator
 from sources.CellSim import CellSim
@@ -34,17 +49,35 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECTS_FOLDER = os.path.join(BASE_DIR, "..", "projects")
 
 class FlaskServer:
-    def __init__(self, container_manager: ContainerManager = ContainerManager, podman_instance: Podman = podman, language_factory: LanguageFactory = LanguageFactory):
+    def __init__(self, container_manager: ContainerManager = ContainerManager, podman_instance: Podman = podman, language_factory: LanguageFactory = LanguageFactory, mount_code: bool = False,
+                 concurrency: ConcurrencyController = concurrency_controller, index_allocator: IndexAllocator = None, local_execution: bool = True,
+                 clean: bool = True, job_store: JobStore = None, pool_lock: FileLock = None):
         self.app = Flask(__name__)
         CORS(self.app)
         self.ready = False
         self.make_sessions()
-        self.manager = container_manager()
         self.podman = podman_instance
+        # Every client session has its own containers, they use the same podman backend as the server (i.e. the CLI or the REST API client).
+        # The containers of the host (adapted to the host by concurrency, or MAX_CONTAINERS when it is None) are shared fairly between the sessions
+        self.sessions = SessionManager(partial(container_manager, container_class=partial(Container, podman_instance=self.podman, mount_code=mount_code)),
+                                       FairShareScheduler(concurrency), index_allocator)
+        # Container manager of the requests that do not name a session
+        self.manager = self.sessions.get_session().container_manager
         self.language_factory = language_factory()
-        self.podman.init()
+        self.history = ProjectHistory()
+        # Runs of execute_code submitted as jobs, kept in job_store when other worker processes answer for them too
+        self.jobs = JobManager(store=job_store)
+        # Executor agents the cells are spread across, together with the containers of the server unless local_execution is off
+        self.agents = AgentRegistry()
+        self.local_execution = local_execution
+        # The workers of the production server leave the containers of the other workers alone, gunicorn cleans up once when it starts
+        self.podman.init(clean=clean)
+        # Only the worker process holding pool_lock builds the warm containers
+        self.pool_lock = pool_lock
+        if pool_lock is None or pool_lock.acquire(blocking=False):
+            self.manager.start_pool()
+        self.sessions.start_reaper()
         self.setup_routes()
-        clear_exec_log_file()
 
     def setup_routes(self):
         @self.app.route('/')
@@ -56,62 +89,142 @@ class FlaskServer:
             if not self.ready:
                 return jsonify({"message": {"status": 503, "error_message": "Server is not ready yet. Please wait!"}}), 503
             try:
-                data = request.get_json()
-                if not data:
-                    return jsonify({"message": {"status": 400, "error_message": "Invalid JSON input."}}), 400
-                options = data.get("message", {}).get("options", [])
-                input_data = data.get("message", {}).get("input", [])
-                output_data = data.get("message", {}).get("output", [])
-                generate_test_cases = data.get("message", {}).get("generate_test_cases", False)
-                test_count = data.get("message", {}).get("test_cases_count", 25)
-                test_signature = data.get("message", {}).get("test_cases_signature", [])
-                timeout = data.get("message", {}).get("timeout", 60)
-                exec_logger.info(f"Code cells: {len(options)}")
-
-                if not (input_data or (generate_test_cases and test_count > 0)):
-                    logger.error("Server execute_code: Test cases are missing! Add manual tests or generate tests automatically")
-                    return jsonify({"message" : {"status": 400, "error_message": "Test cases are missing! Add manual tests or generate tests automatically"}}), 400
-
-                if not generate_test_cases:
-                    if len(input_data) != len(output_data):
-                        logger.error("Server execute_code: Manual testing must provide equal number of inputs and outputs")
-                        return jsonify({"message" : {"status": 400, "error_message": "Input and output lists must have equal length"}}), 400
-
-                if generate_test_cases == True:
-                    try:
-                        generator = TestCasesGenerator()
-                        generated_inputs = generator.generate_test_cases(test_signature, test_count)
-                        input_data = generated_inputs
-
-                    except Exception as e:
-                        logger.error("Server execute_code: Test generation failed")
-                        return jsonify({"message": {"status": 400, "error_message": "Failed to generate test cases: check types to be correct"}}), 400
-                exec_logger.info(f"Total test cases: {len(input_data)}")
-                if timeout < 5:
-                    logger.error("Server execute_code: error: Timeout value needs to be at least 5 seconds")
-                    return jsonify({"message": {"status": 400, "error_message": "Timeout value needs to be at least 5 seconds"}}), 400
-
-                if not options:
-                    logger.error("Server execute_code: error: Options list cannot be empty.")
-                    return jsonify({"message": {"status": 400, "error_message": "Options list cannot be empty."}}), 400
-
-                raw_outputs = self.manager.execute_parallel(options, input_data, timeout)
-                # if manual testing, simulate provided outputs as cell output:
-                if not generate_test_cases:
-                    output_cell = CellSim().simulate(name="expected_output", inputs=input_data, outputs=output_data)
-                    raw_outputs.append(output_cell)
-                result_parser = ResultParser()
-                outputs = result_parser.parse(raw_outputs)
-                clear_exec_log_file()
+                execution = self.prepare_execution(request.get_json())
+                outputs = self.run_execution(execution)
+            except InvalidRequestException as e:
+                return jsonify({"message": {"status": 400, "error_message": f"{str(e)}"}}), 400
+            except SessionLimitException as e:
+                return jsonify({"message": {"status": 429, "error_message": f"{str(e)}"}}), 429
             except Exception as e:
                 logger.error(f"Server execute_code: {str(e)}")
-                clear_exec_log_file()
                 return jsonify({"message": {"status": 400, "error_message": f"{str(e)}"}}), 400
 
             logger.info("Successfully handled execute code request")
             response_json = json.dumps(obj=outputs, indent=2, sort_keys=False)
             return Response(response_json, mimetype="application/json"), 200
 
+        @self.app.route('/api/v1/execute_code/stream', methods=['POST'])
+        def execute_code_stream():
+            '''
+            Streaming version of execute_code. Sends an event per test case as soon as it ran, the result of every cell once it is done,
+            the differential summary after every test case and the parsed results of execute_code at the end.
+            Server-Sent Events by default, lines of JSON with ?format=ndjson or an Accept header of application/x-ndjson
+            '''
+            if not self.ready:
+                return jsonify({"message": {"status": 503, "error_message": "Server is not ready yet. Please wait!"}}), 503
+            try:
+                execution = self.prepare_execution(request.get_json())
+            except InvalidRequestException as e:
+                return jsonify({"message": {"status": 400, "error_message": f"{str(e)}"}}), 400
+            except Exception as e:
+                logger.error(f"Server execute_code_stream: {str(e)}")
+                return jsonify({"message": {"status": 400, "error_message": f"{str(e)}"}}), 400
+            stream_format = "ndjson" if request.args.get("format") == "ndjson" or "application/x-ndjson" in request.headers.get("Accept", "") else "sse"
+            cell_ids = [option['cell_id'] for option in execution['options']]
+            if not execution['generate_test_cases']:
+                cell_ids.append("expected_output")
+            stream = ResultStream(cell_ids, len(execution['input']))
+
+            def run():
+                try:
+                    outputs = self.run_execution(execution, on_cell=stream.add_cell, on_case=stream.add_case)
+                    stream.finish(outputs)
+                except Exception as e:
+                    logger.error(f"Server execute_code_stream: {str(e)}")
+                    stream.fail(str(e))
+            threading.Thread(target=run, daemon=True).start()
+            mimetype = "application/x-ndjson" if stream_format == "ndjson" else "text/event-stream"
+            return Response(stream.iterate(stream_format), mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        @self.app.route('/api/v1/jobs', methods=['POST'])
+        def submit_job():
+            '''
+            API for running execute_code in the background. Returns the id of the job at once
+            '''
+            if not self.ready:
+                return jsonify({"message": {"status": 503, "error_message": "Server is not ready yet. Please wait!"}}), 503
+            try:
+                execution = self.prepare_execution(request.get_json())
+                job = self.jobs.submit(lambda job: self.run_execution(execution, on_cell=job.add_cell_result, progress_id=job.id),
+                                       total_cells=len(execution['options']) + (0 if execution['generate_test_cases'] else 1),
+                                       metadata={"project": execution['project'], "session": execution['session']},
+                                       get_progress=self.get_job_progress)
+            except InvalidRequestException as e:
+                return jsonify({"message": {"status": 400, "error_message": f"{str(e)}"}}), 400
+            except JobQueueFullException as e:
+                logger.warning(f"Server submit_job: {str(e)}")
+                return jsonify({"message": {"status": 429, "error_message": f"{str(e)}"}}), 429
+            return jsonify({"job_id": job.id, "status": job.status}), 202
+
+        @self.app.route('/api/v1/jobs', methods=['GET'])
+        def list_jobs():
+            return jsonify({"jobs": self.jobs.list()}), 200
+
+        @self.app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id):
+            try:
+                job = self.jobs.get(job_id)
+                summary = job.summary()
+                summary['progress'] = round(job.get_progress(), 3)
+                return jsonify(summary), 200
+            except JobNotFoundException as e:
+                return jsonify({"message": {"status": 404, "error_message": f"{str(e)}"}}), 404
+
+        @self.app.route('/api/v1/jobs/<job_id>/results', methods=['GET'])
+        def get_job_results(job_id):
+            '''
+            API for the results of a job. Until the job is done, the raw results of the cells that finished are returned
+            '''
+            try:
+                response_json = json.dumps(obj=self.jobs.get(job_id).results(), indent=2, sort_keys=False)
+                return Response(response_json, mimetype="application/json"), 200
+            except JobNotFoundException as e:
+                return jsonify({"message": {"status": 404, "error_message": f"{str(e)}"}}), 404
+
+        @self.app.route('/api/v1/jobs/<job_id>', methods=['DELETE'])
+        def cancel_job(job_id):
+            try:
+                return jsonify(self.jobs.cancel(job_id).summary()), 200
+            except JobNotFoundException as e:
+                return jsonify({"message": {"status": 404, "error_message": f"{str(e)}"}}), 404
+            except JobStateException as e:
+                return jsonify({"message": {"status": 409, "error_message": f"{str(e)}"}}), 409
+
+        @self.app.route('/api/v1/sessions', methods=['GET'])
+        def list_sessions():
+            return jsonify({"sessions": self.sessions.list_sessions()}), 200
+
+        @self.app.route('/api/v1/sessions/<session_id>', methods=['GET'])
+        def get_session(session_id):
+            session = self.sessions.find_session(session_id) if self.is_own_session(session_id) else None
+            if session is None:
+                return jsonify({"message": {"status": 404, "error_message": f"Session {session_id} not found"}}), 404
+            return jsonify(session.summary()), 200
+
+        @self.app.route('/api/v1/sessions/<session_id>/results', methods=['GET'])
+        def get_session_results(session_id):
+            '''
+            API for the results of the last request of a session, or of one of its last requests with ?request_id=
+            '''
+            session = self.sessions.find_session(session_id) if self.is_own_session(session_id) else None
+            results = session.get_results(request.args.get("request_id")) if session is not None else None
+            if results is None:
+                return jsonify({"message": {"status": 404, "error_message": f"No results for session {session_id}"}}), 404
+            return Response(json.dumps(obj=results, indent=2, sort_keys=False), mimetype="application/json"), 200
+
+        @self.app.route('/api/v1/sessions/<session_id>', methods=['DELETE'])
+        def remove_session(session_id):
+            '''
+            API for ending a session, its containers are removed
+            '''
+            try:
+                if not self.is_own_session(session_id):
+                    raise SessionNotFoundException(f"Session {session_id} not found")
+                self.sessions.remove_session(session_id)
+                return jsonify({"message": f"Removed session {session_id}"}), 200
+            except SessionNotFoundException as e:
+                return jsonify({"message": {"status": 404, "error_message": f"{str(e)}"}}), 404
+
         @self.app.route('/api/v1/get_projects', methods=['GET'])
         def get_projects():
             '''
@@ -188,10 +301,67 @@ class FlaskServer:
             '''
             API for cleaning the backend. It removes all podman containers, images and folders from the sessions folder
             '''
-            self.manager.purge()
+            self.sessions.purge()
             logger.info("Server purge_containers: Successfully handled purge containers request")
             return jsonify({"message": "Successfully purged containers"}), 200
 
+        @self.app.route('/api/v1/agents', methods=['GET'])
+        def list_agents():
+            return jsonify({"agents": self.agents.list(), "local_execution": self.local_execution}), 200
+
+        @self.app.route('/api/v1/agents', methods=['POST'])
+        def register_agent():
+            '''
+            API for adding an executor agent, i.e. {"url": "http://host:5100"}. The agent must answer before it is added
+            '''
+            error = self.check_agent_token()
+            if error is not None:
+                return error
+            url = (request.get_json(silent=True) or {}).get("url")
+            if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+                return jsonify({"message": {"status": 400, "error_message": "An http url is required"}}), 400
+            try:
+                agent = self.agents.register(url)
+                return jsonify(agent.summary()), 200
+            except AgentException as e:
+                return jsonify({"message": {"status": 502, "error_message": f"{str(e)}"}}), 502
+
+        @self.app.route('/api/v1/agents', methods=['DELETE'])
+        def unregister_agent():
+            '''
+            API for removing an executor agent, given with ?url=. Cells that run on it finish
+            '''
+            error = self.check_agent_token()
+            if error is not None:
+                return error
+            try:
+                self.agents.unregister(request.args.get("url", ""))
+                return jsonify({"message": "Removed agent"}), 200
+            except AgentNotFoundException as e:
+                return jsonify({"message": {"status": 404, "error_message": f"{str(e)}"}}), 404
+
+        @self.app.route('/api/v1/prepare_images', methods=['POST'])
+        def prepare_images():
+            '''
+            API for building the base images of environments ahead of time, i.e. {"images": "python:3.10, cpp/gcc"}
+            '''
+            message = request.get_json(silent=True)
+            spec = message.get('images') if isinstance(message, dict) else None
+            if not isinstance(spec, str) or not spec.strip():
+                logger.error("Server prepare_images: error: Missing 'images' in the body")
+                return jsonify({"error": "Missing 'images' in the body"}), 400
+            try:
+                entries = parse_pool_spec(spec)
+            except WarmPoolException as e:
+                return jsonify({"error": str(e)}), 400
+            try:
+                images = base_images.prepare_all(self.podman, entries)
+                logger.info("Server prepare_images: Successfully handled prepare images request")
+                return jsonify({"images": images}), 200
+            except Exception as e:
+                logger.error(f"Server prepare_images: error: {str(e)}")
+                return jsonify({"error": str(e)}), 500
+
         @self.app.route('/api/v1/versions_compilers', methods=['GET'])
         def get_versions_compilers():
             '''
@@ -226,12 +396,21 @@ class FlaskServer:
         def status_execution():
             '''
             API for obtaining the status of the execution. It returns a float between 0 and 1.
+            The status of a job is given with ?job_id=, otherwise it is the status of the last request of the session that is still running
             '''
             try:
-                status = 0
-                status = round(self.manager.calculate_status(), 3)
+                job_id = request.args.get("job_id")
+                if job_id:
+                    try:
+                        status = self.jobs.get(job_id).get_progress()
+                    except JobNotFoundException:
+                        status = 0
+                else:
+                    session = self.sessions.find_session(self.get_session_id())
+                    progress = session.progress.get() if session is not None else None
+                    status = progress.status() if progress is not None else 0
                 response = {
-                    'status': status
+                    'status': round(status, 3)
                 }
                 return jsonify(response), 200
             except Exception as e:
@@ -240,6 +419,158 @@ class FlaskServer:
                 }
                 return jsonify(response), 200
 
+    def prepare_execution(self, data: dict) -> dict:
+        '''
+        Validates an execute_code request and generates its test cases. Raises InvalidRequestException
+        with the message for the client
+        '''
+        if not data:
+            raise InvalidRequestException("Invalid JSON input.")
+        options = data.get("message", {}).get("options", [])
+        input_data = data.get("message", {}).get("input", [])
+        output_data = data.get("message", {}).get("output", [])
+        generate_test_cases = data.get("message", {}).get("generate_test_cases", False)
+        test_count = data.get("message", {}).get("test_cases_count", 25)
+        test_signature = data.get("message", {}).get("test_cases_signature", [])
+        timeout = data.get("message", {}).get("timeout", 60)
+        # Opting out of the result cache for the whole request, cells can also opt out one by one
+        use_cache = data.get("message", {}).get("use_cache", True)
+        if not use_cache:
+            options = [dict(option, use_cache=False) for option in options]
+        # Runs of the same project (or client) only run the cells that changed since the last run
+        project = data.get("message", {}).get("project") or request.headers.get("X-Client-Token")
+        session = data.get("message", {}).get("session") or self.get_session_id()
+
+        if not (input_data or (generate_test_cases and test_count > 0)):
+            logger.error("Server execute_code: Test cases are missing! Add manual tests or generate tests automatically")
+            raise InvalidRequestException("Test cases are missing! Add manual tests or generate tests automatically")
+
+        if not generate_test_cases:
+            if len(input_data) != len(output_data):
+                logger.error("Server execute_code: Manual testing must provide equal number of inputs and outputs")
+                raise InvalidRequestException("Input and output lists must have equal length")
+
+        if generate_test_cases == True:
+            try:
+                generator = TestCasesGenerator()
+                generated_inputs = generator.generate_test_cases(test_signature, test_count)
+                input_data = generated_inputs
+
+            except Exception as e:
+                logger.error("Server execute_code: Test generation failed")
+                raise InvalidRequestException("Failed to generate test cases: check types to be correct")
+        if timeout < 5:
+            logger.error("Server execute_code: error: Timeout value needs to be at least 5 seconds")
+            raise InvalidRequestException("Timeout value needs to be at least 5 seconds")
+
+        if not options:
+            logger.error("Server execute_code: error: Options list cannot be empty.")
+            raise InvalidRequestException("Options list cannot be empty.")
+
+        for option in options:
+            try:
+                get_parallelism(option)
+            except ValueError as e:
+                logger.error(f"Server execute_code: error: {str(e)}")
+                raise InvalidRequestException(str(e))
+
+        return {
+            "options": options,
+            "input": input_data,
+            "output": output_data,
+            "generate_test_cases": generate_test_cases,
+            "timeout": timeout,
+            "use_cache": use_cache,
+            "project": project,
+            "session": session
+        }
+
+    def get_session_id(self) -> str:
+        '''
+        Session of the client of the current request, None for the default session
+        '''
+        session_id = request.headers.get("X-Session-Id") or request.args.get("session")
+        if session_id:
+            return session_id
+        token = request.headers.get("X-Client-Token")
+        return get_token_session_id(token) if token else None
+
+    def check_agent_token(self):
+        '''
+        Agents get the code of every user and their outputs are trusted, so they are only added or removed with the agent token.
+        Returns the error response, or None when the request has the token
+        '''
+        if not self.agents.token:
+            return jsonify({"message": {"status": 403, "error_message": "Set MDT_AGENT_TOKEN to register agents"}}), 403
+        if request.headers.get("X-Agent-Token") != self.agents.token:
+            return jsonify({"message": {"status": 401, "error_message": "Invalid agent token"}}), 401
+        return None
+
+    def is_own_session(self, session_id: str) -> bool:
+        '''
+        A session is only seen or ended by its own client, which names it like in its other requests
+        '''
+        return (self.get_session_id() or DEFAULT_SESSION) == session_id
+
+    def run_execution(self, execution: dict, on_cell = None, on_case = None, progress_id: str = None) -> list:
+        '''
+        Runs the cells of a prepared request and parses the results. on_cell gets the raw result of every cell that finished,
+        on_case the cell id, position and raw output of every test case. The progress of the run is kept under progress_id
+        '''
+        options, input_data = execution['options'], execution['input']
+        session = self.sessions.get_session(execution['session'])
+        progress = session.progress.start(progress_id, len(options), len(input_data))
+        # Containers and the container manager update the progress of the request they run for
+        token = current_progress.set(progress)
+        try:
+            with self.sessions.running(session):
+                outputs = self.run_cells(self.get_executor(session), execution, on_cell, on_case)
+            session.save_results(progress.id, outputs)
+            return outputs
+        finally:
+            session.progress.finish(progress)
+            current_progress.reset(token)
+
+    def get_job_progress(self, job) -> float:
+        '''
+        Completion rate of a job of this process, from the progress of the request it runs
+        '''
+        session = self.sessions.find_session(job.metadata.get('session'))
+        progress = session.progress.get(job.id) if session is not None else None
+        return progress.status() if progress is not None else 0
+
+    def get_executor(self, session) -> ContainerManager:
+        '''
+        The container manager of the session, or a dispatcher across the executor agents and the containers of the session once agents registered
+        '''
+        agents = self.agents.get_agents()
+        if not agents:
+            return session.container_manager
+        return Dispatcher(agents, local=session.container_manager if self.local_execution else None)
+
+    def run_cells(self, manager: ContainerManager, execution: dict, on_cell = None, on_case = None) -> list:
+        options, input_data, timeout = execution['options'], execution['input'], execution['timeout']
+        # if manual testing, simulate provided outputs as cell output:
+        output_cell = None
+        if not execution['generate_test_cases']:
+            output_cell = CellSim().simulate(name="expected_output", inputs=input_data, outputs=execution['output'])
+            if on_cell is not None:
+                on_cell(output_cell)
+        if execution['project'] and execution['use_cache']:
+            def on_unchanged_cell(cell: dict):
+                # Cells of the previous run never reach the container manager
+                current_progress.get().cell_done()
+                if on_cell is not None:
+                    on_cell(cell)
+            raw_outputs = self.history.run(execution['project'], options, input_data, timeout,
+                                           lambda changed: manager.execute_parallel(changed, input_data, timeout, on_cell, on_case), on_unchanged_cell)
+        else:
+            raw_outputs = manager.execute_parallel(options, input_data, timeout, on_cell, on_case)
+        if output_cell is not None:
+            raw_outputs.append(output_cell)
+        result_parser = ResultParser()
+        return result_parser.parse(raw_outputs)
+
     def run(self, host='localhost', port=5000, debug=True):
         logger.info("Server run: Starting the server...")
         self.remove_cache()
@@ -257,7 +588,55 @@ class FlaskServer:
             os.mkdir(os.path.join(parent_dir, "sessions"))
 
 
+def create_server(podman_api: bool = False, pool: str = None, max_containers: int = None, fixed_containers: bool = False,
+                  use_asyncio: bool = False, mount_code: bool = False, workers: int = 1, index_allocator: IndexAllocator = None,
+                  agents: list = None, local_execution: bool = True, clean: bool = True) -> FlaskServer:
+    '''
+    Builds the server from the options of the command line or of the production entry point (wsgi.py).
+    Workers is the number of server processes sharing the host, they share the container indices through index_allocator.
+    Agents are the URLs of the executor agents the cells are spread across. clean removes the stray containers and session folders at start.
+    Several workers share the jobs through a job store, and one of them builds the warm containers
+    '''
+    # Talk to the podman service over its socket instead of running the CLI for every call
+    podman_instance = PodmanAPI() if podman_api else podman
+    container_manager = ContainerManager
+    concurrency = concurrency_controller if workers == 1 else ConcurrencyController(workers=workers)
+    # Warm containers built in the background, e.g. --pool "python:3.10 x2, cpp/gcc x2"
+    if pool:
+        container_manager = partial(container_manager, pool_spec=pool)
+    # Ceiling of the number of containers, the limit itself follows the CPUs, memory and load of the host
+    if max_containers:
+        concurrency = ConcurrencyController(ceiling=max_containers, workers=workers)
+    # Always use MAX_CONTAINERS containers
+    if fixed_containers:
+        concurrency = None
+    # Run cells and test cases as coroutines instead of one thread per cell
+    if use_asyncio:
+        podman_instance = podman_instance if podman_api else AsyncPodman()
+        container_manager = partial(container_manager, engine="asyncio")
+    # mount_code bind mounts the session folders in the containers instead of copying the code into them
+    shared = workers > 1
+    server = FlaskServer(container_manager=container_manager, podman_instance=podman_instance, mount_code=mount_code,
+                         concurrency=concurrency, index_allocator=index_allocator, local_execution=local_execution, clean=clean,
+                         job_store=JobStore() if shared else None, pool_lock=FileLock(WARM_POOL_LOCK_FILE) if shared else None)
+    for url in agents or []:
+        try:
+            server.agents.register(url)
+        except AgentException as e:
+            logger.warning(f"Server create_server: {str(e)}")
+    return server
+
 if __name__ == '__main__':
     logger.info("Server: Initializing server...")
-    server = FlaskServer()
-    server.run(debug= False)
\ No newline at end of file
+    server = create_server(podman_api="--podman-api" in sys.argv,
+                           pool=sys.argv[sys.argv.index("--pool") + 1] if "--pool" in sys.argv else None,
+                           max_containers=int(sys.argv[sys.argv.index("--max-containers") + 1]) if "--max-containers" in sys.argv else None,
+                           fixed_containers="--fixed-containers" in sys.argv,
+                           use_asyncio="--asyncio" in sys.argv,
+                           mount_code="--mount" in sys.argv,
+                           # Executor agents on this host take their container indices from the same counter as the server
+                           index_allocator=FileIndexAllocator(),
+                           # e.g. --agents "http://host1:5100, http://host2:5100", with --agents-only the server runs no containers itself
+                           agents=[url.strip() for url in sys.argv[sys.argv.index("--agents") + 1].split(",") if url.strip()] if "--agents" in sys.argv else None,
+                           local_execution="--agents-only" not in sys.argv)
+    server.run(debug= False)
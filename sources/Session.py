@@ -14,9 +14,75 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
-from ContainerManager import ContainerManager
+import os, sys, time, threading
+from collections import OrderedDict
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ContainerManager import ContainerManager
+from sources.ProgressTracker import ProgressTracker
+
+# Number of results of requests a session keeps, the oldest are forgotten first
+MAX_SESSION_RESULTS = 10
 
 class Session:
-    def __init__(self, index: int):
-        self.container_manager = ContainerManager()
-        self.index = index
\ No newline at end of file
+    '''
+    A client of the server, with its own containers, progress of its requests and results of its last requests
+    '''
+    def __init__(self, session_id: str, container_manager: ContainerManager):
+        self.id = session_id
+        self.container_manager = container_manager
+        self.progress = ProgressTracker()
+        # request id -> parsed results
+        self.results = OrderedDict()
+        self.created = time.time()
+        self.last_used = self.created
+        # Number of requests of the session that are running
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def touch(self) -> None:
+        self.last_used = time.time()
+
+    def begin(self) -> None:
+        with self.lock:
+            self.running += 1
+            self.touch()
+
+    def end(self) -> None:
+        with self.lock:
+            self.running -= 1
+            self.touch()
+
+    def is_idle(self, timeout: float) -> bool:
+        return self.running == 0 and time.time() - self.last_used >= timeout
+
+    def save_results(self, request_id: str, outputs: dict) -> None:
+        with self.lock:
+            self.results[request_id] = outputs
+            while len(self.results) > MAX_SESSION_RESULTS:
+                self.results.popitem(last=False)
+
+    def get_results(self, request_id: str = None) -> dict:
+        '''
+        The results of a request of the session, or of its last request. None when they are not known
+        '''
+        with self.lock:
+            if request_id is not None:
+                return self.results.get(request_id)
+            return next(reversed(self.results.values())) if self.results else None
+
+    def summary(self) -> dict:
+        return {
+            "session_id": self.id,
+            "containers": self.container_manager.container_count,
+            "container_limit": self.container_manager.max_containers,
+            "running": self.running,
+            "results": list(self.results),
+            "created": self.created,
+            "last_used": self.last_used
+        }
+
+    def close(self) -> None:
+        self.container_manager.purge()
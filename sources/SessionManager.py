@@ -14,17 +14,149 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with the source code. If not, see <https://www.gnu.org/licenses/>.
 """
-from Session import Session
+import os, sys, hashlib, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Session import Session
+from sources.ContainerManager import ContainerManager, IndexAllocator
+from sources.FairShareScheduler import FairShareScheduler, SessionShare
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+# Session of the requests that do not name one, it also keeps the warm containers
+DEFAULT_SESSION = "default"
+# Maximum number of sessions, idle sessions are removed first when a new one is created
+MAX_SESSIONS = 64
+# Sessions without any request for this many seconds are removed with their containers
+SESSION_IDLE_TIMEOUT = 30 * 60
+# Seconds between two checks for idle sessions
+REAP_INTERVAL = 60
+
+def get_token_session_id(token: str) -> str:
+    '''
+    Session of a client token. The token itself is never used as a session id, so it does not show up in logs or answers
+    '''
+    return "token-" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
 
 class SessionManager:
-    def __init__(self):
-        self.sessions = []
+    '''
+    Keeps a session per client, each with its own container manager. The containers of the host are shared between
+    the sessions by the fair share scheduler, and container indices by a shared allocator
+    '''
+    def __init__(self, container_manager = ContainerManager, scheduler: FairShareScheduler = None, index_allocator: IndexAllocator = None,
+                 max_sessions: int = MAX_SESSIONS, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        # Builds the container manager of a session, i.e. ContainerManager or a partial of it
+        self.container_manager = container_manager
+        self.scheduler = scheduler if scheduler is not None else FairShareScheduler()
+        self.index_allocator = index_allocator if index_allocator is not None else IndexAllocator()
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.lock = threading.RLock()
+        self.reaper = None
+        self.stopped = threading.Event()
+
+    def create_session(self, session_id: str) -> Session:
+        with self.lock:
+            if session_id in self.sessions:
+                return self.sessions[session_id]
+            if len(self.sessions) >= self.max_sessions:
+                self.reap(timeout=0)
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionLimitException("Too many sessions, try again later")
+            options = {"concurrency": SessionShare(self.scheduler, session_id), "index_allocator": self.index_allocator}
+            if session_id != DEFAULT_SESSION:
+                # Only the default session keeps warm containers, the other sessions claim them from it
+                options["pool_spec"] = ""
+                options["pool_source"] = self.create_session(DEFAULT_SESSION).container_manager
+            session = Session(session_id, self.container_manager(**options))
+            self.sessions[session_id] = session
+            self.scheduler.register(session)
+        logger.info(f"SessionManager create_session: Created session {session_id}")
+        return session
+
+    def get_session(self, session_id: str = None) -> Session:
+        '''
+        Returns the session, creating it on its first request
+        '''
+        session = self.create_session(session_id or DEFAULT_SESSION)
+        session.touch()
+        return session
+
+    def find_session(self, session_id: str = None) -> Session:
+        with self.lock:
+            return self.sessions.get(session_id or DEFAULT_SESSION)
+
+    def remove_session(self, session_id: str) -> None:
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise SessionNotFoundException(f"Session {session_id} not found")
+        self.scheduler.unregister(session)
+        session.close()
+        logger.info(f"SessionManager remove_session: Removed session {session_id}")
+
+    def save_session(self, session_id: str, request_id: str, outputs: dict) -> None:
+        session = self.find_session(session_id)
+        if session is not None:
+            session.save_results(request_id, outputs)
+
+    def list_sessions(self) -> list:
+        '''
+        Summaries of the sessions without their ids and request ids, which give access to the results of a session
+        '''
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return [{name: value for name, value in session.summary().items() if name not in ("session_id", "results")} for session in sessions]
+
+    @contextmanager
+    def running(self, session: Session):
+        '''
+        Marks a request of the session as running, so the scheduler gives the session its share of the containers
+        '''
+        session.begin()
+        self.scheduler.begin(session)
+        try:
+            yield session
+        finally:
+            self.scheduler.end(session)
+            session.end()
+
+    def reap(self, timeout: float = None) -> list:
+        '''
+        Removes the sessions without a request for timeout seconds, except the default session. Returns their ids
+        '''
+        timeout = self.idle_timeout if timeout is None else timeout
+        with self.lock:
+            idle = [session_id for session_id, session in self.sessions.items() if session_id != DEFAULT_SESSION and session.is_idle(timeout)]
+        for session_id in idle:
+            try:
+                self.remove_session(session_id)
+            except Exception as e:
+                logger.warning(f"SessionManager reap: Failed to remove session {session_id}: {str(e)}")
+        return idle
 
-    def create_session():
-        pass
+    def start_reaper(self, interval: float = REAP_INTERVAL) -> None:
+        if self.reaper is not None and self.reaper.is_alive():
+            return
+        def reap_loop():
+            while not self.stopped.wait(interval):
+                self.reap()
+        self.reaper = threading.Thread(target=reap_loop, daemon=True)
+        self.reaper.start()
 
-    def remove_session():
-        pass
+    def stop_reaper(self) -> None:
+        self.stopped.set()
 
-    def save_session():
-        pass
\ No newline at end of file
+    def purge(self) -> None:
+        '''
+        Removes the containers of all sessions
+        '''
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.container_manager.purge()
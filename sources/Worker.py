@@ -0,0 +1,118 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys, struct, threading, subprocess
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.CustomException import *
+from sources.LoggerConfig import logger
+
+class Worker:
+    '''
+    Models a long lived process inside a container that answers requests streamed over its stdin.
+    Every message is prefixed by its length as a 4 byte big endian integer, a zero length request stops the process.
+    '''
+    def __init__(self, process: subprocess.Popen, source: str = ""):
+        self.process = process
+        # The code the worker has loaded, used to decide if the worker can be kept when the code changes
+        self.source = source
+        self.lock = threading.Lock()
+
+    def send(self, payload: str) -> None:
+        '''
+        Writes a length prefixed message to the worker
+        '''
+        data = payload.encode("utf-8")
+        self.process.stdin.write(struct.pack(">I", len(data)) + data)
+        self.process.stdin.flush()
+
+    def receive(self) -> str:
+        '''
+        Reads a length prefixed message from the worker
+        '''
+        length = struct.unpack(">I", self.read_exact(4))[0]
+        return self.read_exact(length).decode("utf-8")
+
+    def read_exact(self, length: int) -> bytes:
+        '''
+        Helper function that reads exactly length bytes from the stdout pipe of the worker
+        '''
+        data = b""
+        while len(data) < length:
+            chunk = self.process.stdout.read(length - len(data))
+            if not chunk:
+                raise WorkerException("Worker closed the pipe")
+            data += chunk
+        return data
+
+    def request(self, payload: str, timeout: int = 60) -> str:
+        '''
+        Sends a request and waits for the answer. If the worker does not answer in time it is killed
+        '''
+        with self.lock:
+            result = {}
+
+            def exchange():
+                try:
+                    self.send(payload)
+                    result['response'] = self.receive()
+                except Exception as e:
+                    result['error'] = e
+
+            thread = threading.Thread(target=exchange, daemon=True)
+            thread.start()
+            thread.join(timeout)
+            if thread.is_alive():
+                self.kill()
+                raise RunCodeTimeoutException(f"Worker did not answer within {timeout} seconds")
+            if 'error' in result:
+                raise WorkerException(f"{str(result['error'])}\n{self.get_errors()}".strip())
+            return result['response']
+
+    def get_errors(self) -> str:
+        '''
+        Returns what the worker wrote on stderr, once it has stopped. Used to report why a worker died
+        '''
+        try:
+            self.process.wait(timeout=1)
+            return self.process.stderr.read().decode("utf-8", errors="replace")
+        except Exception:
+            return ""
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self) -> None:
+        '''
+        Asks the worker to stop, killing it if it does not
+        '''
+        try:
+            if self.is_alive():
+                self.process.stdin.write(struct.pack(">I", 0))
+                self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception as e:
+            logger.debug(f"Worker stop: {str(e)}")
+            self.kill()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.wait(timeout=2)
+        except Exception as e:
+            logger.debug(f"Worker kill: {str(e)}")
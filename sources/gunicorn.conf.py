@@ -0,0 +1,45 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+
+# Configuration of the production server, started from the root of the repository:
+#     gunicorn --config sources/gunicorn.conf.py sources.wsgi:app
+chdir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+bind = os.environ.get("MDT_BIND", "localhost:5000")
+workers = int(os.environ.get("MDT_WORKERS", 4))
+# Every worker serves several requests at the same time, streamed results and polling do not wait for long runs
+worker_class = "gthread"
+threads = int(os.environ.get("MDT_THREADS", 8))
+timeout = 120
+# Every worker builds its own server after the fork, so the threads of the container managers and the job pool are not forked
+preload_app = False
+
+def on_starting(server):
+    '''
+    Stray containers and session folders are removed, container indices start over and the jobs of an earlier run are forgotten
+    once, before any worker starts. Workers started later, e.g. to replace one that died, leave the containers of the other workers alone
+    '''
+    from sources.Podman import podman
+    from sources.ContainerManager import FileIndexAllocator
+    from sources.JobManager import JobStore
+    podman.init()
+    FileIndexAllocator().reset()
+    JobStore().clear()
+
+def post_fork(server, worker):
+    # The workers split the CPUs and the memory of the host, also when the count is given with --workers
+    os.environ["MDT_WORKERS"] = str(server.cfg.workers)
@@ -26,6 +26,91 @@ from sources.DockerMaker import DockerMaker, EXECUTION_PATH
 from sources.CustomException import *
 from sources.LoggerConfig import logger
 
+# Flags of every compilation, the precompiled header is only used when it was built with the same flags
+CPP_FLAGS = ['-Wno-conversion-null', '-Wno-return-type']
+
+BATCH_DRIVER = r'''
+std::string mdt_decode(const std::string& hex)
+{
+    std::string text;
+    for (size_t i = 0; i + 1 < hex.size(); i += 2)
+    {
+        text.push_back(static_cast<char>(std::stoi(hex.substr(i, 2), nullptr, 16)));
+    }
+    return text;
+}
+
+std::string mdt_encode(const std::string& text)
+{
+    static const char* digits = "0123456789abcdef";
+    std::string hex;
+    for (unsigned char c : text)
+    {
+        hex.push_back(digits[c >> 4]);
+        hex.push_back(digits[c & 15]);
+    }
+    return hex;
+}
+
+int main(int argc, const char* argv[])
+{
+    std::ifstream mdt_file(argv[1]);
+    std::streambuf* mdt_out = std::cout.rdbuf();
+    std::streambuf* mdt_err = std::cerr.rdbuf();
+    std::string mdt_line;
+    int mdt_index = 0;
+    while (std::getline(mdt_file, mdt_line))
+    {
+        std::vector<std::string> mdt_fields;
+        std::stringstream mdt_stream(mdt_line);
+        std::string mdt_field;
+        while (std::getline(mdt_stream, mdt_field, '\t'))
+        {
+            mdt_fields.push_back(mdt_field);
+        }
+        if (mdt_fields.empty() || mdt_fields[0].empty())
+        {
+            continue;
+        }
+        std::vector<std::string> mdt_args;
+        int mdt_count = std::stoi(mdt_fields[0]);
+        for (int i = 1; i <= mdt_count; i++)
+        {
+            mdt_args.push_back(i < (int) mdt_fields.size() ? mdt_decode(mdt_fields[i]) : "");
+        }
+        std::ostringstream mdt_case_out;
+        std::ostringstream mdt_case_err;
+        std::cout.rdbuf(mdt_case_out.rdbuf());
+        std::cerr.rdbuf(mdt_case_err.rdbuf());
+        int mdt_status = 0;
+        auto mdt_start = std::chrono::steady_clock::now();
+        try
+        {
+            mdt_case(mdt_args);
+        }
+        catch (const std::exception& e)
+        {
+            mdt_status = 1;
+            std::cerr << e.what() << std::endl;
+        }
+        catch (...)
+        {
+            mdt_status = 1;
+            std::cerr << "unknown exception" << std::endl;
+        }
+        auto mdt_elapsed = std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - mdt_start).count();
+        std::cout.rdbuf(mdt_out);
+        std::cerr.rdbuf(mdt_err);
+        struct rusage mdt_usage;
+        getrusage(RUSAGE_SELF, &mdt_usage);
+        std::cout << "@@MDT@@\t" << mdt_index << "\t" << mdt_elapsed << "\t" << mdt_usage.ru_maxrss << "\t" << mdt_status << "\t"
+                  << mdt_encode(mdt_case_out.str()) << "\t" << mdt_encode(mdt_case_err.str()) << std::endl;
+        mdt_index++;
+    }
+    return 0;
+}
+'''
+
 class CppLanguage(Language):
     class CppInjector(Injector):
         '''
@@ -37,6 +122,8 @@ class CppLanguage(Language):
             self.PRINT_RAW = "std::cout << \var << std::endl"
             self.ARGS = "argv[\index]"
             self.ARG_OFFSET = 1
+            self.BATCH_ARGS = "mdt_args[\index].c_str()"
+            self.BATCH_DRIVER = BATCH_DRIVER
 
         def inject(self, source_path: str, destination_path: str, signature: dict):
             '''
@@ -63,6 +150,31 @@ class CppLanguage(Language):
                 logger.error(f'Cpp Language inject: Failed to write to destination {destination_path} with error: {e}')
                 raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
 
+        def inject_batch(self, source_path: str, destination_path: str, signature: dict):
+            '''
+            Inject a batch harness into a source code file
+            '''
+            try:
+                with open(source_path, "r") as input:
+                    code = input.read()
+            except Exception as e:
+                logger.error(f'Cpp Language inject_batch: Failed to open source code file {source_path} with error: {e}')
+                raise InjectException(f'Failed to open source code file {source_path} with error: {e}')
+            code = self.include() + code
+            code += self.NEWLINE + self.NEWLINE
+            code += self.batch_setup(signature)
+            code += self.declare(signature)
+            code += self.batch_initialize(signature)
+            code += self.call(signature)
+            code += self.print_result(signature)
+            code += self.batch_wrap(signature)
+            try:
+                with open(destination_path, "w") as output:
+                    output.write(code)
+            except Exception as e:
+                logger.error(f'Cpp Language inject_batch: Failed to write to destination {destination_path} with error: {e}')
+                raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
+
         def include(self):
             '''
             Include necessary libraries for the cpp implementation to work
@@ -79,7 +191,7 @@ class CppLanguage(Language):
             '''
             Uses a string stream for type casting as a general solution
             '''
-            content = self.INDENT + name + " = " + f"cast<{type}>(argv[{arg_index}])" + self.ENDLINE + self.NEWLINE
+            content = self.INDENT + name + " = " + f"cast<{type}>({self.get_arg(arg_index)})" + self.ENDLINE + self.NEWLINE
             return content
 
         def setup(self, signature: dict) -> str:
@@ -96,6 +208,20 @@ class CppLanguage(Language):
             '''
             return "\treturn 0;\n\n}"
 
+        def batch_setup(self, signature: dict) -> str:
+            '''
+            Includes for the driver and the opening of the per test case function
+            '''
+            files = self.get_helper_filenames()
+            setup_string = "#include <iostream>\n#include <fstream>\n#include <sstream>\n#include <chrono>\n#include <sys/resource.h>\n"
+            for file in files:
+                setup_string += f"#include \"{file}\"\n"
+            setup_string += "void mdt_case(const std::vector<std::string>& mdt_args)\n{"
+            return setup_string
+
+        def batch_wrap(self, signature: dict) -> str:
+            return "}\n" + self.BATCH_DRIVER
+
         def get_helper_filenames(self) -> list:
             """Extracts only the filenames (without path) from self.helper_files."""
             return [os.path.basename(file) for file in self.helper_files]
@@ -104,42 +230,6 @@ class CppLanguage(Language):
         def __init__(self):
             super().__init__()
 
-        def generate_dockerfile(self, version: str, compiler: str, function_name: str, specs: list, index: int) -> None:
-            '''
-            Overrides the generate_dockerfile because the dockerfile for cpp requires extra commands
-            '''
-            try:
-                content = ""
-                content += self.add_base_image(version, compiler)
-                content += self.add_libraries(version, compiler, specs)
-                content += self.add_workdir()
-                content += self.copy_all()
-                content += self.add_time(version, compiler)
-                content += self.add_json()
-                # content += self.add_compile(version, compiler, function_name, specs)
-                content += self.add_sleep_command()
-
-                try:
-                    session_path = os.path.join(EXECUTION_PATH, str(index))
-                    if not os.path.exists(session_path):
-                        os.makedirs(session_path)
-                except OSError:
-                    logger.error("Cpp Language generate_dockerfile: Failed to create mounting folder")
-                    raise OSError("Failed to create mounting folder")
-
-                dockerfile_path = os.path.join(session_path, "Dockerfile")
-                try:
-                    with open(dockerfile_path, "w", encoding="utf-8") as file:
-                        file.write(content)
-                except OSError:
-                    logger.error("Cpp Language generate_dockerfile: Failed to write Dockerfile")
-                    raise OSError("Failed to write Dockerfile")
-            except Exception as e:
-                logger.error(f"Cpp Language generate_dockerfile: {str(e)}")
-                raise RuntimeError(e)
-
-            return True
-
         def add_base_image(self, version: str, compiler: str) -> str:
             match compiler:
                 case "gcc":
@@ -168,6 +258,20 @@ class CppLanguage(Language):
             '''
             return "RUN apt-get install -y nlohmann-json3-dev\n\n"
 
+        def add_tooling(self, version: str, compiler: str) -> str:
+            return self.add_json()
+
+        def add_helpers(self, version: str, compiler: str, helper_files: list) -> str:
+            '''
+            The helper files are precompiled as a header, so compiling a cell does not parse the JSON library again
+            '''
+            content = super().add_helpers(version, compiler, helper_files)
+            compiler_name, extension = ("clang++", "pch") if compiler == "clang" else ("g++", "gch")
+            for file in helper_files:
+                header = f"{self.HELPER_PATH}/{os.path.splitext(file)[0]}.hpp"
+                content += f"RUN cp {self.HELPER_PATH}/{file} {header} && {compiler_name} -x c++-header {' '.join(CPP_FLAGS)} {header} -o {header}.{extension}\n\n"
+            return content
+
         def add_compile(self, version: str, compiler: str, function_name: str, specs: dict) -> str:
             match compiler:
                 case "gcc":
@@ -186,6 +290,8 @@ class CppLanguage(Language):
         self.available_versions = []
         self.available_compilers = ["gcc", "clang"]
         self.extension = "cpp"
+        self.batch = True
+        self.compiled = True
         self.type_dict = {
                 "int": "int",
                 "string": "std::string",
@@ -202,7 +308,12 @@ class CppLanguage(Language):
                 compiler = "clang++"
             case "gcc", _:
                 compiler = "g++"
-        return [compiler, '-Wno-conversion-null', '-Wno-return-type' ,f'{function_name}.cpp', '-o', function_name]
+        # On a base image the helpers are included from their precompiled header, the include in the code is then skipped
+        precompiled = []
+        if self.base_image:
+            for file in self.injector.get_helper_filenames():
+                precompiled += ['-include', f"{self.docker_maker.HELPER_PATH}/{os.path.splitext(file)[0]}.hpp"]
+        return [compiler] + CPP_FLAGS + precompiled + [f'{function_name}.cpp', '-o', function_name]
 
     def generate_run_command(self, function_name: str, input: list) -> list :
         command = [f"./{function_name}"]
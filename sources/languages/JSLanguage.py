@@ -25,6 +25,83 @@ from sources.DockerMaker import DockerMaker
 from sources.LoggerConfig import logger
 from sources.CustomException import *
 
+HARNESS = r'''
+const mdt_fs = require("fs");
+const mdt_util = require("util");
+
+function mdt_hex(text) {
+    return Buffer.from(text, "utf8").toString("hex");
+}
+
+function mdt_answer(mdt_index, mdt_line) {
+    const mdt_fields = mdt_line.split("\t");
+    const mdt_args = mdt_fields.slice(1, parseInt(mdt_fields[0]) + 1).map((field) => Buffer.from(field, "hex").toString("utf8"));
+    const mdt_log = console.log;
+    const mdt_error = console.error;
+    let mdt_out = "";
+    let mdt_err = "";
+    let mdt_status = 0;
+    console.log = (...values) => { mdt_out += mdt_util.format(...values) + "\n"; };
+    console.error = (...values) => { mdt_err += mdt_util.format(...values) + "\n"; };
+    const mdt_start = process.hrtime.bigint();
+    try {
+        mdt_case(mdt_args);
+    } catch (error) {
+        mdt_status = 1;
+        mdt_err += (error && error.stack ? error.stack : String(error)) + "\n";
+    }
+    const mdt_elapsed = process.hrtime.bigint() - mdt_start;
+    console.log = mdt_log;
+    console.error = mdt_error;
+    const mdt_memory = Math.round(process.memoryUsage().rss / 1024);
+    return ["@@MDT@@", mdt_index, mdt_elapsed, mdt_memory, mdt_status, mdt_hex(mdt_out), mdt_hex(mdt_err)].join("\t");
+}
+'''
+
+BATCH_DRIVER = HARNESS + r'''
+function mdt_run(mdt_path) {
+    const mdt_lines = mdt_fs.readFileSync(mdt_path, "utf8").split("\n");
+    let mdt_index = 0;
+    for (const mdt_line of mdt_lines) {
+        if (mdt_line === "") {
+            continue;
+        }
+        process.stdout.write(mdt_answer(mdt_index, mdt_line) + "\n");
+        mdt_index++;
+    }
+}
+
+mdt_run(process.argv[2]);
+'''
+
+WORKER_DRIVER = HARNESS + r'''
+function mdt_serve() {
+    let mdt_buffer = Buffer.alloc(0);
+    let mdt_index = 0;
+    process.stdin.on("data", (chunk) => {
+        mdt_buffer = Buffer.concat([mdt_buffer, chunk]);
+        while (mdt_buffer.length >= 4) {
+            const mdt_length = mdt_buffer.readUInt32BE(0);
+            if (mdt_length === 0) {
+                process.exit(0);
+            }
+            if (mdt_buffer.length < 4 + mdt_length) {
+                break;
+            }
+            const mdt_line = mdt_buffer.slice(4, 4 + mdt_length).toString("utf8");
+            mdt_buffer = mdt_buffer.slice(4 + mdt_length);
+            const mdt_frame = Buffer.from(mdt_answer(mdt_index, mdt_line), "utf8");
+            const mdt_header = Buffer.alloc(4);
+            mdt_header.writeUInt32BE(mdt_frame.length, 0);
+            process.stdout.write(Buffer.concat([mdt_header, mdt_frame]));
+            mdt_index++;
+        }
+    });
+}
+
+mdt_serve();
+'''
+
 class JSLanguage(Language):
     class JSInjector(Injector):
         '''
@@ -42,6 +119,9 @@ class JSLanguage(Language):
             self.CAST_INT = "parseInt(\var)"
             self.CAST_FLOAT = "parseFloat(\var)"
             self.CAST_STRING = "String(\var)"
+            self.BATCH_ARGS = "mdt_args[\index]"
+            self.BATCH_DRIVER = BATCH_DRIVER
+            self.WORKER_DRIVER = WORKER_DRIVER
 
         def declare(self, signature: dict) -> str:
             '''
@@ -55,6 +135,12 @@ class JSLanguage(Language):
         def wrap(self, signature: dict) -> str:
             return ""
 
+        def batch_setup(self, signature: dict) -> str:
+            return "function mdt_case(mdt_args) {\n"
+
+        def batch_wrap(self, signature: dict) -> str:
+            return "}\n" + self.BATCH_DRIVER
+
         def cast(self, arg : str, type : str) -> str:
             match type:
                 case "list":
@@ -91,6 +177,8 @@ class JSLanguage(Language):
         self.available_versions = [ "node:current", "node:19", "node:18", "node:16", "node:14", "node:12"]
         self.available_compilers = []
         self.extension = "js"
+        self.batch = True
+        self.worker = True
         self.type_dict = {
                 "int": "int",
                 "string": "string",
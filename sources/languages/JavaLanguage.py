@@ -25,6 +25,62 @@ from sources.DockerMaker import DockerMaker
 from sources.LoggerConfig import logger
 from sources.CustomException import InjectException, ArgumentNotFoundException
 
+BATCH_DRIVER = r'''
+    public static void main(String[] mdtArgs) throws Exception {
+        java.io.PrintStream mdtOut = System.out;
+        java.io.PrintStream mdtErr = System.err;
+        java.util.List<String> mdtLines = java.nio.file.Files.readAllLines(java.nio.file.Paths.get(mdtArgs[0]), java.nio.charset.StandardCharsets.UTF_8);
+        int mdtIndex = 0;
+        for (String mdtLine : mdtLines) {
+            String[] mdtFields = mdtLine.split("\t", -1);
+            if (mdtFields[0].isEmpty()) {
+                continue;
+            }
+            String[] mdtCaseArgs = new String[Integer.parseInt(mdtFields[0])];
+            for (int i = 0; i < mdtCaseArgs.length; i++) {
+                mdtCaseArgs[i] = mdtDecode(mdtFields[i + 1]);
+            }
+            java.io.ByteArrayOutputStream mdtCaseOut = new java.io.ByteArrayOutputStream();
+            java.io.ByteArrayOutputStream mdtCaseErr = new java.io.ByteArrayOutputStream();
+            System.setOut(new java.io.PrintStream(mdtCaseOut, true, "UTF-8"));
+            System.setErr(new java.io.PrintStream(mdtCaseErr, true, "UTF-8"));
+            int mdtStatus = 0;
+            long mdtStart = System.nanoTime();
+            try {
+                mdtCase(mdtCaseArgs);
+            } catch (Throwable e) {
+                mdtStatus = 1;
+                e.printStackTrace();
+            }
+            long mdtElapsed = System.nanoTime() - mdtStart;
+            System.out.flush();
+            System.err.flush();
+            System.setOut(mdtOut);
+            System.setErr(mdtErr);
+            Runtime mdtRuntime = Runtime.getRuntime();
+            long mdtMemory = (mdtRuntime.totalMemory() - mdtRuntime.freeMemory()) / 1024;
+            mdtOut.println("@@MDT@@\t" + mdtIndex + "\t" + mdtElapsed + "\t" + mdtMemory + "\t" + mdtStatus + "\t" + mdtEncode(mdtCaseOut.toByteArray()) + "\t" + mdtEncode(mdtCaseErr.toByteArray()));
+            mdtIndex++;
+        }
+    }
+
+    static String mdtDecode(String hex) throws Exception {
+        byte[] bytes = new byte[hex.length() / 2];
+        for (int i = 0; i < bytes.length; i++) {
+            bytes[i] = (byte) Integer.parseInt(hex.substring(2 * i, 2 * i + 2), 16);
+        }
+        return new String(bytes, "UTF-8");
+    }
+
+    static String mdtEncode(byte[] bytes) {
+        StringBuilder hex = new StringBuilder();
+        for (byte b : bytes) {
+            hex.append(String.format("%02x", b));
+        }
+        return hex.toString();
+    }
+'''
+
 class JavaLanguage(Language):
 
     class JavaInjector(Injector):
@@ -37,10 +93,14 @@ class JavaLanguage(Language):
             self.PRINT_RAW = "System.out.println(\var)"
             self.END_FUNCTION = "\n}\n"
             self.CAST_BOOL = "Boolean.parseBoolean(\var)"
-            self.HELPER_FILES = ["../resources/parse.java"]
+            self.HELPER_FILES = ["../resources/parse.java", "../resources/runner.java", "../resources/compiler.java"]
             self.CAST_INT = "Integer.parseInt(\var)"
             self.ESCAPE_CAST = "\cast"
             self.CAST_LIST = "parse.parseNestedArray(\var, \cast)"
+            self.BATCH_ARGS = "args[\index]"
+            self.BATCH_DRIVER = BATCH_DRIVER
+            # The resident runner has its own main, the worker class only exposes mdtCase
+            self.WORKER_DRIVER = ""
 
         def cast(self, arg:str, type:str) -> str:
 
@@ -92,6 +152,13 @@ class JavaLanguage(Language):
         def wrap(self, signature) -> str:
             return ""
 
+        def batch_setup(self, signature: dict) -> str:
+            name = signature['name']
+            return "\n@SuppressWarnings(\"unchecked\")\n" + " public class " + f"{name}_injected" + " {public static void mdtCase(String[] args) throws Exception {\n"
+
+        def batch_wrap(self, signature: dict) -> str:
+            return self.END_FUNCTION + self.BATCH_DRIVER
+
 
         def declare_item(self, name:str, type:str) -> str:
             if type == "string":
@@ -125,6 +192,33 @@ class JavaLanguage(Language):
                 logger.error(f'Failed to write to destination {destination_path} with error: {e}')
                 raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
 
+        def inject_batch(self, source_path: str, destination_path: str, signature: dict):
+            '''
+            Inject a batch harness into a source code file. The user code is added after the driver, inside the class
+            '''
+            code = self.add_imports(source_path)
+            code += self.batch_setup(signature)
+            code += self.declare(signature)
+            code += self.batch_initialize(signature)
+            code += self.call(signature)
+            code += self.print_result(signature)
+            code += self.batch_wrap(signature)
+            try:
+                with open(source_path, "r") as file:
+                    for line in file:
+                        code += line if "import" not in line else ""
+            except Exception as e:
+                logger.error(f'Failed to open source code file {source_path} with error: {e}')
+                raise InjectException(f'Failed to open source code file {source_path} with error: {e}')
+
+            code += self.END_FUNCTION
+            try:
+                with open(destination_path, "w") as output:
+                    output.write(code)
+            except Exception as e:
+                logger.error(f'Failed to write to destination {destination_path} with error: {e}')
+                raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
+
     class JavaDockerMaker(DockerMaker):
         def __init__(self):
             super().__init__()
@@ -142,9 +236,18 @@ class JavaLanguage(Language):
                     logger.warning("Didn't match any compiler, adding amazoncorretto!")
                     return f"FROM amazoncorretto:latest-alpine\n\n"
 
+        def add_helpers(self, version: str, compiler: str, helper_files: list) -> str:
+            '''
+            The helper classes are compiled in the base image and found through the class path
+            '''
+            content = super().add_helpers(version, compiler, helper_files)
+            content += f"RUN javac -d {self.HELPER_PATH} " + " ".join(f"{self.HELPER_PATH}/{file}" for file in helper_files) + "\n\n"
+            content += f"ENV CLASSPATH=.:{self.HELPER_PATH}\n\n"
+            return content
+
         def add_compile(self, version : str, compiler : str, function_name : str, specs : list) ->str:
 
-            return f"RUN javac parse.java {function_name}_injected.java\n\n"
+            return f"RUN javac parse.java runner.java {function_name}_injected.java\n\n"
 
     def __init__(self):
         super().__init__()
@@ -154,6 +257,9 @@ class JavaLanguage(Language):
         self.available_versions = ["21","19","17"]
         self.available_compilers = ["amazoncorretto", "temurin"]
         self.extension = "java"
+        self.batch = True
+        self.worker = True
+        self.compiled = True
         self.type_dict = {
                 "int": "int",
                 "string": "String",
@@ -165,11 +271,27 @@ class JavaLanguage(Language):
 
 
     def generate_compile_command(self, function_name:str, compiler:str):
-        return ["javac" , "parse.java" ,f"{function_name}.java"]
+        if self.base_image:
+            # The helpers were compiled in the base image, only the injected class is compiled against them
+            helper_path = self.docker_maker.HELPER_PATH
+            return ["javac", "-cp", f".:{helper_path}", "-sourcepath", helper_path, f"{function_name}.java"]
+        return ["javac" , "parse.java", "runner.java" ,f"{function_name}.java"]
+
+    def generate_compiler_command(self) -> list:
+        # The compiler service is one of the helpers of the base image
+        if self.base_image:
+            return ["java", "compiler"]
+        return []
 
     def generate_run_command(self, function_name:str, input:list) :
         return ["java" , function_name] + input
 
+    def generate_worker_command(self, function_name: str) -> list:
+        return ["java", "runner"]
+
+    def generate_worker_load(self, function_name: str, warmup: int) -> str:
+        return f"LOAD\t{function_name}\t{warmup}"
+
     def parse_type(self, type_str: str):
         type_map = {
             "string": "String",
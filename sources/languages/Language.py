@@ -33,6 +33,12 @@ class Language:
         self.available_compilers = []
         self.extension = "txt"
         self.type_dict = {}
+        self.batch = False
+        self.worker = False
+        # Languages that compile the code before running it, their compiled outputs are cached
+        self.compiled = False
+        # Prepared base image the code runs on, "" when the image was built from the compiler image
+        self.base_image = ""
 
     def generate_run_command(self, function_name: str, input: list) -> list :
         return []
@@ -43,8 +49,44 @@ class Language:
     def inject(self, source_path: str, destination_path: str, signature: dict) -> None:
         self.injector.inject(source_path, destination_path, signature)
 
-    def generate_dockerfile(self, version: str, compiler: str, function_name: str, specs: list, index: int) -> None:
-        self.docker_maker.generate_dockerfile(version, compiler, function_name, specs, index)
+    def inject_batch(self, source_path: str, destination_path: str, signature: dict) -> None:
+        self.injector.inject_batch(source_path, destination_path, signature)
+
+    def set_base_image(self, base_image: str) -> None:
+        self.base_image = base_image
+
+    def is_compiled(self) -> bool:
+        return self.compiled
+
+    def supports_batch(self) -> bool:
+        return self.batch
+
+    def inject_worker(self, source_path: str, destination_path: str, signature: dict) -> None:
+        self.injector.inject_worker(source_path, destination_path, signature)
+
+    def supports_worker(self) -> bool:
+        return self.worker
+
+    def generate_compiler_command(self) -> list:
+        '''
+        Command that starts a resident compiler inside the container, [] when the compile command runs as a new process
+        '''
+        return []
+
+    def generate_worker_command(self, function_name: str) -> list:
+        return self.generate_run_command(function_name, [])
+
+    def generate_worker_load(self, function_name: str, warmup: int) -> str:
+        '''
+        Message that makes a running worker load freshly compiled code. Empty when the worker loads the code on start
+        '''
+        return ""
+
+    def generate_dockerfile(self, version: str, compiler: str, function_name: str, specs: list, index: int, base_image: str = "") -> None:
+        self.docker_maker.generate_dockerfile(version, compiler, function_name, specs, index, base_image)
+
+    def generate_base_dockerfile(self, version: str, compiler: str) -> str:
+        return self.docker_maker.generate_base_dockerfile(version, compiler, [os.path.basename(file) for file in self.helper_files])
 
     def get_available_versions(self) -> list:
         return self.available_versions
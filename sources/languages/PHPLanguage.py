@@ -25,6 +25,84 @@ from sources.DockerMaker import DockerMaker
 from sources.LoggerConfig import logger
 from sources.CustomException import *
 
+HARNESS = r'''
+function mdt_answer($mdt_index, $mdt_line) {
+    $mdt_fields = explode("\t", $mdt_line);
+    $mdt_args = array();
+    for ($i = 1; $i <= intval($mdt_fields[0]); $i++) {
+        $mdt_args[] = hex2bin($mdt_fields[$i]);
+    }
+    $mdt_err = "";
+    $mdt_status = 0;
+    ob_start();
+    $mdt_start = microtime(true);
+    try {
+        mdt_case($mdt_args);
+    } catch (Exception $e) {
+        $mdt_status = 1;
+        $mdt_err = (string) $e;
+    } catch (Throwable $e) {
+        $mdt_status = 1;
+        $mdt_err = (string) $e;
+    }
+    $mdt_elapsed = (int) round((microtime(true) - $mdt_start) * 1e9);
+    $mdt_out = ob_get_clean();
+    $mdt_memory = (int) round(memory_get_peak_usage(true) / 1024);
+    $mdt_frame = array("@@MDT@@", $mdt_index, $mdt_elapsed, $mdt_memory, $mdt_status, bin2hex($mdt_out), bin2hex($mdt_err));
+    return implode("\t", $mdt_frame);
+}
+'''
+
+BATCH_DRIVER = HARNESS + r'''
+function mdt_run($mdt_path) {
+    $mdt_lines = file($mdt_path, FILE_IGNORE_NEW_LINES);
+    $mdt_index = 0;
+    foreach ($mdt_lines as $mdt_line) {
+        if ($mdt_line === "") {
+            continue;
+        }
+        echo mdt_answer($mdt_index, $mdt_line) . "\n";
+        $mdt_index++;
+    }
+}
+
+mdt_run($argv[1]);
+'''
+
+WORKER_DRIVER = HARNESS + r'''
+function mdt_read($mdt_length) {
+    $mdt_data = "";
+    while (strlen($mdt_data) < $mdt_length) {
+        $mdt_chunk = fread(STDIN, $mdt_length - strlen($mdt_data));
+        if ($mdt_chunk === false || $mdt_chunk === "") {
+            return false;
+        }
+        $mdt_data .= $mdt_chunk;
+    }
+    return $mdt_data;
+}
+
+function mdt_serve() {
+    $mdt_index = 0;
+    while (($mdt_header = mdt_read(4)) !== false) {
+        $mdt_length = unpack("N", $mdt_header);
+        if ($mdt_length[1] === 0) {
+            break;
+        }
+        $mdt_line = mdt_read($mdt_length[1]);
+        if ($mdt_line === false) {
+            break;
+        }
+        $mdt_frame = mdt_answer($mdt_index, $mdt_line);
+        fwrite(STDOUT, pack("N", strlen($mdt_frame)) . $mdt_frame);
+        fflush(STDOUT);
+        $mdt_index++;
+    }
+}
+
+mdt_serve();
+'''
+
 class PHPLanguage(Language):
     class PHPInjector(Injector):
         '''
@@ -43,6 +121,9 @@ class PHPLanguage(Language):
             self.CAST_FLOAT = "(float) (\var)"
             self.CAST_STRING = "(string) (\var)"
             self.DOLLAR = "$"
+            self.BATCH_ARGS = "$mdt_args[\index]"
+            self.BATCH_DRIVER = BATCH_DRIVER
+            self.WORKER_DRIVER = WORKER_DRIVER
 
         def declare(self, signature: dict) -> str:
             '''
@@ -90,13 +171,41 @@ class PHPLanguage(Language):
                 logger.error(f'PHP Language inject: Failed to write to destination {destination_path} with error: {e}')
                 raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
 
+        def inject_batch(self, source_path: str, destination_path: str, signature: dict):
+            code = "<?php\n"
+            try:
+                with open(source_path, "r") as input:
+                    code += input.read().replace("<?php", "").replace("?>", "")
+            except Exception as e:
+                logger.error(f'PHP Language inject_batch: Failed to open source code file {source_path} with error: {e}')
+                raise InjectException(f'Failed to open source code file {source_path} with error: {e}')
+            code += self.NEWLINE + self.NEWLINE
+            code += self.batch_setup(signature)
+            code += self.declare(signature)
+            code += self.batch_initialize(signature)
+            code += self.call(signature)
+            code += self.print_result(signature)
+            code += self.batch_wrap(signature)
+            try:
+                with open(destination_path, "w") as output:
+                    output.write(code)
+            except Exception as e:
+                logger.error(f'PHP Language inject_batch: Failed to write to destination {destination_path} with error: {e}')
+                raise InjectException(f'Failed to write to destination {destination_path} with error: {e}')
+
         def wrap(self, signature: dict) -> str:
             return "\n?>"
 
+        def batch_setup(self, signature: dict) -> str:
+            return "function mdt_case($mdt_args) {\n"
+
+        def batch_wrap(self, signature: dict) -> str:
+            return "}\n" + self.BATCH_DRIVER + self.wrap(signature)
+
         def initialize_item(self, name: str, type: str, arg_index: int):
             logger.warning(type)
             if type == "list":
-                fix = f"$g{arg_index} = str_replace(\"'\", '\"', $argv[{arg_index}]);\n"
+                fix = f"$g{arg_index} = str_replace(\"'\", '\"', {self.get_arg(arg_index)});\n"
                 assign = f"${name} = json_decode($g{arg_index}, true);\n"
                 return fix + assign
             return self.DOLLAR + name + self.SEP + self.ASSIGN + self.SEP + self.cast(self.get_arg(arg_index), type) + self.ENDLINE + self.NEWLINE
@@ -134,6 +243,8 @@ class PHPLanguage(Language):
         self.available_versions = ["php:8.3", "php:7.4", "php:5.6"]
         self.available_compilers = []
         self.extension = "php"
+        self.batch = True
+        self.worker = True
         self.type_dict = {
                 "int": "int",
                 "string": "string",
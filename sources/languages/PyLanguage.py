@@ -25,6 +25,82 @@ from sources.DockerMaker import DockerMaker
 from sources.LoggerConfig import logger
 from sources.CustomException import *
 
+HARNESS = r'''
+def mdt_hex(text):
+    return binascii.hexlify(text.encode("utf-8")).decode("ascii")
+
+def mdt_memory():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return 0
+
+def mdt_answer(mdt_index, mdt_line):
+    mdt_clock = getattr(time, "perf_counter", time.time)
+    mdt_fields = mdt_line.rstrip("\n").split("\t")
+    mdt_args = [binascii.unhexlify(field).decode("utf-8") for field in mdt_fields[1:int(mdt_fields[0]) + 1]]
+    mdt_stdout, mdt_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StringIO(), StringIO()
+    mdt_status = 0
+    mdt_start = mdt_clock()
+    try:
+        mdt_case(mdt_args)
+    except BaseException:
+        mdt_status = 1
+        traceback.print_exc()
+    mdt_elapsed = int((mdt_clock() - mdt_start) * 1e9)
+    mdt_out, mdt_err = sys.stdout.getvalue(), sys.stderr.getvalue()
+    sys.stdout, sys.stderr = mdt_stdout, mdt_stderr
+    mdt_frame = ["@@MDT@@", str(mdt_index), str(mdt_elapsed), str(mdt_memory()), str(mdt_status), mdt_hex(mdt_out), mdt_hex(mdt_err)]
+    return "\t".join(mdt_frame)
+'''
+
+BATCH_DRIVER = HARNESS + r'''
+def mdt_run(mdt_path):
+    mdt_index = 0
+    with open(mdt_path) as mdt_file:
+        for mdt_line in mdt_file:
+            if not mdt_line.strip("\n"):
+                continue
+            sys.stdout.write(mdt_answer(mdt_index, mdt_line) + "\n")
+            sys.stdout.flush()
+            mdt_index += 1
+
+if __name__ == "__main__":
+    mdt_run(sys.argv[1])
+'''
+
+WORKER_DRIVER = HARNESS + r'''
+def mdt_read(mdt_input, mdt_length):
+    mdt_data = b""
+    while len(mdt_data) < mdt_length:
+        mdt_chunk = mdt_input.read(mdt_length - len(mdt_data))
+        if not mdt_chunk:
+            return None
+        mdt_data += mdt_chunk
+    return mdt_data
+
+def mdt_serve():
+    mdt_input = getattr(sys.stdin, "buffer", sys.stdin)
+    mdt_output = getattr(sys.stdout, "buffer", sys.stdout)
+    mdt_index = 0
+    while True:
+        mdt_header = mdt_read(mdt_input, 4)
+        if mdt_header is None or struct.unpack(">I", mdt_header)[0] == 0:
+            break
+        mdt_line = mdt_read(mdt_input, struct.unpack(">I", mdt_header)[0])
+        if mdt_line is None:
+            break
+        mdt_frame = mdt_answer(mdt_index, mdt_line.decode("utf-8")).encode("utf-8")
+        mdt_output.write(struct.pack(">I", len(mdt_frame)) + mdt_frame)
+        mdt_output.flush()
+        mdt_index += 1
+
+if __name__ == "__main__":
+    mdt_serve()
+'''
+
 class PyLanguage(Language):
     class PyInjector(Injector):
         '''
@@ -39,6 +115,9 @@ class PyLanguage(Language):
             self.ARG_OFFSET = 1
             self.LIST_CAST = "ast.literal_eval(\var)"
             self.CAST_BOOL = "\var.lower()==\"true\""
+            self.BATCH_ARGS = "mdt_args[\index]"
+            self.BATCH_DRIVER = BATCH_DRIVER
+            self.WORKER_DRIVER = WORKER_DRIVER
 
         def declare(self, signature: dict) -> str:
             '''
@@ -52,6 +131,11 @@ class PyLanguage(Language):
         def wrap(self, signature: dict) -> str:
             return "if __name__ == \"__main__\":\n\tmain()"
 
+        def batch_setup(self, signature: dict) -> str:
+            imports = "import sys,ast,time,binascii,traceback,struct\n"
+            imports += "try:\n\tfrom StringIO import StringIO\nexcept ImportError:\n\tfrom io import StringIO\n"
+            return imports + "def mdt_case(mdt_args):\n"
+
         def cast(self, arg, type):
             match type:
                 case "list":
@@ -80,6 +164,8 @@ class PyLanguage(Language):
         self.injector = PyLanguage.PyInjector()
         self.docker_maker = PyLanguage.PyDockerMaker()
         self.extension = "py"
+        self.batch = True
+        self.worker = True
         self.available_versions = ["2.7", "3.5", "3.6", "3.7", "3.8", "3.9", "3.10", "3.11", "3.12"]
         self.available_compilers = []
         self.type_dict = {
@@ -0,0 +1,51 @@
+"""
+This file is part of the Modular Differential Testing Project.
+
+The Modular Differential Testing Project is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+The Modular Differential Testing Project is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with the source code. If not, see <https://www.gnu.org/licenses/>.
+"""
+import os, sys
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Server import create_server
+from sources.ContainerManager import FileIndexAllocator
+from sources.LoggerConfig import logger
+
+# Production entry point, every worker process of the WSGI server builds its own server from the environment:
+#     gunicorn --config sources/gunicorn.conf.py sources.wsgi:app
+
+def get_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+def create_app():
+    workers = int(os.environ.get("MDT_WORKERS", 1))
+    logger.info(f"wsgi: Initializing server in worker {os.getpid()} of {workers}...")
+    server = create_server(podman_api=get_flag("MDT_PODMAN_API"),
+                           pool=os.environ.get("MDT_POOL"),
+                           max_containers=int(os.environ.get("MDT_MAX_CONTAINERS", 0)) or None,
+                           fixed_containers=get_flag("MDT_FIXED_CONTAINERS"),
+                           use_asyncio=get_flag("MDT_ASYNCIO"),
+                           mount_code=get_flag("MDT_MOUNT"),
+                           workers=workers,
+                           # The workers never use the same container name or session folder
+                           index_allocator=FileIndexAllocator(),
+                           agents=[url.strip() for url in os.environ.get("MDT_AGENTS", "").split(",") if url.strip()],
+                           local_execution=not get_flag("MDT_AGENTS_ONLY"),
+                           # gunicorn removed the stray containers before the workers started, see on_starting
+                           clean=False)
+    server.ready = True
+    return server.app
+
+app = create_app()
@@ -0,0 +1,46 @@
+import os,sys,time,asyncio,subprocess
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.AsyncPodman import AsyncPodman
+from sources.CustomException import *
+
+class LocalPodman(AsyncPodman):
+    '''
+    Runs the command on the host instead of inside a container
+    '''
+    def generate_exec_command(self, container_name: str, command: list) -> list:
+        return [sys.executable, "-c"] + command
+
+class TestAsyncPodman(unittest.TestCase):
+    def setUp(self):
+        self.podman = LocalPodman(max_execs=2)
+
+    def test_exec_command_async(self):
+        output = asyncio.run(self.podman.exec_command_async("container_1", ["print('1\\n2')"]))
+        self.assertEqual(output, {"stdout": ["1", "2"], "stderr": []})
+
+    def test_exec_command_async_error(self):
+        with self.assertRaises(ExecutionException) as context:
+            asyncio.run(self.podman.exec_command_async("container_1", ["import sys; sys.stderr.write('error')"]))
+        self.assertIn("error", str(context.exception))
+
+    def test_exec_command_async_timeout(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            asyncio.run(self.podman.exec_command_async("container_1", ["import time; time.sleep(5)"], timeout=0.2))
+
+    def test_exec_command_async_bounded(self):
+        #at most max_execs commands run at the same time
+        async def run_all():
+            return await asyncio.gather(*[self.podman.exec_command_async("container_1", ["import time; time.sleep(0.3); print(1)"]) for _ in range(4)])
+        start = time.time()
+        outputs = asyncio.run(run_all())
+        self.assertGreaterEqual(time.time() - start, 0.6)
+        self.assertEqual([output['stdout'] for output in outputs], [["1"]] * 4)
+        #a new event loop gets its own semaphore
+        self.assertEqual(asyncio.run(self.podman.exec_command_async("container_1", ["print(3)"]))['stdout'], ["3"])
+
+if __name__ == "__main__":
+    unittest.main()
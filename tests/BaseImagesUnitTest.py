@@ -0,0 +1,104 @@
+import os,sys,tempfile,threading
+import unittest
+from unittest.mock import MagicMock, patch
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.BaseImages import BaseImages, BASE_IMAGE_NAME
+from sources.languages.CppLanguage import CppLanguage
+from sources.languages.JavaLanguage import JavaLanguage
+from sources.CustomException import *
+
+class TestBaseImages(unittest.TestCase):
+    def setUp(self):
+        self.base_images = BaseImages()
+        self.podman = MagicMock()
+        #images exist once they were built, the build context must have the helper files
+        self.built = set()
+        self.contexts = []
+        def build_image(name, tag, mount_path):
+            self.contexts.append(sorted(os.listdir(mount_path)))
+            self.built.add(tag)
+        self.podman.build_image.side_effect = build_image
+        self.podman.image_exists.side_effect = lambda name, tag: tag in self.built
+
+    def test_prepare(self):
+        image = self.base_images.prepare(self.podman, "cpp", "", "gcc")
+        self.assertTrue(image.startswith(f"{BASE_IMAGE_NAME}:cpp-gcc-"))
+        self.assertEqual(self.contexts, [["Dockerfile", "cast.cpp"]])
+        #prepared once
+        self.assertEqual(self.base_images.prepare(self.podman, "cpp", "", "gcc"), image)
+        self.podman.build_image.assert_called_once()
+
+    def test_prepare_error(self):
+        self.podman.build_image.side_effect = None
+        with self.assertRaises(BaseImageException):
+            self.base_images.prepare(self.podman, "python", "3.10", "")
+
+    def test_get_base_image(self):
+        #not prepared, so the cell image is built from the compiler image
+        self.assertEqual(self.base_images.get_base_image(self.podman, "python", "3.10", ""), "")
+        image = self.base_images.prepare(self.podman, "python", "3.10", "")
+        self.assertEqual(self.base_images.get_base_image(self.podman, "python", "3.10", ""), image)
+        self.podman.build_image.assert_called_once()
+        #unknown languages have no base image
+        self.assertEqual(self.base_images.get_base_image(self.podman, "cobol", "", ""), "")
+
+    def test_get_base_image_during_build(self):
+        #cells do not wait for a base image that is being built
+        building, release = threading.Event(), threading.Event()
+        def build_image(name, tag, mount_path):
+            building.set()
+            release.wait(10)
+            self.built.add(tag)
+        self.podman.build_image.side_effect = build_image
+        thread = threading.Thread(target=self.base_images.prepare, args=(self.podman, "python", "3.10", ""))
+        thread.start()
+        self.assertTrue(building.wait(10))
+        self.assertEqual(self.base_images.get_base_image(self.podman, "python", "3.10", ""), "")
+        release.set()
+        thread.join(10)
+        self.assertTrue(self.base_images.get_base_image(self.podman, "python", "3.10", "").startswith(BASE_IMAGE_NAME))
+
+    def test_base_dockerfile(self):
+        #the tooling and helper files are baked in the base image
+        content = CppLanguage().generate_base_dockerfile("", "gcc")
+        self.assertIn("nlohmann-json3-dev", content)
+        self.assertIn("COPY cast.cpp /opt/mdt/", content)
+        content = JavaLanguage().generate_base_dockerfile("", "")
+        self.assertIn("RUN javac -d /opt/mdt", content)
+        self.assertIn("ENV CLASSPATH=.:/opt/mdt", content)
+
+    def test_precompiled_header(self):
+        #the C++ helpers are precompiled in the base image and included from there
+        language = CppLanguage()
+        content = language.generate_base_dockerfile("", "gcc")
+        self.assertIn("g++ -x c++-header -Wno-conversion-null -Wno-return-type /opt/mdt/cast.hpp -o /opt/mdt/cast.hpp.gch", content)
+        self.assertIn("/opt/mdt/cast.hpp.pch", language.generate_base_dockerfile("", "clang"))
+        self.assertNotIn("-include", language.generate_compile_command("f_injected", "gcc"))
+        language.set_base_image(f"{BASE_IMAGE_NAME}:cpp-gcc")
+        command = language.generate_compile_command("f_injected", "gcc")
+        self.assertEqual(command, ["g++", "-Wno-conversion-null", "-Wno-return-type", "-include", "/opt/mdt/cast.hpp", "f_injected.cpp", "-o", "f_injected"])
+
+    def test_java_helpers(self):
+        #on a base image only the injected class is compiled, against the helpers compiled in the image
+        language = JavaLanguage()
+        self.assertEqual(language.generate_compiler_command(), [])
+        self.assertIn("parse.java", language.generate_compile_command("f_injected", ""))
+        language.set_base_image(f"{BASE_IMAGE_NAME}:java")
+        self.assertEqual(language.generate_compile_command("f_injected", ""), ["javac", "-cp", ".:/opt/mdt", "-sourcepath", "/opt/mdt", "f_injected.java"])
+        self.assertEqual(language.generate_compiler_command(), ["java", "compiler"])
+
+    def test_cell_dockerfile(self):
+        #on top of a base image, the image of a cell only adds its libraries
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('sources.DockerMaker.EXECUTION_PATH', new=temp_dir):
+                CppLanguage().generate_dockerfile("", "gcc", "function", {}, 1, f"{BASE_IMAGE_NAME}:cpp")
+            with open(os.path.join(temp_dir, "1", "Dockerfile")) as file:
+                content = file.read()
+        self.assertTrue(content.startswith(f"FROM {BASE_IMAGE_NAME}:cpp\n"))
+        self.assertNotIn("apt-get", content)
+
+if __name__ == '__main__':
+    unittest.main()
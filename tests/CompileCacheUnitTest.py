@@ -0,0 +1,71 @@
+import os,sys,io,tarfile,tempfile
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.CompileCache import CompileCache
+
+class TestCompileCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = CompileCache(path=os.path.join(self.temp_dir.name, "cache"), max_entries=2)
+        self.folder = os.path.join(self.temp_dir.name, "session")
+        os.makedirs(self.folder)
+        self.write("f_injected.cpp", "int main() {}")
+        self.write("cast.cpp", "// helpers")
+        self.write("Dockerfile", "FROM gcc\n")
+        self.command = ["g++", "f_injected.cpp", "-o", "f_injected"]
+        self.environment = {"language": "cpp", "compiler": "gcc"}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name: str, content: str) -> None:
+        with open(os.path.join(self.folder, name), "w") as file:
+            file.write(content)
+
+    def make_archive(self, files: dict) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for name, content in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        return buffer.getvalue()
+
+    def test_get_key(self):
+        key = self.cache.get_key(self.folder, self.command, self.environment)
+        #the Dockerfile and batch inputs do not change the key
+        self.write("Dockerfile", "FROM gcc:14\n")
+        self.write("inputs.mdt", "1\t31")
+        self.assertEqual(self.cache.get_key(self.folder, self.command, self.environment), key)
+        #the sources, helper files, command and environment do
+        self.assertNotEqual(self.cache.get_key(self.folder, self.command + ["-O2"], self.environment), key)
+        self.assertNotEqual(self.cache.get_key(self.folder, self.command, dict(self.environment, compiler="clang")), key)
+        self.write("cast.cpp", "// other helpers")
+        self.assertNotEqual(self.cache.get_key(self.folder, self.command, self.environment), key)
+
+    def test_put_get(self):
+        key = self.cache.get_key(self.folder, self.command, self.environment)
+        self.assertIsNone(self.cache.get(key))
+        archive = self.make_archive({"./f_injected.cpp": b"int main() {}", "./cast.cpp": b"// helpers", "./f_injected": b"binary"})
+        self.cache.put(key, archive, self.cache.get_sources(self.folder))
+        #only the compiled outputs are kept
+        with tarfile.open(fileobj=io.BytesIO(self.cache.get(key))) as cached:
+            self.assertEqual(cached.getnames(), ["f_injected"])
+            self.assertEqual(cached.extractfile("f_injected").read(), b"binary")
+
+    def test_collect(self):
+        for number in range(3):
+            self.cache.put(f"key{number}", self.make_archive({"f": b"binary"}), [])
+            os.utime(self.cache.get_entry_path(f"key{number}"), (number, number))
+        #the least recently used entry was removed when the third was stored
+        self.cache.put("key3", self.make_archive({"f": b"binary"}), [])
+        self.assertIsNone(self.cache.get("key0"))
+        self.assertIsNone(self.cache.get("key1"))
+        self.assertIsNotNone(self.cache.get("key2"))
+        self.assertIsNotNone(self.cache.get("key3"))
+
+if __name__ == '__main__':
+    unittest.main()
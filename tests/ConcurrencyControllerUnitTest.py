@@ -0,0 +1,65 @@
+import os,sys
+import unittest
+from unittest.mock import patch
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ConcurrencyController import ConcurrencyController, CONTAINER_MEMORY_MB, CONTAINER_OVERHEAD_MB, MEMORY_RESERVE_MB, MEMORY_METRIC
+
+class TestConcurrencyController(unittest.TestCase):
+    def setUp(self):
+        self.controller = ConcurrencyController(ceiling=32, interval=0)
+        self.cpus = patch('sources.ConcurrencyController.get_cpu_count', return_value=64)
+        self.memory = patch('sources.ConcurrencyController.get_free_memory', return_value=MEMORY_RESERVE_MB + 16 * CONTAINER_MEMORY_MB)
+        self.load = patch('sources.ConcurrencyController.get_load', return_value=0.5)
+        for patcher in (self.cpus, self.memory, self.load):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_initial_limit(self):
+        #the memory allows fewer containers than the CPUs
+        self.assertEqual(self.controller.initial_limit(), 16)
+        with patch('sources.ConcurrencyController.get_free_memory', return_value=None):
+            #the ceiling bounds the CPU count when the memory is unknown
+            self.assertEqual(self.controller.initial_limit(), 32)
+        with patch('sources.ConcurrencyController.get_free_memory', return_value=0):
+            self.assertEqual(self.controller.initial_limit(), 1)
+
+    def test_adjust(self):
+        self.controller.initial_limit()
+        #running containers already use part of the memory
+        self.assertEqual(self.controller.adjust(0), 16)
+        with patch('sources.ConcurrencyController.get_free_memory', return_value=MEMORY_RESERVE_MB):
+            self.assertEqual(self.controller.adjust(8), 8)
+        #an overloaded host gives back one container at a time
+        with patch('sources.ConcurrencyController.get_load', return_value=2.0):
+            self.assertEqual(self.controller.adjust(8), 7)
+        #and grows back gradually
+        self.assertEqual(self.controller.adjust(7), 8)
+
+    def test_workers(self):
+        #worker processes sharing the host split the memory and the CPUs
+        self.assertEqual(ConcurrencyController(ceiling=32, workers=4).initial_limit(), 4)
+        with patch('sources.ConcurrencyController.get_free_memory', return_value=None):
+            self.assertEqual(ConcurrencyController(ceiling=32, workers=4).initial_limit(), 16)
+
+    def test_adjust_interval(self):
+        controller = ConcurrencyController(ceiling=32, interval=3600)
+        controller.initial_limit()
+        with patch('sources.ConcurrencyController.get_free_memory', return_value=0):
+            self.assertEqual(controller.adjust(0), 16)
+
+    def test_observe(self):
+        #heavy test cases lower the limit
+        self.controller.observe([{"metrics": {MEMORY_METRIC: str(1024 * 1024)}}, {"stderr": "error"}])
+        self.assertEqual(self.controller.container_memory, 1024 + CONTAINER_OVERHEAD_MB)
+        self.assertEqual(self.controller.initial_limit(), 16 * CONTAINER_MEMORY_MB // (1024 + CONTAINER_OVERHEAD_MB))
+        #light ones only lower the estimate slowly
+        self.controller.observe([{"metrics": {MEMORY_METRIC: "0"}}])
+        self.assertEqual(self.controller.container_memory, 1024 + CONTAINER_OVERHEAD_MB)
+        self.controller.observe([{"metrics": {MEMORY_METRIC: "1024"}}])
+        self.assertEqual(self.controller.container_memory, (3 * (1024 + CONTAINER_OVERHEAD_MB) + 1 + CONTAINER_OVERHEAD_MB) // 4)
+
+if __name__ == '__main__':
+    unittest.main()
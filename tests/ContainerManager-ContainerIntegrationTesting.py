@@ -28,6 +28,8 @@ class CM_Container(unittest.TestCase):
             self.last_index = 99999
             self.container_class = container_class
             self.container_count = 0
+            self.max_containers = MAX_CONTAINERS
+            self.concurrency = None
 
 
 
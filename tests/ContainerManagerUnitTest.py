@@ -2,17 +2,24 @@ import time, threading
 from queue import Queue
 import unittest
 import tempfile
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock
 import os,sys,shutil,time
+import multiprocessing
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
 sys.path.append(parent_dir)
 from sources.CustomException import *
 from sources.LoggerConfig import logger
 from sources.Container import Container, format_output
-from sources.ContainerManager import MAX_CONTAINERS,index_lock,ContainerManager
+from sources.ContainerManager import MAX_CONTAINERS,MIN_SHARD_INPUTS,MAX_PARALLELISM,index_lock,ContainerManager,IndexAllocator,FileIndexAllocator,parse_pool_spec
+from sources.ResultCache import ResultCache
+from sources.ProgressTracker import Progress, current_progress
 import sources.ContainerManager as container_manager_module
 
+def allocate_indices(path, count):
+    allocator = FileIndexAllocator(path)
+    return [allocator.allocate() for _ in range(count)]
+
 class MockLock:
     def release(self):
         pass
@@ -37,6 +44,7 @@ class TestContainerManager(unittest.TestCase):
         container.available = True
         container.is_available.return_value = True
         container.run_code.side_effect = lambda input, timeout: {"stdout": input , "stderr":[]}
+        container.run_code_async = AsyncMock(side_effect = lambda input, timeout: {"stdout": input , "stderr":[]})
         container.terminate.return_value = None
         container.set_available.side_effect = lambda val: setattr(container,'available',val)
         return container
@@ -50,6 +58,7 @@ class TestContainerManager(unittest.TestCase):
         container.available = True
         container.is_available.return_value = True
         container.run_code.side_effect = Exception("error")
+        container.run_code_async = AsyncMock(side_effect = Exception("error"))
         container.terminate.return_value = None
         container.set_available.side_effect = lambda val: setattr(container,'available',val)
         return container
@@ -73,7 +82,8 @@ class TestContainerManager(unittest.TestCase):
        container_manager_module.index_lock = MockLock()
        self.addCleanup(lambda:setattr(container_manager_module,"index_lock",self.true_lock))
        #instantiate a Container Manager
-       self.manager = ContainerManager(container_class=self.constructor_container)
+       #the result cache is tested on its own, the other tests always run the test cases
+       self.manager = ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=None)
        self.metadata = {
                 'cell_id': 0,
                 'code': 'def sum_numbers(a, b):\n\treturn a + b\n',
@@ -127,6 +137,103 @@ class TestContainerManager(unittest.TestCase):
         d = [{'stdout': b, 'stderr': c}]
         self.assertEqual(d,true_outputs)
 
+    def test_execute_result_cache(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.manager.result_cache = ResultCache(path=os.path.join(temp_dir.name, "result_cache.db"))
+        index = self.manager.add_container(self.metadata)
+        container, _, _ = self.manager.containers[index]
+        container.run_code.side_effect = lambda input, timeout: {"stdout": input, "stderr": [], "metrics": {}}
+        self.manager.execute(self.metadata, inputs=[['1', '2'], ['3', '4']], run_as_is=False, timeout=100)
+        self.assertEqual(container.run_code.call_count, 2)
+        #only the new test case runs, the outputs stay in input order
+        outputs = self.manager.execute(self.metadata, inputs=[['1', '2'], ['5', '6'], ['3', '4']], run_as_is=False, timeout=100)
+        self.assertEqual(container.run_code.call_count, 3)
+        container.run_code.assert_called_with(['5', '6'], 100)
+        self.assertEqual([output['stdout'] for output in outputs], [['1', '2'], ['5', '6'], ['3', '4']])
+        self.assertEqual([output['input'] for output in outputs], [['1', '2'], ['5', '6'], ['3', '4']])
+        #changed code does not use the outputs of the old code
+        self.metadata['code'] = 'def sum_numbers(a, b):\n\treturn a - b\n'
+        self.manager.execute(self.metadata, inputs=[['1', '2']], run_as_is=False, timeout=100)
+        self.assertEqual(container.run_code.call_count, 4)
+        #cells can opt out
+        self.metadata['use_cache'] = False
+        self.manager.execute(self.metadata, inputs=[['1', '2']], run_as_is=False, timeout=100)
+        self.assertEqual(container.run_code.call_count, 5)
+
+    def test_execute_result_cache_parallelism(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.manager.result_cache = ResultCache(path=os.path.join(temp_dir.name, "result_cache.db"))
+        self.metadata['parallelism'] = 2
+        index = self.manager.add_container(self.metadata)
+        container, _, _ = self.manager.containers[index]
+        #a shard that timed out is reported as outputs without metrics, not as a failure
+        container.run_parallel.side_effect = lambda inputs, timeout, parallelism: [
+            {"stdout": input, "stderr": [], "metrics": {}} if input[0] != 'timeout' else format_output(stderr="timed out") for input in inputs]
+        inputs = [['1', '2'], ['timeout']]
+        outputs, failed = self.manager.execute_inputs(self.metadata, inputs, 100)
+        self.assertIsNone(failed)
+        #only the output with metrics is cached, the timed out test case runs again
+        self.manager.execute_inputs(self.metadata, inputs, 100)
+        self.assertEqual(container.run_parallel.call_args[0][0], [['timeout']])
+
+    def test_execute_result_cache_error(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.manager.result_cache = ResultCache(path=os.path.join(temp_dir.name, "result_cache.db"))
+        index = self.manager.add_container(self.metadata)
+        self.manager.containers[index][0].run_code.side_effect = lambda input, timeout: {"stdout": input, "stderr": [], "metrics": {}}
+        self.manager.execute(self.metadata, inputs=[['3', '4']], run_as_is=False, timeout=100)
+        #a failure before a cached test case reports it as not run, like the sequential run does
+        self.manager.containers[0][0].run_code.side_effect = Exception("error")
+        outputs, failed = self.manager.execute_inputs(self.metadata, [['1', '2'], ['3', '4']], 100)
+        self.assertEqual(failed, 0)
+        self.assertEqual(outputs[1]['stderr'], ['Prior execution failed'])
+        self.assertEqual(outputs[1]['input'], ['3', '4'])
+        #failed executions are not cached
+        self.manager.containers[0][0].run_code.side_effect = lambda input, timeout: {"stdout": input, "stderr": []}
+        outputs, failed = self.manager.execute_inputs(self.metadata, [['1', '2']], 100)
+        self.assertIsNone(failed)
+        self.assertEqual(outputs[0]['stdout'], ['1', '2'])
+
+    def test_execute_batch(self):
+        self.metadata['batch'] = True
+        inputs = [['5', '6'], ['1', '2']]
+        index = self.manager.add_container(self.metadata)
+        container, _, _ = self.manager.containers[index]
+        container.run_batch.side_effect = lambda inputs, timeout: [{"stdout": input, "stderr": []} for input in inputs]
+        outputs = self.manager.execute(self.metadata, inputs=inputs, run_as_is=False, timeout=100)
+        container.run_batch.assert_called_once_with(inputs, 100)
+        container.run_code.assert_not_called()
+        self.assertEqual(outputs, [{'stdout': ['5', '6'], 'stderr': [], 'input': ['5', '6']}, {'stdout': ['1', '2'], 'stderr': [], 'input': ['1', '2']}])
+
+    def test_execute_parallelism(self):
+        self.metadata['parallelism'] = 2
+        inputs = [['5', '6'], ['1', '2'], ['3', '4']]
+        index = self.manager.add_container(self.metadata)
+        container, _, _ = self.manager.containers[index]
+        container.run_parallel.side_effect = lambda inputs, timeout, parallelism: [{"stdout": input, "stderr": []} for input in inputs]
+        outputs = self.manager.execute(self.metadata, inputs=inputs, run_as_is=False, timeout=100)
+        container.run_parallel.assert_called_once_with(inputs, 100, 2)
+        container.run_code.assert_not_called()
+        self.assertEqual([output['input'] for output in outputs], inputs)
+
+    def test_execute_parallelism_limit(self):
+        index = self.manager.add_container(self.metadata)
+        container, _, _ = self.manager.containers[index]
+        container.run_parallel.side_effect = lambda inputs, timeout, parallelism: [{"stdout": input, "stderr": []} for input in inputs]
+        #parallelism is lowered to MAX_PARALLELISM
+        self.metadata['parallelism'] = MAX_PARALLELISM * 100
+        self.manager.execute(self.metadata, inputs=[['5', '6']], run_as_is=False, timeout=100)
+        self.assertEqual(container.run_parallel.call_args[0][2], MAX_PARALLELISM)
+        #values below 1 fail the cell before a container is used
+        self.metadata['parallelism'] = 0
+        outputs, failed = self.manager.execute_inputs(self.metadata, [['5', '6']], 100)
+        self.assertEqual(failed, 0)
+        self.assertIn("Parallelism", outputs[0]['stderr'][0])
+        self.assertEqual(container.run_parallel.call_count, 1)
+
     def test_execute_max_containers_reached(self):
         for _ in range (MAX_CONTAINERS):
             self.manager.add_container(self.metadata)
@@ -232,6 +339,233 @@ class TestContainerManager(unittest.TestCase):
                     ]   
         self.assertEqual(results,expected)
 
+    def test_execute_parallel_shards(self):
+        #a single cell with many test cases is split across all containers
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * MAX_CONTAINERS)]
+        execute_inputs = self.manager.execute_inputs
+        self.manager.execute_inputs = MagicMock(side_effect = execute_inputs)
+        results = self.manager.execute_parallel([self.metadata], inputs, timeout=100)
+        shard_sizes = [len(call.args[1]) for call in self.manager.execute_inputs.call_args_list]
+        self.assertEqual(shard_sizes, [MIN_SHARD_INPUTS] * MAX_CONTAINERS)
+        self.assertEqual(results, [{self.metadata['cell_id']: [{'stdout': input, 'stderr': [], 'input': input} for input in inputs]}])
+
+    def test_execute_parallel_on_cell(self):
+        #every cell is reported once all its shards are done, with the same result as the return value
+        for engine in ("threads", "asyncio"):
+            self.manager.engine = engine
+            second = dict(self.metadata, cell_id = 1)
+            inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 2)]
+            reported = []
+            results = self.manager.execute_parallel([self.metadata, second], inputs, timeout=100, on_cell=reported.append)
+            self.assertEqual(sorted(reported, key=lambda result: list(result)[0]), results)
+
+    def test_execute_parallel_on_case(self):
+        #every test case is reported with its position in the inputs of the cell, cached ones too
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.manager.result_cache = ResultCache(path=os.path.join(temp_dir.name, "result_cache.db"))
+        self.manager.execute(self.metadata, inputs=[["5"]], timeout=100)
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 2)]
+        reported = []
+        results = self.manager.execute_parallel([self.metadata], inputs, timeout=100, on_case=lambda cell_id, position, output: reported.append((cell_id, position, output)))
+        self.assertEqual(sorted((position, output) for _, position, output in reported), list(enumerate(results[0][0])))
+        self.assertEqual(set(cell_id for cell_id, _, _ in reported), {0})
+
+    def test_progress(self):
+        #the cells and test cases of a request are counted in its progress, also on the worker threads
+        progress = Progress(cells=2, test_cases=200)
+        token = current_progress.set(progress)
+        self.addCleanup(current_progress.reset, token)
+        second = dict(self.metadata, cell_id = 1)
+        self.manager.execute_parallel([self.metadata, second], [[str(i)] for i in range(200)], timeout=100)
+        self.assertEqual(progress.cells_done, 2)
+        self.assertAlmostEqual(progress.status(), 1.0)
+
+    def test_adaptive_limit(self):
+        #the limit and the worker count follow the controller
+        concurrency = MagicMock()
+        concurrency.initial_limit.return_value = 8
+        concurrency.adjust.return_value = 2
+        manager = ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=concurrency)
+        self.assertEqual(manager.max_containers, 8)
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 8)]
+        execute_inputs = manager.execute_inputs
+        manager.execute_inputs = MagicMock(side_effect = execute_inputs)
+        manager.execute_parallel([self.metadata], inputs, timeout=100)
+        self.assertEqual(len(manager.execute_inputs.call_args_list), 2)
+        #the memory of the test cases is reported
+        concurrency.observe.assert_called()
+        #containers beyond a lowered limit are removed before a new one is added
+        manager.purge()
+        manager.add_container(dict(self.metadata, version="3.9"))
+        manager.add_container(dict(self.metadata, version="3.11"))
+        concurrency.adjust.return_value = 1
+        metadata = dict(self.metadata, version="3.12")
+        manager.prepare_container(metadata, manager.get_environment(metadata))
+        self.assertEqual(manager.container_count, 1)
+
+    @staticmethod
+    def constructor_container_slow(metadata, index, run_as_is = False):
+        #the container is busy while it runs a test case
+        container = TestContainerManager.constructor_container(metadata, index, run_as_is)
+        def run_code(input, timeout):
+            container.available = False
+            time.sleep(0.05)
+            container.available = True
+            return {"stdout": input, "stderr": []}
+        container.run_code.side_effect = run_code
+        container.is_available.side_effect = lambda: container.available
+        return container
+
+    def test_limit_dropped(self):
+        #the cells finish when the limit drops below the number of busy containers
+        container_manager_module.index_lock = self.true_lock
+        concurrency = MagicMock()
+        concurrency.initial_limit.return_value = 3
+        concurrency.adjust.return_value = 3
+        manager = ContainerManager(container_class=self.constructor_container_slow, result_cache=None, concurrency=concurrency)
+        options = [dict(self.metadata, cell_id=str(cell), version=f"3.{cell}") for cell in range(6)]
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(manager.execute_parallel(options, [["1"], ["2"]], timeout=100)), daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        concurrency.adjust.return_value = 1
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 6)
+        self.assertLessEqual(manager.container_count, 1)
+        #the lock is released
+        self.assertTrue(self.true_lock.acquire(timeout=1))
+        self.true_lock.release()
+
+    def test_trim_containers(self):
+        #container managers sharing an allocator never use the same index
+        allocator = IndexAllocator()
+        first = ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=None, index_allocator=allocator)
+        second = ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=None, index_allocator=allocator)
+        indices = [first.add_container(dict(self.metadata, version="3.9")), second.add_container(dict(self.metadata, version="3.10")),
+                   first.add_container(dict(self.metadata, version="3.11"))]
+        self.assertEqual(indices, [0, 1, 2])
+        #the oldest available containers are removed first, at most count of them
+        self.assertEqual(first.trim_containers(0, 1), 1)
+        self.assertEqual(list(first.containers), [2])
+        #busy containers are kept
+        first.containers[2][0].is_available.return_value = False
+        self.assertEqual(first.trim_containers(0), 0)
+        self.assertEqual(first.container_count, 1)
+        #also between two test cases of the cell using them
+        index = second.add_container(dict(self.metadata, version="3.12"), claim=True)
+        self.assertEqual(second.trim_containers(0), 1)
+        self.assertEqual(list(second.containers), [index])
+        second.release_container(index)
+        self.assertEqual(second.trim_containers(0), 1)
+
+    def test_file_index_allocator(self):
+        #worker processes sharing the file never get the same index
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, "container_index")
+        with multiprocessing.Pool(4) as pool:
+            indices = sum(pool.starmap(allocate_indices, [(path, 25)] * 4), [])
+        self.assertEqual(sorted(indices), list(range(100)))
+        allocator = FileIndexAllocator(path)
+        self.assertEqual(allocator.allocate(), 100)
+        allocator.reset()
+        self.assertEqual(allocator.allocate(), 0)
+
+    def test_split_cell(self):
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 3)]
+        self.assertEqual(len(self.manager.split_cell(inputs, 1)), min(3, MAX_CONTAINERS))
+        #the containers are shared between the cells
+        self.assertEqual(len(self.manager.split_cell(inputs, MAX_CONTAINERS)), 1)
+        #small suites are not split
+        self.assertEqual(self.manager.split_cell(inputs[:MIN_SHARD_INPUTS], 1), [(0, inputs[:MIN_SHARD_INPUTS])])
+
+    def test_merge_shards(self):
+        inputs = [["1"], ["2"], ["3"], ["4"]]
+        first = ([{'stdout': ['1'], 'stderr': [], 'input': ['1']}, {'stdout': [''], 'stderr': ['error'], 'input': ['2']}], 1)
+        second = ([{'stdout': ['3'], 'stderr': [], 'input': ['3']}, {'stdout': ['4'], 'stderr': [], 'input': ['4']}], None)
+        outputs = self.manager.merge_shards([(0, first), (2, second)], inputs)
+        #after a failure the next shards are reported like the sequential run would
+        self.assertEqual(outputs[:2], first[0])
+        self.assertEqual(outputs[2:], [{'stdout': [''], 'stderr': ['Prior execution failed'], 'input': input} for input in inputs[2:]])
+
+    def test_execute_parallel_asyncio(self):
+        #the asyncio engine gives the same result shape as the threads engine
+        self.manager.engine = "asyncio"
+        second = dict(self.metadata, cell_id = 1, language = "cpp")
+        inputs = [["5", "6"], ["1", "2"]]
+        results = self.manager.execute_parallel([self.metadata, second], inputs, timeout=100)
+        expected = [{'stdout': input, 'stderr': [], 'input': input} for input in inputs]
+        self.assertEqual(results, [{0: expected}, {1: expected}])
+        for container, _, _ in self.manager.containers.values():
+            container.run_code.assert_not_called()
+
+    def test_execute_parallel_asyncio_error(self):
+        self.manager.engine = "asyncio"
+        self.manager.container_class = self.constructor_container_with_error
+        inputs = [["5", "6"], ["1", "2"]]
+        results = self.manager.execute_parallel([self.metadata], inputs, timeout=100)
+        self.assertEqual(results, [{0: [{'stdout': [''], 'stderr': ['error'], 'input': ['5', '6']}, {'stdout': [''], 'stderr': ['Prior execution failed'], 'input': ['1', '2']}]}])
+
+    def test_parse_pool_spec(self):
+        pool = parse_pool_spec("python:3.10 x2, cpp/gcc x2,java:21/temurin")
+        self.assertEqual(pool, [
+            {"language": "python", "version": "3.10", "compiler": "", "count": 2},
+            {"language": "cpp", "version": "", "compiler": "gcc", "count": 2},
+            {"language": "java", "version": "21", "compiler": "temurin", "count": 1}
+        ])
+        self.assertEqual(parse_pool_spec(""), [])
+        with self.assertRaises(WarmPoolException):
+            parse_pool_spec("python 3.10 x2")
+
+    def test_fill_pool(self):
+        self.manager.pool = parse_pool_spec("python:3.10 x2, cpp/gcc x1")
+        self.manager.fill_pool()
+        self.assertEqual(self.manager.container_count, 3)
+        self.assertEqual(self.manager.pool_indices, {0, 1, 2})
+        for container, _, _ in self.manager.containers.values():
+            self.assertTrue(container.run_as_is)
+        #a full pool is not filled again
+        self.manager.fill_pool()
+        self.assertEqual(self.manager.container_count, 3)
+
+    def test_fill_pool_free_slots(self):
+        #warm containers only use free slots
+        self.manager.pool = parse_pool_spec("python:3.10 x10")
+        self.manager.fill_pool()
+        self.assertEqual(self.manager.container_count, MAX_CONTAINERS)
+
+    def test_claim_pool_container(self):
+        self.manager.pool = parse_pool_spec("python:3.10 x1")
+        self.manager.fill_pool()
+        self.manager.refill_pool = MagicMock()
+        inputs = [["5", "6"]]
+        outputs = self.manager.execute(self.metadata, inputs, timeout=100)
+        self.assertEqual(outputs, [{'stdout': ['5', '6'], 'stderr': [], 'input': ['5', '6']}])
+        #the cell ran in the warm container and its replacement is being built
+        self.assertEqual(self.manager.container_count, 1)
+        self.manager.containers[0][0].change_code.assert_called_once()
+        self.assertEqual(self.manager.pool_indices, set())
+        self.manager.refill_pool.assert_called_once()
+
+    def test_claim_warm_container(self):
+        #a session claims the warm containers of the default session
+        self.manager.pool = parse_pool_spec("python:3.10 x1")
+        self.manager.fill_pool()
+        self.manager.refill_pool = MagicMock()
+        session = ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=None, pool_spec="", pool_source=self.manager)
+        outputs = session.execute(self.metadata, [["5", "6"]], timeout=100)
+        self.assertEqual(outputs, [{'stdout': ['5', '6'], 'stderr': [], 'input': ['5', '6']}])
+        self.assertEqual(list(session.containers), [0])
+        session.containers[0][0].change_code.assert_called_once()
+        #the default session builds its replacement
+        self.assertEqual((self.manager.container_count, self.manager.pool_indices), (0, set()))
+        self.manager.refill_pool.assert_called_once()
+        #other environments are built by the session itself
+        session.execute(dict(self.metadata, version="3.11"), [["5", "6"]], timeout=100)
+        self.assertEqual(session.container_count, 2)
+
     def test_check_containers(self):
         #check with available container
         container = self.manager.container_class(self.metadata,0,run_as_is = False)
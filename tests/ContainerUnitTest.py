@@ -1,6 +1,7 @@
-import os,sys,shutil
+import os,sys,io,shutil,tarfile
 import unittest
-from unittest.mock import MagicMock,patch
+from unittest.mock import MagicMock,AsyncMock,patch
+import asyncio
 import tempfile
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
@@ -11,7 +12,10 @@ from sources.Podman import Podman, podman
 from sources.CustomException import *
 from sources.LoggerConfig import logger
 from sources.LanguageFactory import LanguageFactory
-from sources.Container import Container
+from sources.Container import Container, split_inputs
+from sources.ImageCache import ImageCache, IMAGE_NAME
+from sources.CompileCache import CompileCache
+from sources.ProgressTracker import Progress, current_progress
 
 class TestContainer(unittest.TestCase):
     def setUp(self):
@@ -52,6 +56,8 @@ class TestContainer(unittest.TestCase):
         self.language.generate_run_command.return_value = "run_command"
         self.language.generate_compile_command.return_value = "compile_command"
         self.language.check_signature.return_value = self.metadata['signature']
+        self.language.is_compiled.return_value = False
+        self.language.generate_compiler_command.return_value = []
         #patch the Language factory so it gets the mocked Language
         self.language_factory_patcher = patch('sources.LanguageFactory.LanguageFactory.get_language',return_value = self.language)
         self.language_factory = self.language_factory_patcher.start()
@@ -63,8 +69,14 @@ class TestContainer(unittest.TestCase):
         self.podman.remove_container.return_value = None
         self.podman.remove_image.return_value = None
         self.podman.copy_to_container.return_value = None 
+        self.podman.image_exists.return_value = False
+        #keep the image cache index in the temporary directory
+        self.image_cache = ImageCache(index_path=os.path.join(self.temp_dir.name, "image_cache.json"))
+        #no base image is prepared
+        self.base_images = MagicMock()
+        self.base_images.get_base_image.return_value = ""
         #create a container object 
-        self.container = Container(self.metadata,self.index,self.podman, run_as_is=False)
+        self.container = Container(self.metadata,self.index,self.podman, run_as_is=False, image_cache=self.image_cache, base_images=self.base_images)
         
 
     def tearDown(self):
@@ -82,7 +94,7 @@ class TestContainer(unittest.TestCase):
         self.assertEqual(true_mounting_path,self.container.mounting_path)
 
         #check that generate_dockerfile was called with the correct arguments
-        self.language.generate_dockerfile.assert_called_once_with(version = self.metadata['version'],compiler = self.metadata['compiler'], function_name = self.metadata['signature']['name'],specs = self.metadata['specs'],index = self.index)
+        self.language.generate_dockerfile.assert_called_once_with(version = self.metadata['version'],compiler = self.metadata['compiler'], function_name = self.metadata['signature']['name'],specs = self.metadata['specs'],index = self.index, base_image = "")
 
         #check that the inject function was called with the right arguments
         self.language.inject.assert_called_once()
@@ -91,11 +103,43 @@ class TestContainer(unittest.TestCase):
         self.assertIn(self.metadata['signature']['name'],kwargs['function_name'])
         self.assertIn(self.metadata['signature']['name'],kwargs['function_name'])
        
-        #check that the build_image command was called
-        self.podman.build_image.assert_called_once_with(f'image_{self.index}', f'image_tag_{self.index}',mount_path=true_mounting_path)
+        #check that the image of the environment was built, tagged by the hash of the environment
+        self.podman.build_image.assert_called_once()
+        args, kwargs = self.podman.build_image.call_args
+        self.assertEqual(args, (IMAGE_NAME, self.container.image_tag))
+        #the image is built without the user code
+        self.assertNotEqual(kwargs['mount_path'], true_mounting_path)
 
         #check that the run_image command was called
-        self.podman.run_image.assert_called_once_with(image_name=f'image_{self.index}',tag=f'image_tag_{self.index}',container_name=f'container_{self.index}')
+        self.podman.run_image.assert_called_once_with(image_name=IMAGE_NAME,tag=self.container.image_tag,container_name=f'container_{self.index}')
+        #the code is uploaded to the running container
+        self.podman.image_exists.return_value = True
+        with patch.object(Container, 'upload_code') as mock_upload_code:
+            Container(self.metadata, self.index, self.podman, run_as_is=False, image_cache=self.image_cache, base_images=self.base_images)
+            mock_upload_code.assert_called_once()
+        #the second container with the same environment reuses the image
+        self.podman.build_image.assert_called_once()
+
+    def test_constructor_base_image(self):
+        '''
+        Tests that a prepared base image is used as is when the cell has no libraries, and as the base of the image otherwise
+        '''
+        self.base_images.get_base_image.return_value = "mdt_base:python-3.10-abc"
+        self.podman.reset_mock()
+        self.metadata['specs'] = {}
+        container = Container(self.metadata, self.index, self.podman, run_as_is=False, image_cache=self.image_cache, base_images=self.base_images)
+        self.podman.build_image.assert_not_called()
+        self.podman.run_image.assert_called_once_with(image_name="mdt_base",tag="python-3.10-abc",container_name=f'container_{self.index}')
+        #the base image is not owned by the image cache, so nothing is released
+        self.assertIsNone(container.image_tag)
+
+        self.podman.reset_mock()
+        self.metadata['specs'] = {"libraries":"numpy"}
+        container = Container(self.metadata, self.index, self.podman, run_as_is=False, image_cache=self.image_cache, base_images=self.base_images)
+        args, kwargs = self.language.generate_dockerfile.call_args
+        self.assertEqual(kwargs['base_image'], "mdt_base:python-3.10-abc")
+        self.podman.build_image.assert_called_once()
+        self.assertEqual(container.image_name, IMAGE_NAME)
 
 
     def test_constructor_error(self):
@@ -121,6 +165,17 @@ class TestContainer(unittest.TestCase):
         self.assertEqual(result,true_output)
         self.assertTrue(self.container.available)
 
+    def test_run_code_progress(self):
+        #test cases are counted in the progress of the request that runs them
+        self.language.generate_run_command.return_value = "run_command"
+        self.podman.exec_command.return_value = {"stdout" : ["output"], "stderr" : []}
+        progress = Progress(cells=1, test_cases=2)
+        token = current_progress.set(progress)
+        self.addCleanup(current_progress.reset, token)
+        self.container.run_code([1,2])
+        self.container.run_parallel([[1], [2]], parallelism=2)
+        self.assertEqual(progress.tests_done, 3)
+
     def test_run_code_error(self):
         self.podman.exec_command.side_effect = Exception("run code error")
         with self.assertRaises(RunCodeException) as context:
@@ -129,6 +184,176 @@ class TestContainer(unittest.TestCase):
         self.assertIn("run code error",str(context.exception))
         
 
+    def test_run_batch(self):
+        '''
+        function that checks that a batch run uploads the input file, runs the harness once
+        and splits the framed output into one output per test case
+        '''
+        self.container.metadata['batch'] = True
+        self.language.supports_batch.return_value = True
+        frames = [
+            "@@MDT@@\t0\t1500000\t2048\t0\t" + "11\n".encode().hex() + "\t",
+            "@@MDT@@\t1\t2000000\t0\t1\t\t" + "error".encode().hex()
+        ]
+        metrics = {'Percent of CPU this job got': '90%', 'Maximum resident set size (kbytes)': '4096', 'Elapsed (wall clock) time (h:mm:ss or m:ss)': '0:00.50'}
+        self.podman.exec_command.return_value = {"stdout": frames, "stderr": [], "metrics": metrics}
+        outputs = self.container.run_batch([["5", "6"], ["raise", "6"], ["1", "1"]], timeout=10)
+        self.podman.copy_to_container.assert_called_with(os.path.join(self.container.mounting_path, "inputs.mdt"), f"container_{self.index}")
+        self.language.generate_run_command.assert_called_with(self.metadata['signature']['name'] + "_injected", ["inputs.mdt"])
+        self.assertEqual(self.podman.exec_command.call_args.kwargs['timeout'], 30)
+        self.assertEqual(len(outputs), 3)
+        self.assertEqual(outputs[0]['stdout'], ["11"])
+        self.assertEqual(outputs[0]['metrics']['Elapsed (wall clock) time (h:mm:ss or m:ss)'], "0:00.001500")
+        self.assertEqual(outputs[0]['metrics']['Maximum resident set size (kbytes)'], "2048")
+        self.assertEqual(outputs[1]['stderr'], ["error"])
+        self.assertEqual(outputs[1]['metrics']['Maximum resident set size (kbytes)'], "4096")
+        self.assertEqual(outputs[1]['metrics']['Exit status'], "1")
+        self.assertEqual(outputs[2], {"stdout": [""], "stderr": ["Batch execution did not report this test case"]})
+        self.assertTrue(self.container.available)
+
+    def test_run_parallel(self):
+        #every shard runs its test cases with separate executions, outputs come back in input order
+        inputs = [[str(i), "1"] for i in range(7)]
+        self.language.generate_run_command.side_effect = lambda name, input: input
+        self.podman.exec_command.side_effect = lambda name, command, metrics, timeout: {"stdout": [command[0]], "stderr": [], "metrics": {"Exit status": "0"}}
+        outputs = self.container.run_parallel(inputs, timeout=10, parallelism=3)
+        self.assertEqual([output['stdout'] for output in outputs], [[str(i)] for i in range(7)])
+        self.assertEqual(self.podman.exec_command.call_count, 7)
+        self.assertTrue(self.container.available)
+
+    def test_run_parallel_error(self):
+        #a failing test case ends its own shard only
+        inputs = [["1"], ["raise"], ["3"], ["4"]]
+        self.language.generate_run_command.side_effect = lambda name, input: input
+
+        def exec_command(name, command, metrics, timeout):
+            if command[0] == "raise":
+                raise RunCodeTimeoutException("timeout")
+            return {"stdout": command, "stderr": []}
+
+        self.podman.exec_command.side_effect = exec_command
+        outputs = self.container.run_parallel(inputs, timeout=10, parallelism=2)
+        self.assertEqual(outputs[0]['stdout'], ["1"])
+        self.assertEqual(outputs[1]['stderr'], ["timeout"])
+        self.assertEqual(outputs[2]['stdout'], ["3"])
+        self.assertEqual(outputs[3]['stdout'], ["4"])
+
+    def test_run_parallel_batch(self):
+        #every shard is a separate batch run with its own input file
+        self.container.metadata['batch'] = True
+        self.language.supports_batch.return_value = True
+        inputs = [["1"], ["2"], ["3"]]
+        self.container.run_batch_file = MagicMock(side_effect = lambda shard, timeout, input_file: [{"stdout": shard[i], "stderr": [], "file": input_file} for i in range(len(shard))])
+        outputs = self.container.run_parallel(inputs, timeout=10, parallelism=2)
+        self.assertEqual([output['stdout'] for output in outputs], inputs)
+        self.assertEqual([output['file'] for output in outputs], ["inputs_0.mdt", "inputs_0.mdt", "inputs_1.mdt"])
+
+    def test_split_inputs(self):
+        self.assertEqual(split_inputs([1, 2, 3, 4, 5], 2), [(0, [1, 2, 3]), (3, [4, 5])])
+        #never more shards than inputs
+        self.assertEqual(split_inputs([1, 2], 4), [(0, [1]), (1, [2])])
+        self.assertEqual(split_inputs([], 3), [(0, [])])
+
+    def test_run_batch_unsupported(self):
+        #languages without a batch harness run every test case separately
+        self.language.supports_batch.return_value = False
+        self.container.metadata['batch'] = True
+        self.podman.exec_command.return_value = {"stdout" : ["output"], "stderr" : []}
+        outputs = self.container.run_batch([["5", "6"], ["1", "1"]])
+        self.assertEqual(self.podman.exec_command.call_count, 2)
+        self.assertEqual(outputs, [{"stdout" : ["output"], "stderr" : []}] * 2)
+
+    def test_run_code_async(self):
+        #with an asynchronous podman backend the test case runs as a coroutine
+        self.podman.exec_command_async = AsyncMock(return_value = {"stdout": ["11"], "stderr": []})
+        output = asyncio.run(self.container.run_code_async(["5", "6"], timeout=10))
+        self.podman.exec_command_async.assert_awaited_once_with(f"container_{self.index}", "run_command", metrics=True, timeout=10)
+        self.podman.exec_command.assert_not_called()
+        self.assertEqual(output['stdout'], ["11"])
+        self.assertTrue(self.container.available)
+        #errors are reported like in run_code
+        self.podman.exec_command_async.side_effect = ExecutionException("failed")
+        with self.assertRaises(RunCodeException):
+            asyncio.run(self.container.run_code_async(["5", "6"]))
+
+    def test_run_code_worker(self):
+        #with the worker option the test case is sent to the worker instead of starting a new process
+        self.container.metadata['worker'] = True
+        self.language.supports_worker.return_value = True
+        worker = MagicMock()
+        worker.request.return_value = "@@MDT@@\t0\t2000000\t1024\t0\t" + "11".encode().hex() + "\t"
+        self.container.get_worker = MagicMock(return_value = worker)
+        output = self.container.run_code(["5", "6"], timeout=10)
+        worker.request.assert_called_once_with("2\t" + "5".encode().hex() + "\t" + "6".encode().hex(), 10)
+        self.podman.exec_command.assert_not_called()
+        self.assertEqual(output['stdout'], ["11"])
+        self.assertEqual(output['metrics']['Maximum resident set size (kbytes)'], "1024")
+        self.assertTrue(self.container.available)
+
+    def test_run_code_worker_error(self):
+        self.container.metadata['worker'] = True
+        self.language.supports_worker.return_value = True
+        worker = MagicMock()
+        worker.request.side_effect = WorkerException("worker died")
+        self.container.workers = [worker]
+        self.container.get_worker = MagicMock(return_value = worker)
+        with self.assertRaises(RunCodeException) as context:
+            self.container.run_code(["5", "6"])
+        self.assertIn("worker died", str(context.exception))
+        #the failed worker is discarded
+        worker.stop.assert_called_once()
+        self.assertEqual(self.container.workers, [])
+
+    def test_get_worker(self):
+        #a busy worker is not shared, a parallel shard starts its own worker
+        first, second = MagicMock(), MagicMock()
+        self.container.start_worker = MagicMock(side_effect = [first, second])
+        self.container.workers = []
+        self.assertIs(self.container.get_worker(), first)
+        self.container.workers = [first]
+        self.assertIs(self.container.get_worker(), second)
+        self.container.release_worker(first)
+        self.container.workers = [first, second]
+        self.assertIs(self.container.get_worker(), first)
+
+    def test_refresh_workers(self):
+        self.container.metadata['worker'] = True
+        self.language.supports_worker.return_value = True
+        worker = MagicMock()
+        worker.source = "old code"
+        self.container.workers = [worker]
+        self.language.generate_worker_load.return_value = ""
+        self.container.get_injected_source = MagicMock(return_value = "old code")
+        self.container.refresh_workers()
+        worker.stop.assert_not_called()
+        self.container.get_injected_source.return_value = "new code"
+        self.container.refresh_workers()
+        worker.stop.assert_called_once()
+        self.assertEqual(self.container.workers, [])
+
+    def test_refresh_workers_reload(self):
+        #resident workers load the new code instead of being restarted
+        self.container.metadata['worker'] = True
+        self.container.metadata['jit_warmup'] = 3
+        self.language.supports_worker.return_value = True
+        self.language.generate_worker_load.return_value = "LOAD\tsum_injected\t3"
+        worker = MagicMock()
+        worker.source = "old code"
+        worker.request.return_value = "OK"
+        self.container.workers = [worker]
+        self.container.get_injected_source = MagicMock(return_value = "new code")
+        self.container.refresh_workers()
+        self.language.generate_worker_load.assert_called_with(f"{self.container.metadata['signature']['name']}_injected", 3)
+        worker.request.assert_called_once_with("LOAD\tsum_injected\t3", 60)
+        worker.stop.assert_not_called()
+        self.assertEqual(worker.source, "new code")
+        #a failed load discards the worker
+        worker.request.return_value = "Failed to load sum_injected"
+        self.container.get_injected_source.return_value = "newer code"
+        self.container.refresh_workers()
+        worker.stop.assert_called_once()
+        self.assertEqual(self.container.workers, [])
+
     def test_compile_code(self):
         '''
         this method checks that the generate_compile_command from podman was called with the correct arguments
@@ -144,6 +369,60 @@ class TestContainer(unittest.TestCase):
         self.assertEqual(result, true_output)
         self.assertTrue(self.container.available)
 
+    def test_compile_code_cached(self):
+        '''
+        Tests that compiled files are stored after the first compilation and restored instead of compiling the same code again
+        '''
+        self.language.is_compiled.return_value = True
+        self.container.compile_cache = CompileCache(path=os.path.join(self.temp_dir.name, "compile_cache"))
+        self.container.language.generate_compile_command.return_value = ["g++", "f_injected.cpp", "-o", "f_injected"]
+        os.makedirs(self.container.mounting_path, exist_ok=True)
+        with open(os.path.join(self.container.mounting_path, "f_injected.cpp"), "w") as file:
+            file.write("int main() {}")
+        #the container has the source and the binary after compiling
+        with tempfile.TemporaryDirectory() as workspace:
+            for name, content in [("f_injected.cpp", "int main() {}"), ("f_injected", "binary")]:
+                with open(os.path.join(workspace, name), "w") as file:
+                    file.write(content)
+            archive = Podman().make_archive([(os.path.join(workspace, name), name) for name in os.listdir(workspace)])
+        self.podman.download_archive.return_value = archive
+        self.podman.exec_command.reset_mock()
+        self.container.compile_code()
+        self.podman.exec_command.assert_called_once()
+        #the same code is not compiled again, only the binary is sent to the container
+        self.container.compile_code()
+        self.podman.exec_command.assert_called_once()
+        sent = self.podman.send_archive.call_args[0][0]
+        with tarfile.open(fileobj=io.BytesIO(sent)) as restored:
+            self.assertEqual(restored.getnames(), ["f_injected"])
+        #changed code is compiled
+        with open(os.path.join(self.container.mounting_path, "f_injected.cpp"), "w") as file:
+            file.write("int main() { return 1; }")
+        self.container.compile_code()
+        self.assertEqual(self.podman.exec_command.call_count, 2)
+
+    def test_compile_code_service(self):
+        '''
+        Tests that languages with a resident compiler send the compile command to it instead of starting a compiler
+        '''
+        self.language.generate_compiler_command.return_value = ["java", "compiler"]
+        self.container.language.generate_compile_command.return_value = ["javac", "-cp", ".:/opt/mdt", "f_injected.java"]
+        self.podman.exec_command.reset_mock()
+        with patch('sources.Container.Worker') as mock_worker:
+            mock_worker.return_value.request.return_value = "0\t"
+            self.container.compile_code()
+            self.container.compile_code()
+            #the service is started once and gets the arguments of javac
+            self.podman.open_process.assert_called_once_with(f"container_{self.index}", ["java", "compiler"])
+            mock_worker.return_value.request.assert_called_with("-cp\t.:/opt/mdt\tf_injected.java")
+            self.podman.exec_command.assert_not_called()
+            mock_worker.return_value.request.return_value = "1\tf_injected.java:3: error: ';' expected"
+            with self.assertRaises(CompileCodeException) as context:
+                self.container.compile_code()
+            self.assertIn("';' expected", str(context.exception))
+            self.container.terminate()
+            mock_worker.return_value.stop.assert_called_once()
+
     def test_compile_code_error(self):
         self.podman.exec_command.side_effect = Exception("compile code error")
         with self.assertRaises(CompileCodeException) as context:
@@ -202,7 +481,9 @@ class TestContainer(unittest.TestCase):
         self.container.terminate()
         self.podman.stop_container.assert_called_once_with(f'container_{self.index}')
         self.podman.remove_container.assert_called_once_with(f'container_{self.index}')
-        self.podman.remove_image.assert_called_once_with(f'image_{self.index}', f'image_tag_{self.index}')
+        #the image is kept for the next container with the same environment
+        self.podman.remove_image.assert_not_called()
+        self.assertEqual(self.image_cache.references[self.container.image_tag], 0)
         self.container.remove_folder.assert_called_once()
 
     def test_terminate_error(self):
@@ -223,6 +504,26 @@ class TestContainer(unittest.TestCase):
         self.container.clear()
         self.container.remove_folder.assert_called_once()
         self.assertTrue(self.container.available)
+        #the workspace is wiped with one execution, not one per file
+        self.podman.exec_command.assert_called_once_with(f"container_{self.index}", ['find', '/usr/src/app', '-mindepth', '1', '-delete'])
+
+    def test_mount_code(self):
+        '''
+        Tests that a container with a bind mounted session folder never copies files into the container
+        '''
+        self.podman.reset_mock()
+        container = Container(self.metadata, self.index, self.podman, run_as_is=False, image_cache=self.image_cache, base_images=self.base_images, mount_code=True)
+        args, kwargs = self.podman.run_image.call_args
+        self.assertEqual(kwargs['volumes'], [(container.mounting_path, "/usr/src/app")])
+        container.run_batch_file([[1, 2]])
+        container.change_code()
+        self.podman.copy_to_container.assert_not_called()
+        #clearing keeps the mounted folder in place
+        with open(os.path.join(container.mounting_path, "code.py"), "w") as file:
+            file.write("print(1)")
+        container.clear()
+        self.assertTrue(os.path.isdir(container.mounting_path))
+        self.assertEqual(os.listdir(container.mounting_path), [])
 
     def test_clear_error(self):
         self.container.remove_folder = MagicMock(side_effect = Exception("clear error"))
@@ -271,6 +572,15 @@ class TestContainer(unittest.TestCase):
         self.language.inject.assert_called_once_with(file_name,injected_file,signature)
         self.assertFalse(os.path.exists(file_name))
 
+    def test_inject_batch(self):
+        os.makedirs(self.container.mounting_path,exist_ok=True)
+        self.language.inject.reset_mock()
+        self.language.supports_batch.return_value = True
+        self.container.metadata['batch'] = True
+        self.container.inject()
+        self.language.inject_batch.assert_called_once()
+        self.language.inject.assert_not_called()
+
     def test_inject_run_as_is(self):
         #make sure that the mounting path is clean 
         if os.path.exists(self.container.mounting_path):
@@ -318,11 +628,11 @@ class TestContainer(unittest.TestCase):
             f.write("code1")
         with open(mock_file_2, "w") as f:
             f.write("code2")   
+        self.podman.upload_folder.reset_mock()
         self.container.upload_code()
-        self.podman.copy_to_container.assert_any_call(mock_file_1,f"container_{self.index}")
-        self.podman.copy_to_container.assert_any_call(mock_file_2,f"container_{self.index}")
-        #check that it called the copy to container method twice, as the number of files
-        self.assertEqual(self.podman.copy_to_container.call_count,2)
+        #check that the whole folder is uploaded in a single call
+        self.podman.upload_folder.assert_called_once_with(self.container.mounting_path,f"container_{self.index}")
+        self.podman.copy_to_container.assert_not_called()
 
     def test_set_metadata(self):
         new_metadata = {
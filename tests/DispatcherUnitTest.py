@@ -0,0 +1,127 @@
+import os,sys,threading
+import unittest
+from unittest.mock import MagicMock
+from werkzeug.serving import make_server
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.Dispatcher import AgentClient, AgentRegistry, Dispatcher
+from sources.ExecutorAgent import ExecutorAgent
+from sources.ContainerManager import ContainerManager, MIN_SHARD_INPUTS
+from sources.CustomException import *
+
+class TestDispatcher(unittest.TestCase):
+    @staticmethod
+    def constructor_container(metadata,index,run_as_is = False):
+        container = MagicMock()
+        container.metadata = metadata
+        container.index = index
+        container.run_as_is = run_as_is
+        container.available = True
+        container.is_available.return_value = True
+        container.run_code.side_effect = lambda input, timeout: {"stdout": input , "stderr":[]}
+        container.terminate.return_value = None
+        container.set_available.side_effect = lambda val: setattr(container,'available',val)
+        return container
+
+    def make_manager(self):
+        return ContainerManager(container_class=self.constructor_container, result_cache=None, concurrency=None)
+
+    def start_agent(self) -> tuple:
+        '''
+        Serves an agent on a free port of localhost, returns the agent and its URL
+        '''
+        agent = ExecutorAgent(container_manager=self.make_manager(), podman_instance=MagicMock(), token="")
+        server = make_server("127.0.0.1", 0, agent.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        return agent, server, f"http://127.0.0.1:{server.server_port}"
+
+    def setUp(self):
+        self.registry = AgentRegistry(token="")
+        self.agents = [self.start_agent() for _ in range(2)]
+        for _, _, url in self.agents:
+            self.registry.register(url)
+        self.metadata = {
+            'cell_id': 0,
+            'code': 'def sum_numbers(a, b):\n\treturn a + b\n',
+            'signature': {'name': 'sum_numbers', 'args': ['int', 'int'], 'return': 'int'},
+            'language': 'Python',
+            'version': '3.10',
+            'compiler': '',
+            'specs': {},
+            'run_as_is': False
+        }
+
+    def test_execute_parallel(self):
+        #the cells and their shards are spread across the agents
+        dispatcher = Dispatcher(self.registry.get_agents())
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 8)]
+        cells, cases = [], []
+        second = dict(self.metadata, cell_id = 1)
+        results = dispatcher.execute_parallel([self.metadata, second], inputs, timeout=100, on_cell=cells.append,
+                                              on_case=lambda cell_id, position, output: cases.append((cell_id, position)))
+        self.assertEqual(dispatcher.max_containers, 8)
+        for cell_id, result in enumerate(results):
+            self.assertEqual([output['stdout'] for output in result[cell_id]], inputs)
+            self.assertEqual([output['input'] for output in result[cell_id]], inputs)
+        self.assertEqual(len(cells), 2)
+        self.assertEqual(len(cases), 2 * len(inputs))
+        for agent, _, _ in self.agents:
+            self.assertGreater(agent.manager.container_count, 0)
+
+    def test_unreachable_agent(self):
+        #the cells of an agent that stops go to the other agents and the server
+        _, server, url = self.agents[0]
+        server.shutdown()
+        server.server_close()
+        local = self.make_manager()
+        dispatcher = Dispatcher(self.registry.get_agents(), local=local)
+        inputs = [[str(i)] for i in range(MIN_SHARD_INPUTS * 4)]
+        results = dispatcher.execute_parallel([self.metadata], inputs, timeout=100)
+        self.assertEqual([output['stdout'] for output in results[0][0]], inputs)
+        self.assertFalse(self.registry.agents[url].available)
+        #without any agent the cell reports the error
+        self.registry.agents[url].last_status = 0
+        self.agents[1][1].shutdown()
+        self.agents[1][1].server_close()
+        results = Dispatcher(self.registry.get_agents()).execute_parallel([self.metadata], [["1"]], timeout=100)
+        self.assertIn("No executor agent", results[0][0][0]['stderr'][0])
+
+    def test_pick_agent(self):
+        idle, busy = AgentClient("http://idle:5100"), AgentClient("http://busy:5100")
+        idle.capacity, idle.running, idle.available = 2, 1, True
+        busy.capacity, busy.running, busy.available = 8, 2, True
+        dispatcher = Dispatcher([idle, busy])
+        #the agent with the lowest share of its containers in use gets the cell
+        self.assertIs(dispatcher.pick_agent(), busy)
+        busy.available = False
+        self.assertIs(dispatcher.pick_agent(), idle)
+
+    def test_shared_agent(self):
+        #the dispatchers of concurrent requests share the agents and their count of assigned cells
+        agent = AgentClient("http://agent:5100")
+        agent.capacity, agent.available = 4, True
+        agent.request = MagicMock(return_value = {"outputs": [{"stdout": [], "stderr": []}], "failed": None})
+        def run():
+            dispatcher = Dispatcher([agent])
+            for _ in range(200):
+                dispatcher.execute_inputs({}, [["1"]], 1)
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(agent.assigned, 0)
+
+    def test_registry(self):
+        self.assertEqual(len(self.registry.list()), 2)
+        with self.assertRaises(AgentException):
+            self.registry.register("http://127.0.0.1:1")
+        self.registry.unregister(self.agents[0][2])
+        with self.assertRaises(AgentNotFoundException):
+            self.registry.unregister(self.agents[0][2])
+
+if __name__ == '__main__':
+    unittest.main()
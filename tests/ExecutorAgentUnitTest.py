@@ -0,0 +1,57 @@
+import os,sys
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ExecutorAgent import ExecutorAgent
+from sources.CustomException import *
+
+class TestExecutorAgent(unittest.TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.manager.adjust_limit.return_value = 4
+        self.manager.container_count = 1
+        self.manager.execute_inputs.side_effect = lambda data, inputs, timeout, run_as_is: ([{"stdout": input, "stderr": [], "input": input} for input in inputs], None)
+        self.agent = ExecutorAgent(container_manager=self.manager, podman_instance=MagicMock(), token="secret")
+        self.client = self.agent.app.test_client()
+        self.headers = {"X-Agent-Token": "secret"}
+
+    def test_status(self):
+        status = self.client.get("/rpc/status", headers=self.headers).json
+        self.assertEqual((status["max_containers"], status["containers"], status["running"]), (4, 1, 0))
+        #the agent only answers its server
+        self.assertEqual(self.client.get("/rpc/status").status_code, 401)
+
+    def test_execute_inputs(self):
+        body = {"data": {"cell_id": 0}, "inputs": [["1"], ["2"]], "timeout": 5}
+        answer = self.client.post("/rpc/execute_inputs", json=body, headers=self.headers).json
+        self.assertEqual([output["stdout"] for output in answer["outputs"]], [["1"], ["2"]])
+        self.assertIsNone(answer["failed"])
+        self.manager.execute_inputs.assert_called_once_with({"cell_id": 0}, [["1"], ["2"]], 5, False)
+        self.assertEqual(self.agent.running, 0)
+        self.assertEqual(self.client.post("/rpc/execute_inputs", json={"inputs": []}, headers=self.headers).status_code, 400)
+
+    def test_execute_inputs_errors(self):
+        #busy containers are retried by the server, errors of the cell are its output
+        self.manager.execute_inputs.side_effect = NoContainerException("busy")
+        body = {"data": {"cell_id": 0}, "inputs": [["1"]], "timeout": 5}
+        self.assertEqual(self.client.post("/rpc/execute_inputs", json=body, headers=self.headers).status_code, 503)
+        self.manager.execute_inputs.side_effect = ImageBuildException("build failed")
+        answer = self.client.post("/rpc/execute_inputs", json=body, headers=self.headers).json
+        self.assertEqual(answer["failed"], 0)
+        self.assertEqual(answer["outputs"][0]["stderr"], ["build failed"])
+
+    def test_run_without_token(self):
+        #without a token the agent only listens on localhost
+        agent = ExecutorAgent(container_manager=self.manager, podman_instance=MagicMock(), token="")
+        agent.app.run = MagicMock()
+        with self.assertRaises(AgentException):
+            agent.run(host="0.0.0.0")
+        agent.app.run.assert_not_called()
+        agent.run(host="127.0.0.1")
+        agent.app.run.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
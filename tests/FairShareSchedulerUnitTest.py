@@ -0,0 +1,128 @@
+import os,sys,time,threading
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.FairShareScheduler import FairShareScheduler, SessionShare
+from sources.ContainerManager import ContainerManager, IndexAllocator
+
+class TestFairShareScheduler(unittest.TestCase):
+    @staticmethod
+    def make_session(session_id, containers = 0, last_used = 0):
+        session = MagicMock()
+        session.id = session_id
+        session.last_used = last_used
+        session.container_manager.container_count = containers
+        def trim_containers(limit, count = None):
+            removed = max(min(session.container_manager.container_count - limit, count if count is not None else containers), 0)
+            session.container_manager.container_count -= removed
+            return removed
+        session.container_manager.trim_containers.side_effect = trim_containers
+        return session
+
+    @staticmethod
+    def constructor_container(metadata, index, run_as_is = False):
+        #the container is busy while it runs a test case
+        container = MagicMock()
+        container.metadata = metadata
+        container.available = True
+        def run_code(input, timeout):
+            container.available = False
+            time.sleep(0.02)
+            container.available = True
+            return {"stdout": input, "stderr": []}
+        container.run_code.side_effect = run_code
+        container.is_available.side_effect = lambda: container.available
+        container.set_available.side_effect = lambda val: setattr(container, 'available', val)
+        return container
+
+    def setUp(self):
+        self.concurrency = MagicMock()
+        self.concurrency.initial_limit.return_value = 5
+        self.concurrency.adjust.return_value = 5
+        self.scheduler = FairShareScheduler(self.concurrency)
+
+    def test_get_share(self):
+        first, second = self.make_session("first"), self.make_session("second")
+        self.scheduler.register(first)
+        self.scheduler.register(second)
+        #an idle session may use every container until another session runs a request
+        self.assertEqual(self.scheduler.get_share("first"), 5)
+        self.scheduler.begin(first)
+        self.scheduler.begin(second)
+        #the first session to start gets the remainder
+        self.assertEqual(self.scheduler.get_share("first"), 3)
+        self.assertEqual(self.scheduler.get_share("second"), 2)
+        self.scheduler.end(second)
+        self.assertEqual(self.scheduler.get_share("first"), 5)
+        #the share of a session is the limit of its container manager
+        self.assertEqual(SessionShare(self.scheduler, "first").adjust(0), 5)
+
+    def test_rebalance(self):
+        idle = self.make_session("idle", containers = 2, last_used = 1)
+        busy = self.make_session("busy", containers = 2, last_used = 2)
+        new = self.make_session("new")
+        for session in (idle, busy, new):
+            self.scheduler.register(session)
+        #a session starting a request takes the containers of the idle sessions
+        self.scheduler.begin(busy)
+        self.assertEqual(idle.container_manager.container_count, 0)
+        busy.container_manager.container_count = 4
+        idle.container_manager.container_count = 1
+        #the idle session loses its containers first, the busy session keeps its share
+        self.scheduler.begin(new)
+        self.assertEqual(idle.container_manager.container_count, 0)
+        self.assertEqual(busy.container_manager.container_count, 3)
+        #with a lower limit of the host the busy session is trimmed to its share
+        self.concurrency.adjust.return_value = 2
+        self.assertEqual(self.scheduler.rebalance(new), 2)
+        self.assertEqual(busy.container_manager.container_count, 1)
+
+    def test_concurrent_sessions(self):
+        #a session keeps running its cells when another session starts and its share drops below its busy containers
+        self.concurrency.adjust.return_value = 4
+        allocator = IndexAllocator()
+        sessions = {}
+        for session_id in ("first", "second"):
+            session = MagicMock()
+            session.id = session_id
+            session.last_used = 0
+            session.container_manager = ContainerManager(container_class=self.constructor_container, result_cache=None,
+                                                         concurrency=SessionShare(self.scheduler, session_id), index_allocator=allocator)
+            self.scheduler.register(session)
+            sessions[session_id] = session
+        results = {}
+        def run(session, cells):
+            self.scheduler.begin(session)
+            try:
+                options = [{"cell_id": str(cell), "language": "Python", "version": f"3.{cell}", "compiler": "", "code": "", "specs": {}} for cell in range(cells)]
+                results[session.id] = session.container_manager.execute_parallel(options, [["1"], ["2"], ["3"]], timeout=100)
+            finally:
+                self.scheduler.end(session)
+        first = threading.Thread(target=run, args=(sessions["first"], 8), daemon=True)
+        first.start()
+        time.sleep(0.03)
+        second = threading.Thread(target=run, args=(sessions["second"], 2), daemon=True)
+        second.start()
+        first.join(10)
+        second.join(10)
+        self.assertFalse(first.is_alive())
+        self.assertFalse(second.is_alive())
+        self.assertEqual(len(results["first"]), 8)
+        self.assertEqual(len(results["second"]), 2)
+        self.assertEqual(results["first"][7]["7"][2]["stdout"], ["3"])
+        #neither session went over its share once both were running
+        self.assertLessEqual(self.scheduler.get_container_count(), 4)
+
+    def test_unregister(self):
+        session = self.make_session("session", containers = 2)
+        self.scheduler.register(session)
+        self.scheduler.begin(session)
+        self.scheduler.unregister(session)
+        self.assertEqual(self.scheduler.get_container_count(), 0)
+        self.assertEqual(self.scheduler.get_share("other"), 5)
+
+if __name__ == '__main__':
+    unittest.main()
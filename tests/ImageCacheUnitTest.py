@@ -0,0 +1,119 @@
+import os,sys,time,tempfile
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ImageCache import ImageCache, IMAGE_NAME
+from sources.CustomException import *
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.temp_dir.name, "image_cache.json")
+        self.cache = ImageCache(index_path=self.index_path, max_images=2, max_age=100)
+        self.podman = MagicMock()
+        #images exist once they were built
+        self.built = set()
+        self.podman.build_image.side_effect = lambda name, tag, mount_path: self.built.add(tag)
+        self.podman.image_exists.side_effect = lambda name, tag: tag in self.built
+        self.environment = {"language": "python", "version": "3.10", "compiler": "", "specs": []}
+        self.mount_path = self.make_context("FROM python:3.10-alpine\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_context(self, dockerfile: str) -> str:
+        path = tempfile.mkdtemp(dir=self.temp_dir.name)
+        with open(os.path.join(path, "Dockerfile"), "w") as file:
+            file.write(dockerfile)
+        with open(os.path.join(path, "code.py"), "w") as file:
+            file.write("print(1)")
+        return path
+
+    def test_get_image(self):
+        name, tag = self.cache.get_image(self.podman, self.environment, self.mount_path)
+        self.assertEqual(name, IMAGE_NAME)
+        self.podman.build_image.assert_called_once()
+        #the same environment reuses the image
+        self.assertEqual(self.cache.get_image(self.podman, self.environment, self.mount_path), (name, tag))
+        self.podman.build_image.assert_called_once()
+        self.assertEqual(self.cache.references[tag], 2)
+        #a different Dockerfile is a different image
+        _, other = self.cache.get_image(self.podman, self.environment, self.make_context("FROM python:3.11-alpine\n"))
+        self.assertNotEqual(tag, other)
+        self.assertEqual(self.podman.build_image.call_count, 2)
+
+    def test_build_context(self):
+        #the image is built from a context without the user code
+        def build_image(name, tag, mount_path):
+            self.assertEqual(os.listdir(mount_path), ["Dockerfile"])
+        self.podman.build_image.side_effect = build_image
+        self.cache.get_image(self.podman, self.environment, self.mount_path)
+
+    def test_build_error(self):
+        self.podman.build_image.side_effect = ImageBuildException("build failed")
+        with self.assertRaises(ImageBuildException):
+            self.cache.get_image(self.podman, self.environment, self.mount_path)
+        self.assertEqual(sum(self.cache.references.values()), 0)
+
+    def test_collect(self):
+        tags = []
+        for version in ["3.8", "3.9", "3.10"]:
+            _, tag = self.cache.get_image(self.podman, self.environment, self.make_context(f"FROM python:{version}-alpine\n"))
+            tags.append(tag)
+        #images in use are never removed
+        self.assertEqual(self.cache.collect(self.podman), [])
+        self.cache.release(tags[1])
+        self.cache.release(tags[2])
+        #the least recently used unused image is removed while there are too many
+        self.cache.images[tags[1]] = time.time() - 10
+        self.assertEqual(self.cache.collect(self.podman), [tags[1]])
+        self.podman.remove_image.assert_called_once_with(IMAGE_NAME, tags[1])
+        #unused images that are too old are removed
+        self.cache.images[tags[2]] = time.time() - 1000
+        self.assertEqual(self.cache.collect(self.podman), [tags[2]])
+        self.assertEqual(list(self.cache.images.keys()), [tags[0]])
+
+    def test_shared_index(self):
+        #worker processes share the index, their images count towards max_images
+        other = ImageCache(index_path=self.index_path, max_images=2, max_age=100)
+        _, first = self.cache.get_image(self.podman, self.environment, self.make_context("FROM python:3.8-alpine\n"))
+        _, second = other.get_image(self.podman, self.environment, self.make_context("FROM python:3.9-alpine\n"))
+        _, third = other.get_image(self.podman, self.environment, self.make_context("FROM python:3.10-alpine\n"))
+        #the image in use by the first process is kept by the other one
+        self.podman.remove_image.assert_not_called()
+        self.cache.release(first)
+        self.cache.images[first] = time.time() - 10
+        self.assertEqual(self.cache.collect(self.podman), [first])
+        #an image removed by one process is forgotten by the others
+        other.release(second)
+        other.images[second] = time.time() - 1000
+        self.assertEqual(other.collect(self.podman), [second])
+        self.cache.collect(self.podman)
+        self.assertEqual(list(self.cache.images), [third])
+
+    def test_collect_race(self):
+        #an image another process looked up after the unused images were chosen is kept
+        other = ImageCache(index_path=self.index_path, max_images=2, max_age=100)
+        _, tag = self.cache.get_image(self.podman, self.environment, self.mount_path)
+        self.cache.release(tag)
+        self.cache.images[tag] = time.time() - 1000
+        get_build_lock = self.cache.get_build_lock
+        def look_up(tag):
+            #the reference is saved before the other process takes the build lock and calls image_exists
+            with other.lock:
+                other.references[tag] = 1
+                other.save()
+            return get_build_lock(tag)
+        self.cache.get_build_lock = look_up
+        self.assertEqual(self.cache.collect(self.podman), [])
+        self.podman.remove_image.assert_not_called()
+
+    def test_persistence(self):
+        _, tag = self.cache.get_image(self.podman, self.environment, self.mount_path)
+        self.assertIn(tag, ImageCache(index_path=self.index_path).images)
+
+if __name__ == "__main__":
+    unittest.main()
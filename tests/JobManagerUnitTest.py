@@ -0,0 +1,110 @@
+import os,sys,threading,tempfile
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.JobManager import JobManager, JobStore, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from sources.CustomException import *
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.jobs = JobManager(max_workers=1, max_queued=1, max_finished=2)
+        self.addCleanup(self.jobs.shutdown)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def blocking_run(self, job):
+        job.add_cell_result({"cell": ["partial"]})
+        self.release.wait(5)
+        return {"cell": "final"}
+
+    def wait(self, job):
+        for _ in range(500):
+            if job.is_finished():
+                return
+            threading.Event().wait(0.01)
+        self.fail("job did not finish")
+
+    def test_submit(self):
+        job = self.jobs.submit(self.blocking_run, total_cells=1)
+        self.assertIn(job.status, (QUEUED, RUNNING))
+        #the results of the finished cells are available while the job runs
+        for _ in range(500):
+            if job.cell_results:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.jobs.get(job.id).results()["results"], [{"cell": ["partial"]}])
+        self.assertTrue(self.jobs.get(job.id).results()["partial"])
+        self.release.set()
+        self.wait(job)
+        self.assertEqual(job.results(), {"job_id": job.id, "status": DONE, "partial": False, "results": {"cell": "final"}})
+        self.assertEqual(job.summary()["cells_done"], 1)
+
+    def test_failed(self):
+        def run(job):
+            raise Exception("error")
+        job = self.jobs.submit(run)
+        self.wait(job)
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.summary()["error"], "error")
+
+    def test_queue_full(self):
+        running = self.jobs.submit(self.blocking_run)
+        queued = self.jobs.submit(self.blocking_run)
+        with self.assertRaises(JobQueueFullException):
+            self.jobs.submit(self.blocking_run)
+        #queued jobs can be cancelled, running ones can not
+        self.assertEqual(self.jobs.cancel(queued.id).status, CANCELLED)
+        with self.assertRaises(JobStateException):
+            self.jobs.cancel(running.id)
+        self.release.set()
+        self.wait(running)
+        #the slots are free again
+        self.wait(self.jobs.submit(lambda job: None))
+        self.assertEqual(queued.status, CANCELLED)
+
+    def test_collect(self):
+        self.release.set()
+        finished = [self.jobs.submit(self.blocking_run) for _ in range(2)]
+        for job in finished:
+            self.wait(job)
+        self.wait(self.jobs.submit(self.blocking_run))
+        self.jobs.submit(self.blocking_run)
+        #only the last finished jobs are kept
+        with self.assertRaises(JobNotFoundException):
+            self.jobs.get(finished[0].id)
+        self.assertEqual(len(self.jobs.list()), 3)
+
+    def test_store(self):
+        #the worker processes of the production server answer for the jobs of each other
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, "jobs.db")
+        other = JobManager(max_workers=1, max_queued=1, store=JobStore(path))
+        self.addCleanup(other.shutdown)
+        self.jobs.store = JobStore(path)
+        running = self.jobs.submit(self.blocking_run, total_cells=1, get_progress=lambda job: 0.5)
+        queued = self.jobs.submit(self.blocking_run)
+        for _ in range(500):
+            if other.get(running.id).status == RUNNING and other.get(running.id).results()["results"]:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(other.get(running.id).results()["results"], [{"cell": ["partial"]}])
+        self.assertEqual(other.get(running.id).get_progress(), 0.5)
+        self.assertEqual(len(other.list()), 2)
+        #a queued job cancelled by another worker never starts
+        self.assertEqual(other.cancel(queued.id).status, CANCELLED)
+        with self.assertRaises(JobStateException):
+            other.cancel(running.id)
+        self.release.set()
+        self.wait(running)
+        self.wait(queued)
+        self.assertEqual(queued.status, CANCELLED)
+        self.assertIsNone(queued.started)
+        self.assertEqual(other.get(running.id).results()["results"], {"cell": "final"})
+        with self.assertRaises(JobNotFoundException):
+            other.get("unknown")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -51,6 +51,18 @@ class TestLanguage(unittest.TestCase):
         self.language.injector.inject.assert_called_once_with(source_path,destination_path,signature)
 
 
+    def test_inject_batch(self):
+        signature = {"name": "sum_numbers", "args": {"a": "int", "b": "int"}}
+        self.language.inject_batch(source_path="source.py", destination_path="destination.py", signature=signature)
+        self.language.injector.inject_batch.assert_called_once_with("source.py", "destination.py", signature)
+        #the base language has no batch harness
+        self.assertFalse(self.language.supports_batch())
+
+    def test_generate_worker_command(self):
+        #by default the worker is started like a normal run and loads the code on start
+        self.assertEqual(self.language.generate_worker_command("function"), [])
+        self.assertEqual(self.language.generate_worker_load("function", 5), "")
+
     def test_generate_dockerfile(self):
         version = "3.10"
         compiler = ""
@@ -61,7 +73,7 @@ class TestLanguage(unittest.TestCase):
         #call the generate_dockerfile funciton
         self.language.generate_dockerfile(version=version,compiler=compiler,function_name=function_name,specs=specs,index=index)
         #check that the docker_maker's function was called with the right arguments
-        self.language.docker_maker.generate_dockerfile.assert_called_once_with(version,compiler,function_name,specs,index)
+        self.language.docker_maker.generate_dockerfile.assert_called_once_with(version,compiler,function_name,specs,index,"")
 
     def test_get_available_versions(self):
         result = self.available_versions
@@ -0,0 +1,170 @@
+import os,sys,io,json,struct,hashlib,tarfile,tempfile,threading
+import unittest
+from unittest.mock import patch
+import socketserver
+from http.server import BaseHTTPRequestHandler
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.PodmanAPI import PodmanAPI, API_VERSION
+from sources.CustomException import *
+
+class StandInHandler(BaseHTTPRequestHandler):
+    '''
+    Answers like the libpod service for the endpoints used by PodmanAPI
+    '''
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def answer(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        path = self.path.split("?")[0].replace(f"/{API_VERSION}/libpod", "")
+        self.server.requests.append((self.command, self.path, body))
+        self.server.connections.add(self.connection)
+        if path.endswith("/exec") and self.command == "POST":
+            self.server.commands.append(json.loads(body)["Cmd"])
+            return self.answer(201, json.dumps({"Id": "exec1"}).encode())
+        if path == "/exec/exec1/start":
+            command = self.server.commands[-1]
+            if "fail" in command:
+                stdout, stderr = b"", b"Error: command failed\n"
+            else:
+                stdout, stderr = (" ".join(command[-2:]) + "\n").encode(), b""
+            if command[:2] == ["/usr/bin/time", "-v"]:
+                stderr += b"\tCommand being timed: \"run\"\n\tMaximum resident set size (kbytes): 1024\n\tExit status: 0\n"
+            stream = b""
+            if stdout:
+                stream += struct.pack(">BxxxI", 1, len(stdout)) + stdout
+            if stderr:
+                stream += struct.pack(">BxxxI", 2, len(stderr)) + stderr
+            return self.answer(200, stream, "application/vnd.docker.raw-stream")
+        if path == "/containers/create":
+            if json.loads(body)["name"] == "missing":
+                return self.answer(404, json.dumps({"cause": "no such image", "message": "image not known"}).encode())
+            return self.answer(201, json.dumps({"Id": "abc123"}).encode())
+        if path == "/build":
+            with tarfile.open(fileobj=io.BytesIO(body)) as archive:
+                self.server.archive = archive.getnames()
+            return self.answer(200, b'{"stream": "STEP 1/1: FROM alpine\\n"}\n{"stream": "done\\n"}\n')
+        if path.endswith("/archive"):
+            with tarfile.open(fileobj=io.BytesIO(body)) as archive:
+                self.server.archive = archive.getnames()
+            return self.answer(200, b"")
+        if path == "/containers/missing/stop":
+            return self.answer(404, json.dumps({"message": "no container with name missing"}).encode())
+        return self.answer(200, b"{}")
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+class StandInServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class TestPodmanAPI(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        socket_path = os.path.join(self.temp_dir.name, "podman.sock")
+        self.server = StandInServer(socket_path, StandInHandler)
+        self.server.requests = []
+        self.server.commands = []
+        self.server.connections = set()
+        self.server.archive = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.podman = PodmanAPI(socket_path=socket_path)
+
+    def tearDown(self):
+        self.podman.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_exec_command(self):
+        output = self.podman.exec_command("container_1", ["python", "1", "2"])
+        self.assertEqual(output, {"stdout": ["1 2"], "stderr": []})
+        self.assertEqual(self.server.commands, [["python", "1", "2"]])
+
+    def test_exec_command_metrics(self):
+        output = self.podman.exec_command("container_1", ["python", "1", "2"], metrics=True)
+        self.assertEqual(output['stdout'], ["1 2"])
+        self.assertEqual(output['stderr'], [])
+        self.assertEqual(output['metrics']['Maximum resident set size (kbytes)'], "1024")
+
+    def test_exec_command_error(self):
+        with self.assertRaises(ExecutionException) as context:
+            self.podman.exec_command("container_1", ["fail"])
+        self.assertIn("command failed", str(context.exception))
+
+    def test_connection_pool(self):
+        #all calls reuse the same kept alive connection
+        for _ in range(5):
+            self.podman.exec_command("container_1", ["python", "1", "2"])
+        self.assertEqual(len(self.server.requests), 10)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_run_image_volumes(self):
+        self.podman.run_image("image_1", "image_tag_1", "container_1", volumes=[("/tmp/session", "/usr/src/app")])
+        body = json.loads(self.server.requests[0][2])
+        self.assertEqual(body["mounts"], [{"type": "bind", "source": "/tmp/session", "destination": "/usr/src/app", "options": ["Z"]}])
+
+    def test_build_image(self):
+        with tempfile.TemporaryDirectory() as context:
+            with open(os.path.join(context, "Dockerfile"), "w") as file:
+                file.write("FROM alpine\n")
+            self.podman.build_image("image_1", "image_tag_1", mount_path=context)
+        self.assertIn("t=image_1%3Aimage_tag_1", self.server.requests[-1][1])
+        self.assertEqual(self.server.archive, ["Dockerfile"])
+
+    def test_run_image(self):
+        output = self.podman.run_image("image_1", "image_tag_1", "container_1")
+        self.assertEqual(output['stdout'], ["abc123"])
+        self.assertEqual([request[1].split("/libpod")[1] for request in self.server.requests], ["/containers/create", "/containers/container_1/start"])
+        with self.assertRaises(ImageRunException) as context:
+            self.podman.run_image("image_1", "image_tag_1", "missing")
+        self.assertIn("image not known", str(context.exception))
+
+    def test_copy_to_container(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as file:
+            file.write("print(1)")
+        self.podman.copy_to_container(file.name, "container_1")
+        os.remove(file.name)
+        self.assertIn("path=%2Fusr%2Fsrc%2Fapp", self.server.requests[-1][1])
+        self.assertEqual(self.server.archive, [os.path.basename(file.name)])
+
+    def test_send_archive_timeout(self):
+        with patch.object(self.podman, 'request', wraps=self.podman.request) as mock_request:
+            self.podman.send_archive(self.podman.make_archive([]), "container_1", timeout=5)
+        self.assertEqual(mock_request.call_args.kwargs["timeout"], 5)
+
+    def test_upload_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(folder, name), "w") as file:
+                    file.write(name)
+            checksums = {"a.py": hashlib.sha256(b"a.py").hexdigest(), "b.py": hashlib.sha256(b"b.py").hexdigest()}
+            with patch.object(self.podman, 'exec_command', return_value={"stdout": [f"{checksum}  /usr/src/app/{name}" for name, checksum in checksums.items()], "stderr": []}) as mock_exec:
+                self.podman.upload_folder(folder, "container_1")
+                mock_exec.assert_called_once_with("container_1", ["sha256sum", "/usr/src/app/a.py", "/usr/src/app/b.py"])
+        #one request for the whole folder
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.archive, ["a.py", "b.py"])
+
+    def test_stop_and_remove_container(self):
+        self.podman.stop_container("container_1")
+        self.podman.remove_container("container_1")
+        self.podman.remove_image("image_1", "image_tag_1")
+        self.assertEqual([request[0] for request in self.server.requests], ["POST", "DELETE", "DELETE"])
+        with self.assertRaises(ContainerStopException):
+            self.podman.stop_container("missing")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import sys
 from pathlib import Path
 import os
 import tempfile
+import hashlib
 import unittest
 from unittest.mock import MagicMock,patch
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -151,6 +152,8 @@ class TestPodman(unittest.TestCase):
             self.Podman.remove_image = MagicMock()
             self.Podman.clean_path(sessions_dir)
             self.assertFalse(os.path.exists(sessions_path))
+            #a folder removed by another process is skipped
+            self.Podman.clean_path(os.path.join(sessions_dir, "missing"))
 
     def test_init_machine_not_exists(self):
         self.Podman.machine_exists = MagicMock(return_value = False)
@@ -177,6 +180,16 @@ class TestPodman(unittest.TestCase):
             self.Podman.clean_path.assert_called_once_with("mock_sessions")
             self.Podman.check_for_errors.assert_called_once_with(mock_start,StartException)
 
+    def test_init_without_clean(self):
+        self.Podman.machine_exists = MagicMock(return_value = True)
+        self.Podman.clean_path = MagicMock(return_value = None)
+        self.Podman.prune = MagicMock(return_value = None)
+        self.Podman.check_for_errors = MagicMock(return_value = None)
+        with patch('subprocess.run',return_value = MockCompletedProcess(b"start output",b"")):
+            self.Podman.init("test_machine",session_path="mock_sessions",clean=False)
+            self.Podman.clean_path.assert_not_called()
+            self.Podman.prune.assert_not_called()
+
     def test_stop(self):
         self.Podman.check_for_errors = MagicMock(return_value = None)
         self.Podman.print_process_output = MagicMock(return_value = None)
@@ -206,6 +219,43 @@ class TestPodman(unittest.TestCase):
             self.Podman.run_image("test-image","test-tag","container-tag")
             mock_run.assert_called()
 
+    def test_run_image_volumes(self):
+        mock_process = MockCompletedProcess(b"image",b"")
+        with patch('subprocess.run',return_value = mock_process) as mock_run:
+            self.Podman.run_image("test-image","test-tag","container-tag",volumes=[("session","/usr/src/app")])
+            command = mock_run.call_args[0][0]
+            self.assertIn("-v", command)
+            self.assertEqual(command[-1], "test-image:test-tag")
+
+    def test_upload_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ["a.py", "b.py"]:
+                with open(os.path.join(folder, name), "w") as file:
+                    file.write(name)
+            checksums = [f"{hashlib.sha256(name.encode()).hexdigest()}  /usr/src/app/{name}" for name in ["a.py", "b.py"]]
+            copy = subprocess.CompletedProcess([], 0, b"", b"")
+            with patch('sources.Podman.platform', "linux"), patch('subprocess.run', return_value=copy) as mock_run, \
+                    patch.object(self.Podman, 'exec_command', return_value={"stdout": checksums, "stderr": []}):
+                self.Podman.upload_folder(folder, "container_test")
+                #the whole folder is streamed to a single podman cp
+                mock_run.assert_called_once()
+                self.assertEqual(mock_run.call_args[0][0], ["podman", "cp", "-", "container_test:/usr/src/app"])
+                self.assertTrue(mock_run.call_args[1]['input'])
+            #a file that differs in the container is reported
+            with patch('sources.Podman.platform', "linux"), patch('subprocess.run', return_value=copy), \
+                    patch.object(self.Podman, 'exec_command', return_value={"stdout": checksums[:1], "stderr": []}):
+                with self.assertRaises(CopyException) as context:
+                    self.Podman.upload_folder(folder, "container_test")
+                self.assertIn("/usr/src/app/b.py", str(context.exception))
+
+    def test_upload_folder_timeout(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "a.py"), "w") as file:
+                file.write("a")
+            with patch('subprocess.run', side_effect=subprocess.TimeoutExpired("podman", 30)):
+                with self.assertRaises(CopyException):
+                    self.Podman.upload_folder(folder, "container_test")
+
     def test_copy_to_container(self):
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
             tmp.write(b"dummy content")
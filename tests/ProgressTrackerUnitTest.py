@@ -0,0 +1,62 @@
+import os,sys,threading
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ProgressTracker import ProgressTracker, Progress, current_progress, track_stage, track_tests, DOCKERFILE, INJECT, BUILD, RUN
+
+class TestProgressTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ProgressTracker(max_finished=1)
+
+    def test_status(self):
+        progress = Progress(cells=2, test_cases=10)
+        self.assertEqual(progress.status(), 0)
+        for stage in (DOCKERFILE, INJECT, BUILD, RUN):
+            progress.stage_done(stage)
+        self.assertAlmostEqual(progress.status(), 0.55 / 2)
+        progress.add_tests(10)
+        self.assertAlmostEqual(progress.status(), 0.55 / 2 + 0.45 / 2)
+        #a cell whose outputs came from a previous run is done without any stage
+        progress.cell_done()
+        progress.cell_done()
+        self.assertAlmostEqual(progress.status(), 1.0)
+        #more containers than cells (i.e. shards) do not go beyond 1
+        for _ in range(3):
+            progress.stage_done(BUILD)
+        self.assertAlmostEqual(progress.status(), 1.0)
+
+    def test_get(self):
+        first = self.tracker.start(cells=1, test_cases=1)
+        second = self.tracker.start("job", cells=1, test_cases=1)
+        #without an id, the last started request that still runs
+        self.assertIs(self.tracker.get(), second)
+        self.tracker.finish(second)
+        self.assertIs(self.tracker.get(), first)
+        self.assertEqual(self.tracker.get("job").status(), 1.0)
+        self.tracker.finish(first)
+        self.assertIsNone(self.tracker.get())
+        #only the last finished requests are kept
+        self.assertIsNone(self.tracker.get("job"))
+
+    def test_concurrent_requests(self):
+        #every thread updates the progress of its own request
+        progresses = [self.tracker.start(cells=1, test_cases=100) for _ in range(4)]
+        def run(progress, count):
+            current_progress.set(progress)
+            track_stage(BUILD)
+            for _ in range(count):
+                track_tests()
+        threads = [threading.Thread(target=run, args=[progress, 25 * number]) for number, progress in enumerate(progresses)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([progress.tests_done for progress in progresses], [0, 25, 50, 75])
+        self.assertEqual([progress.stages[BUILD] for progress in progresses], [1, 1, 1, 1])
+        #nothing is tracked outside of a request
+        track_tests()
+
+if __name__ == '__main__':
+    unittest.main()
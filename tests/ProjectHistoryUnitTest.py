@@ -0,0 +1,62 @@
+import os,sys
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ProjectHistory import ProjectHistory
+
+class TestProjectHistory(unittest.TestCase):
+    def setUp(self):
+        self.history = ProjectHistory(max_projects=2)
+        self.options = [
+            {"cell_id": 1, "code": "def f(a):\n\treturn a\n", "language": "python", "version": "3.10", "compiler": "", "specs": {}},
+            {"cell_id": 2, "code": "int f(int a) { return a; }", "language": "cpp", "version": "", "compiler": "gcc", "specs": {}}
+        ]
+        self.inputs = [[1], [2]]
+        #runs the cells like ContainerManager.execute_parallel, the output tells which code ran
+        self.execute = MagicMock(side_effect=lambda options: [{option['cell_id']: [{"stdout": [option['code']], "stderr": [], "metrics": {}, "input": input} for input in self.inputs]} for option in options])
+
+    def test_run(self):
+        results = self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.assertEqual([list(result.keys())[0] for result in results], [1, 2])
+        #only the changed cell runs again, the outputs keep the order of the options
+        self.options[1] = dict(self.options[1], code="int f(int a) { return -a; }")
+        results = self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.execute.assert_called_with([self.options[1]])
+        self.assertEqual(results[0][1][0]['stdout'], [self.options[0]['code']])
+        self.assertEqual(results[1][2][0]['stdout'], ["int f(int a) { return -a; }"])
+        #nothing changed
+        self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.assertEqual(self.execute.call_count, 2)
+        #other test cases run every cell
+        self.history.run("project", self.options, [[3]], 60, self.execute)
+        self.execute.assert_called_with(self.options)
+
+    def test_run_on_cell(self):
+        self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.options[1] = dict(self.options[1], code="int f(int a) { return -a; }")
+        reported = []
+        results = self.history.run("project", self.options, self.inputs, 60, self.execute, on_cell=reported.append)
+        #the unchanged cell is reported before the changed cells run
+        self.assertEqual(reported, [results[0]])
+
+    def test_run_failed(self):
+        #cells with a failed execution are run again
+        self.execute.side_effect = lambda options: [{option['cell_id']: [{"stdout": [""], "stderr": ["error"]}]} for option in options]
+        self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.history.run("project", self.options, self.inputs, 60, self.execute)
+        self.execute.assert_called_with(self.options)
+        self.assertEqual(self.execute.call_count, 2)
+
+    def test_projects(self):
+        for project in ["a", "b", "c"]:
+            self.history.run(project, self.options, self.inputs, 60, self.execute)
+        #the least recently run project was forgotten
+        self.assertEqual(list(self.history.projects.keys()), ["b", "c"])
+        self.history.forget("b")
+        self.assertEqual(list(self.history.projects.keys()), ["c"])
+
+if __name__ == '__main__':
+    unittest.main()
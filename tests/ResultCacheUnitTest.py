@@ -0,0 +1,60 @@
+import os,sys,time,tempfile
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ResultCache import ResultCache
+from sources.LanguageFactory import LanguageFactory
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(path=os.path.join(self.temp_dir.name, "result_cache.db"), max_results=2)
+        self.data = {
+            "code": "def f(a):\n\treturn a\n",
+            "signature": {"name": "f", "args": {"a": "int"}, "return": "int"},
+            "language": "Python",
+            "version": "3.10",
+            "compiler": "",
+            "specs": {}
+        }
+
+    def tearDown(self):
+        if self.cache.connection is not None:
+            self.cache.connection.close()
+        self.temp_dir.cleanup()
+
+    def test_get_cell_key(self):
+        key = self.cache.get_cell_key(self.data)
+        self.assertEqual(self.cache.get_cell_key(dict(self.data, cell_id=5, batch=True)), key)
+        self.assertNotEqual(self.cache.get_cell_key(dict(self.data, version="3.12")), key)
+        self.assertNotEqual(self.cache.get_cell_key(dict(self.data, code="def f(a):\n\treturn -a\n")), key)
+        self.assertNotEqual(self.cache.get_key(key, [1]), self.cache.get_key(key, [2]))
+
+    def test_get_cell_key_converted_signature(self):
+        data = dict(self.data, signature={"name": "f", "args": ["int"], "return": "int"})
+        key = self.cache.get_cell_key(data)
+        self.assertEqual(data["signature"]["args"], ["int"])
+        # A container of the cell converts the signature in place
+        converted = LanguageFactory().get_language("Python").check_signature(data["signature"])
+        self.assertEqual(self.cache.get_cell_key(dict(data, signature=converted)), key)
+
+    def test_put_get(self):
+        output = {"stdout": ["1"], "stderr": [], "metrics": {"Elapsed time (ns)": "5"}}
+        self.cache.put_many({"a": output})
+        self.assertEqual(self.cache.get_many(["a", "b"]), {"a": output})
+
+    def test_eviction(self):
+        self.cache.put_many({"a": {"stdout": ["1"]}})
+        time.sleep(0.01)
+        self.cache.put_many({"b": {"stdout": ["2"]}})
+        time.sleep(0.01)
+        #reading a makes b the least recently used
+        self.cache.get_many(["a"])
+        time.sleep(0.01)
+        self.cache.put_many({"c": {"stdout": ["3"]}})
+        self.assertEqual(sorted(self.cache.get_many(["a", "b", "c"])), ["a", "c"])
+
+if __name__ == '__main__':
+    unittest.main()
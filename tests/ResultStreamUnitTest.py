@@ -0,0 +1,44 @@
+import os,sys,json
+import unittest
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.ResultStream import ResultStream
+from sources.CellSim import CellSim
+
+class TestResultStream(unittest.TestCase):
+    def setUp(self):
+        self.stream = ResultStream(["a", "b"], 2)
+
+    def output(self, value: str, input: list) -> dict:
+        return CellSim().get_execution("cell", input, [value])
+
+    def drain(self) -> list:
+        self.stream.finish({})
+        return [json.loads(line) for line in self.stream.iterate("ndjson")]
+
+    def test_divergence(self):
+        self.stream.add_case("a", 0, self.output("1", ["1"]))
+        self.stream.add_case("b", 0, self.output("2", ["1"]))
+        self.stream.add_case("a", 1, self.output("3", ["3"]))
+        events = self.drain()
+        self.assertEqual([event["event"] for event in events], ["case", "summary", "case", "divergence", "summary", "case", "summary", "done"])
+        #the divergence is reported with the outputs of every cell so far
+        self.assertEqual(events[3]["data"]["cells"], {"a": {"value": "1", "error_msg": ""}, "b": {"value": "2", "error_msg": ""}})
+        self.assertEqual(events[6]["data"], {"test_count": "2", "reported": "2", "complete": "1", "matched": "1", "no_match": "1"})
+
+    def test_add_cell(self):
+        self.stream.add_case("a", 0, self.output("1", ["1"]))
+        #test cases reported before are not reported again
+        self.stream.add_cell({"a": [self.output("1", ["1"]), self.output("2", ["2"])]})
+        events = self.drain()
+        self.assertEqual([event["event"] for event in events], ["case", "summary", "case", "summary", "cell", "done"])
+        self.assertEqual(events[4]["data"]["result"]["outputs"]["1"]["value"], "2")
+
+    def test_sse(self):
+        self.stream.fail("error")
+        self.assertEqual(list(self.stream.iterate()), ['event: error\ndata: {"status": 400, "error_message": "error"}\n\n'])
+
+if __name__ == '__main__':
+    unittest.main()
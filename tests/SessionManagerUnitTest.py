@@ -0,0 +1,97 @@
+import os,sys
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from sources.SessionManager import SessionManager, DEFAULT_SESSION, get_token_session_id
+from sources.FairShareScheduler import FairShareScheduler
+from sources.Session import MAX_SESSION_RESULTS
+from sources.CustomException import *
+
+class TestSessionManager(unittest.TestCase):
+    @staticmethod
+    def constructor_manager(**options):
+        manager = MagicMock()
+        manager.options = options
+        manager.container_count = 0
+        manager.max_containers = options["concurrency"].initial_limit()
+        return manager
+
+    def setUp(self):
+        self.sessions = SessionManager(self.constructor_manager, FairShareScheduler(concurrency=None), max_sessions=2, idle_timeout=60)
+        self.addCleanup(self.sessions.stop_reaper)
+
+    def test_get_session(self):
+        #requests without a session use the default session, which is the only one keeping warm containers
+        default = self.sessions.get_session()
+        self.assertEqual(default.id, DEFAULT_SESSION)
+        self.assertNotIn("pool_spec", default.container_manager.options)
+        session = self.sessions.get_session("client")
+        self.assertIs(self.sessions.get_session("client"), session)
+        self.assertEqual(session.container_manager.options["pool_spec"], "")
+        #and claim the warm containers of the default session
+        self.assertIs(session.container_manager.options["pool_source"], default.container_manager)
+        #the sessions share the container indices
+        self.assertIs(session.container_manager.options["index_allocator"], default.container_manager.options["index_allocator"])
+        self.assertIsNone(self.sessions.find_session("unknown"))
+
+    def test_remove_session(self):
+        session = self.sessions.get_session("client")
+        self.sessions.remove_session("client")
+        session.container_manager.purge.assert_called_once()
+        self.assertIsNone(self.sessions.find_session("client"))
+        with self.assertRaises(SessionNotFoundException):
+            self.sessions.remove_session("client")
+
+    def test_reap(self):
+        self.sessions.get_session()
+        idle = self.sessions.get_session("idle")
+        idle.last_used -= 120
+        #the default session is never reaped
+        self.sessions.find_session(DEFAULT_SESSION).last_used -= 120
+        self.assertEqual(self.sessions.reap(), ["idle"])
+        self.assertIsNotNone(self.sessions.find_session(DEFAULT_SESSION))
+        #sessions running a request are kept
+        running = self.sessions.get_session("running")
+        with self.sessions.running(running):
+            running.last_used -= 120
+            self.assertEqual(self.sessions.reap(), [])
+        self.assertEqual(running.running, 0)
+
+    def test_session_limit(self):
+        self.sessions.get_session()
+        self.sessions.get_session("first")
+        #idle sessions make room for new ones
+        self.sessions.get_session("second")
+        self.assertIsNone(self.sessions.find_session("first"))
+        with self.sessions.running(self.sessions.find_session("second")):
+            with self.assertRaises(SessionLimitException):
+                self.sessions.get_session("third")
+
+    def test_list_sessions(self):
+        #the listing does not give the ids of the sessions or of their requests away
+        self.sessions.get_session(get_token_session_id("secret"))
+        self.sessions.save_session(get_token_session_id("secret"), "request", {})
+        summaries = self.sessions.list_sessions()
+        #the default session is created with the first other session
+        self.assertEqual(len(summaries), 2)
+        for summary in summaries:
+            self.assertNotIn("session_id", summary)
+            self.assertNotIn("results", summary)
+        self.assertNotIn("secret", get_token_session_id("secret"))
+        self.assertEqual(get_token_session_id("secret"), get_token_session_id("secret"))
+
+    def test_save_results(self):
+        session = self.sessions.get_session("client")
+        for index in range(MAX_SESSION_RESULTS + 1):
+            self.sessions.save_session("client", f"request_{index}", {"index": index})
+        self.assertEqual(session.get_results(), {"index": MAX_SESSION_RESULTS})
+        self.assertEqual(session.get_results("request_1"), {"index": 1})
+        #the oldest results are forgotten first
+        self.assertIsNone(session.get_results("request_0"))
+        self.assertEqual(len(session.summary()["results"]), MAX_SESSION_RESULTS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os,sys,io,struct,time
+import unittest
+from unittest.mock import MagicMock
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+from sources.CustomException import *
+from sources.Worker import Worker
+
+class MockProcess:
+    def __init__(self, response: bytes):
+        self.stdin = io.BytesIO()
+        self.stdin.close = MagicMock()
+        self.stdout = io.BytesIO(response)
+        self.stderr = io.BytesIO(b"worker error")
+        self.returncode = None
+        self.kill = MagicMock()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout = None):
+        self.returncode = 0
+        return 0
+
+def frame(payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload)) + payload
+
+class TestWorker(unittest.TestCase):
+    def test_request(self):
+        process = MockProcess(frame(b"answer"))
+        worker = Worker(process, "source")
+        response = worker.request("question", timeout=5)
+        self.assertEqual(response, "answer")
+        #check that the request was length prefixed
+        self.assertEqual(process.stdin.getvalue(), frame(b"question"))
+
+    def test_request_closed_pipe(self):
+        process = MockProcess(b"\x00\x00")
+        worker = Worker(process)
+        with self.assertRaises(WorkerException) as context:
+            worker.request("question", timeout=5)
+        self.assertIn("Worker closed the pipe", str(context.exception))
+        self.assertIn("worker error", str(context.exception))
+
+    def test_request_timeout(self):
+        process = MockProcess(b"")
+        process.stdout = MagicMock()
+        process.stdout.read.side_effect = lambda length: time.sleep(5)
+        worker = Worker(process)
+        with self.assertRaises(RunCodeTimeoutException):
+            worker.request("question", timeout=0.1)
+        process.kill.assert_called_once()
+
+    def test_stop(self):
+        process = MockProcess(b"")
+        worker = Worker(process)
+        worker.stop()
+        #a zero length message asks the worker to stop
+        self.assertEqual(process.stdin.getvalue(), struct.pack(">I", 0))
+        self.assertFalse(worker.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()